@@ -0,0 +1,326 @@
+""" Exporter benchmarks on a synthetic library, with .json results to compare across commits.
+
+Usage: python benchmarks/run_benchmarks.py --output results.json [--compare previous_results.json]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+REPOSITORY_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIRECTORY: str = os.path.join(REPOSITORY_DIRECTORY, "src")
+sys.path.insert(0, SOURCE_DIRECTORY)
+# Target of the time it takes to import run_cli, on top of the interpreter's own start up.
+IMPORT_TIME_BUDGET_SECONDS: float = 0.1
+
+# Reason: The application modules are importable only after the src folder is on the path, like in run_cli.
+# pylint: disable=wrong-import-position
+from playlist_exporter_configuration import PlaylistExporterConfiguration, PARSER_BACKENDS
+from playlist_parser import PlaylistParser
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from process_pool_tagger import ProcessPoolTagger
+from track import Track
+from track_table import TrackTable
+from synthetic_library import make_library, make_playlist
+# pylint: enable=wrong-import-position
+
+
+def get_commit() -> str|None:
+    """ Get the checked out commit of the repository, None if it is not available. """
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPOSITORY_DIRECTORY, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_best_of(function: Callable[[], object], repeat: int, setup: Callable[[], object]|None = None) -> float:
+    """ Run the function repeat times, return the fastest run's wall time in seconds. """
+
+    best_seconds: float = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start: float = time.perf_counter()
+        function()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+
+    return best_seconds
+
+
+def make_result(benchmark: str, entries: int, seconds: float, **details) -> dict:
+    """ Build a result record. """
+
+    return {
+        "benchmark": benchmark,
+        "entries": entries,
+        "seconds": round(seconds, 6),
+        "tracks_per_second": round(entries / seconds, 1) if entries > 0 and seconds > 0 else None,
+        **details
+    }
+
+
+def make_config(playlist_file_path: str, output_directory: str) -> PlaylistExporterConfiguration:
+    """ Get an exporter configuration with default values. """
+
+    config = PlaylistExporterConfiguration()
+    config.load_dict({
+        "album_name": "Benchmark",
+        "playlist_file_path": playlist_file_path,
+        "output_directory": output_directory
+    })
+
+    return config
+
+
+def measure_memory(function: Callable[[], object]) -> int:
+    """ Run the function, return the bytes still allocated by it, while its return value is alive. """
+
+    tracemalloc.start()
+    try:
+        # The return value is held until the allocated memory is read.
+        _ = function()
+
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def get_parsed_tracks(playlist_file_path: str, parser_backend: str) -> TrackTable:
+    """ Parse the playlist, return only its tracks, the parser and its directory index are released. """
+
+    parser = PlaylistParser(playlist_file_path, parser_backend)
+    parser.parse_playlist()
+
+    return parser.get_tracks()
+
+
+def benchmark_import(repeat: int, budget_seconds: float) -> list[dict]:
+    """ Time the start up of the CLI: a fresh interpreter importing run_cli, less the interpreter's own start up.
+    Every CLI run, including --help and no-op runs, pays this time before the arguments are checked.
+    """
+
+    def run_python(code: str):
+        subprocess.run([sys.executable, "-c", code], cwd=SOURCE_DIRECTORY, check=True)
+
+    interpreter_seconds: float = time_best_of(lambda: run_python("pass"), repeat)
+    import_seconds: float = max(time_best_of(lambda: run_python("import run_cli"), repeat) - interpreter_seconds, 0.0)
+    if import_seconds > budget_seconds:
+        print(f"run_cli import time {import_seconds:.4f}s is over the budget of {budget_seconds:.4f}s", file=sys.stderr)
+
+    return [make_result("import", 0, import_seconds, module="run_cli", interpreter_seconds=round(interpreter_seconds, 6),
+                        budget_seconds=budget_seconds, within_budget=import_seconds <= budget_seconds)]
+
+
+def benchmark_parse(playlist_file_path: str, entries: int, repeat: int) -> list[dict]:
+    """ Time PlaylistParser.parse_playlist with every parser backend.
+    The memory held by the parsed tracks is measured too, next to the memory of the same tracks in a list[Track].
+    """
+
+    results: list[dict] = []
+    for parser_backend in PARSER_BACKENDS:
+        seconds: float = time_best_of(lambda: PlaylistParser(playlist_file_path, parser_backend).parse_playlist(), repeat)
+        track_table_bytes: int = measure_memory(lambda: get_parsed_tracks(playlist_file_path, parser_backend))
+        track_list_bytes: int = measure_memory(lambda: list(PlaylistParser(playlist_file_path, parser_backend).iter_tracks()))
+        results.append(make_result("parse", entries, seconds, parser_backend=parser_backend,
+                                   track_table_bytes=track_table_bytes, track_list_bytes=track_list_bytes))
+
+    return results
+
+
+# Reason: The copy and tag stages are timed on their own, without the rest of the export loop.
+# pylint: disable=protected-access
+def benchmark_export_stages(playlist_file_path: str,
+                            entries: int,
+                            output_directory: str,
+                            repeat: int,
+                            tagging_processes: list[int]) -> list[dict]:
+    """ Time PlaylistToAlbumExporter._copy_track and _set_track_file_metadata separately, then a whole export.
+    Tagging is timed on process pools of the given sizes too, including the start of the processes.
+    """
+
+    config: PlaylistExporterConfiguration = make_config(playlist_file_path, output_directory)
+    parser = PlaylistParser(playlist_file_path)
+    parser.parse_playlist()
+    tracks: list[Track] = [track for track in parser.get_tracks() if track.file_size is not None]
+    tracks_len: int = len(parser.get_tracks())
+
+    def reset_output_directory():
+        shutil.rmtree(output_directory, ignore_errors=True)
+        os.makedirs(output_directory)
+
+    exporter = PlaylistToAlbumExporter(config)
+    exported_file_paths: list[str] = []
+
+    def copy_tracks():
+        exported_file_paths.clear()
+        for track in tracks:
+            exported_file_paths.append(exporter._copy_track(track.order - 1, tracks_len, track, track.abs_file_path))
+
+    def tag_tracks():
+        for track, exported_file_path in zip(tracks, exported_file_paths):
+            exporter._set_track_file_metadata(exported_file_path, track.order)
+
+    def tag_tracks_on_processes(processes: int):
+        tagger = ProcessPoolTagger(processes, 32, lambda result: None)
+        for track, exported_file_path in zip(tracks, exported_file_paths):
+            tagger.submit(exported_file_path, exporter._get_track_metadata(track.order))
+        tagger.close()
+
+    def export_album():
+        album_exporter = PlaylistToAlbumExporter(config)
+        album_exporter.parse_playlist()
+        album_exporter.export_album()
+
+    copy_seconds: float = time_best_of(copy_tracks, repeat, reset_output_directory)
+    tag_seconds: float = time_best_of(tag_tracks, repeat)
+    tag_processes_seconds: dict[int, float] = {
+        processes: time_best_of(lambda processes=processes: tag_tracks_on_processes(processes), repeat)
+        for processes in tagging_processes
+    }
+    export_seconds: float = time_best_of(export_album, repeat, reset_output_directory)
+    shutil.rmtree(output_directory, ignore_errors=True)
+
+    return [
+        make_result("copy", len(tracks), copy_seconds),
+        make_result("tag", len(tracks), tag_seconds),
+        *(make_result("tag_processes", len(tracks), seconds, processes=processes)
+          for processes, seconds in tag_processes_seconds.items()),
+        make_result("export_album", entries, export_seconds)
+    ]
+
+
+def benchmark_track_overhead(playlist_file_path: str, entries: int, output_directory: str, repeat: int) -> list[dict]:
+    """ Time the per-track work of the export loop without the file I/O: the copy and tag stages are no-ops.
+    Logging is enabled at INFO level, into a handler that formats every record into memory, like in a CLI run.
+    """
+
+    exporter = PlaylistToAlbumExporter(make_config(playlist_file_path, output_directory))
+    tracks: TrackTable = get_parsed_tracks(playlist_file_path, "stream")
+    tracks_len: int = len(tracks)
+    exporter._copy_track = lambda track_index, tracks_len, track, copy_source_file_path: \
+        exporter._get_output_file_abs_path(track, tracks_len)
+    exporter._set_track_file_metadata = lambda file_abs_path, track_order: 0.0
+
+    def export_tracks():
+        for track_index, track in enumerate(tracks):
+            exporter._export_track(track_index, tracks_len, track)
+
+    disabled_level: int = logging.root.manager.disable
+    root_level: int = logging.root.level
+    log_handler = logging.StreamHandler(io.StringIO())
+    log_handler.setFormatter(logging.Formatter("%(levelname)s|%(name)s: %(message)s"))
+    logging.disable(logging.NOTSET)
+    logging.root.setLevel(logging.INFO)
+    logging.root.addHandler(log_handler)
+    try:
+        seconds: float = time_best_of(export_tracks, repeat, lambda: log_handler.setStream(io.StringIO()))
+    finally:
+        logging.root.removeHandler(log_handler)
+        logging.root.setLevel(root_level)
+        logging.disable(disabled_level)
+
+    return [make_result("track_overhead", entries, seconds, microseconds_per_track=round(seconds / entries * 1e6, 3))]
+# pylint: enable=protected-access
+
+
+def compare_results(results: dict, previous_results: dict):
+    """ Print the speed ratio of every benchmark against a previous results file. """
+
+    def key(result: dict) -> tuple:
+        return (result["benchmark"], result["entries"], result.get("module"), result.get("parser_backend"),
+                result.get("processes"))
+
+    previous_seconds: dict[tuple, float] = {key(result): result["seconds"] for result in previous_results["results"]}
+    print(f"Compared to commit {previous_results.get('commit')}:")
+    for result in results["results"]:
+        if key(result) in previous_seconds and result["seconds"] > 0:
+            speedup: float = previous_seconds[key(result)] / result["seconds"]
+            print(f"  {' '.join(str(part) for part in key(result) if part is not None):<30} "
+                  f"{previous_seconds[key(result)]:>10.4f}s -> {result['seconds']:>10.4f}s  x{speedup:.2f}")
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    """ Generate the synthetic library and playlists, run every benchmark. """
+
+    work_directory: str = args.work_directory or tempfile.mkdtemp(prefix="m3u8_exporter_benchmark_")
+    library_file_paths: list[str] = make_library(os.path.join(work_directory, "library"), args.library_size)
+
+    results: list[dict] = benchmark_import(args.repeat, args.import_budget)
+    for entries in sorted(set(args.parse_sizes) | set(args.export_sizes) | set(args.overhead_sizes)):
+        playlist_file_path: str = os.path.join(work_directory, f"playlist_{entries}.m3u8")
+        make_playlist(playlist_file_path, library_file_paths, entries)
+        if entries in args.overhead_sizes:
+            results += benchmark_track_overhead(playlist_file_path, entries,
+                                                os.path.join(work_directory, f"album_{entries}"), args.repeat)
+        if entries in args.parse_sizes:
+            results += benchmark_parse(playlist_file_path, entries, args.repeat)
+        if entries in args.export_sizes:
+            results += benchmark_export_stages(playlist_file_path, entries,
+                                               os.path.join(work_directory, f"album_{entries}"), args.repeat,
+                                               args.tagging_processes)
+
+    if args.work_directory is None:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    return {
+        "commit": get_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "library_size": args.library_size,
+        "repeat": args.repeat,
+        "results": results
+    }
+
+
+def get_args_parser() -> argparse.ArgumentParser:
+    """ Get the benchmark runner's argparse object. """
+
+    parser = argparse.ArgumentParser(description="Benchmark the playlist exporter on a synthetic library.")
+    parser.add_argument("--output", help="Path of the .json results file. Printed to stdout if not given.")
+    parser.add_argument("--compare", help="Path of a previous .json results file to compare with.")
+    parser.add_argument("--work-directory", help="Directory for the generated files. A temporary one by default.")
+    parser.add_argument("--library-size", type=int, default=400, help="Number of audio files in the library.")
+    parser.add_argument("--parse-sizes", type=int, nargs="*", default=[100, 1000, 10000, 100000],
+                        help="Playlist sizes of the parse benchmark.")
+    parser.add_argument("--export-sizes", type=int, nargs="*", default=[100, 1000],
+                        help="Playlist sizes of the copy, tag and whole export benchmarks.")
+    parser.add_argument("--overhead-sizes", type=int, nargs="*", default=[100000],
+                        help="Playlist sizes of the per-track export loop overhead benchmark.")
+    parser.add_argument("--tagging-processes", type=int, nargs="*", default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="Process pool sizes of the process pool tagging benchmark.")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_TIME_BUDGET_SECONDS,
+                        help="Target of the run_cli import time in seconds, a warning is printed if it is exceeded.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the fastest one is reported.")
+
+    return parser
+
+
+if __name__ == "__main__":
+    benchmark_args: argparse.Namespace = get_args_parser().parse_args()
+    # Missing files are logged as errors on purpose, logging would dominate the measured time.
+    logging.disable(logging.CRITICAL)
+
+    benchmark_results: dict = run_benchmarks(benchmark_args)
+
+    if benchmark_args.output:
+        with open(benchmark_args.output, "w", encoding="utf-8") as results_file:
+            json.dump(benchmark_results, results_file, indent=1)
+    else:
+        print(json.dumps(benchmark_results, indent=1))
+
+    if benchmark_args.compare:
+        with open(benchmark_args.compare, "r", encoding="utf-8") as previous_results_file:
+            compare_results(benchmark_results, json.load(previous_results_file))
@@ -0,0 +1,143 @@
+""" Synthetic music library and .m3u8 playlist generator for the benchmarks. """
+
+import argparse
+import os
+import random
+import struct
+import uuid
+import wave
+from pathlib import PosixPath, WindowsPath
+from urllib.parse import quote
+
+AUDIO_FORMATS: tuple[str, ...] = (".mp3", ".flac", ".wav", ".wma")
+
+
+def _asf_guid(guid: str) -> bytes:
+    """ ASF GUIDs are stored in little endian field order. """
+
+    return uuid.UUID(guid).bytes_le
+
+
+def make_mp3(file_path: str|PosixPath|WindowsPath, frames: int = 40, with_id3: bool = True):
+    """ Write an MPEG-1 Layer III file of silent 128 kbps, 44.1 kHz frames, optionally with an ID3v2.3 tag. """
+
+    frame: bytes = b"\xff\xfb\x90\x64" + b"\x00" * 413
+    id3_tag: bytes = b""
+    if with_id3:
+        title: bytes = b"\x03" + os.path.basename(str(file_path)).encode("utf-8")
+        title_frame: bytes = b"TIT2" + len(title).to_bytes(4, "big") + b"\x00\x00" + title
+        id3_tag = b"ID3\x03\x00\x00" + bytes((len(title_frame) >> shift) & 0x7f for shift in (21, 14, 7, 0)) + title_frame
+
+    with open(file_path, "wb") as file:
+        file.write(id3_tag + frame * frames)
+
+
+def make_flac(file_path: str|PosixPath|WindowsPath, payload_size: int = 4096):
+    """ Write a FLAC file with a STREAMINFO block and a dummy audio payload. """
+
+    sample_rate: int = 44100
+    total_samples: int = sample_rate
+    stream_info: bytes = struct.pack(">HH", 4096, 4096) + b"\x00" * 6
+    # 20 bit sample rate, 3 bit channels - 1, 5 bit bits per sample - 1, 36 bit total samples
+    stream_info += ((sample_rate << 44) | (1 << 41) | (15 << 36) | total_samples).to_bytes(8, "big") + b"\x00" * 16
+
+    with open(file_path, "wb") as file:
+        file.write(b"fLaC" + b"\x80" + len(stream_info).to_bytes(3, "big") + stream_info)
+        file.write(b"\xff\xf8" + b"\x00" * payload_size)
+
+
+def make_wav(file_path: str|PosixPath|WindowsPath, frames: int = 8000):
+    """ Write a silent 8 kHz, 16 bit mono PCM .wav file. """
+
+    with wave.open(str(file_path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(8000)
+        wav_file.writeframes(b"\x00\x00" * frames)
+
+
+def make_wma(file_path: str|PosixPath|WindowsPath, payload_size: int = 4096):
+    """ Write an ASF file with a header object holding file and audio stream properties, and a data object. """
+
+    file_properties: bytes = b"\x00" * 16 + struct.pack("<QQQQQQIIII", 0, 0, 1, 30_000_000, 30_000_000, 0, 2, 0, 0, 128000)
+    file_properties = _asf_guid("8CABDCA1-A947-11CF-8EE4-00C00C205365") + struct.pack("<Q", 24 + len(file_properties)) \
+        + file_properties
+
+    wave_format: bytes = struct.pack("<HHIIHHH", 0x161, 2, 44100, 16000, 2, 16, 0)
+    stream_properties: bytes = _asf_guid("F8699E40-5B4D-11CF-A8FD-00805F5C442B") \
+        + _asf_guid("20FB5700-5B55-11CF-A8FD-00805F5C442B") \
+        + struct.pack("<QIIHI", 0, len(wave_format), 0, 1, 0) + wave_format
+    stream_properties = _asf_guid("B7DC0791-A9B7-11CF-8EE6-00C00C205365") \
+        + struct.pack("<Q", 24 + len(stream_properties)) + stream_properties
+
+    header_objects: bytes = file_properties + stream_properties
+    header: bytes = _asf_guid("75B22630-668E-11CF-A6D9-00AA0062CE6C") \
+        + struct.pack("<QIBB", 30 + len(header_objects), 2, 1, 2) + header_objects
+    data: bytes = _asf_guid("75B22636-668E-11CF-A6D9-00AA0062CE6C") \
+        + struct.pack("<Q", 50 + payload_size) + b"\x00" * 16 + struct.pack("<QH", 0, 0x0101) + b"\x00" * payload_size
+
+    with open(file_path, "wb") as file:
+        file.write(header + data)
+
+
+def make_library(library_directory: str|PosixPath|WindowsPath, library_size: int, seed: int = 0) -> list[str]:
+    """ Create a library of tiny, valid audio files, spread over artist folders with spaces and accents in their names.
+    Returns the absolute paths of the created files.
+    """
+
+    makers = {".mp3": make_mp3, ".flac": make_flac, ".wav": make_wav, ".wma": make_wma}
+    randomizer = random.Random(seed)
+    file_paths: list[str] = []
+    for file_index in range(library_size):
+        artist_directory: str = os.path.join(os.path.abspath(library_directory), f"Artist {file_index % 50:02d} & Bänd")
+        os.makedirs(artist_directory, exist_ok=True)
+        extension: str = AUDIO_FORMATS[file_index % len(AUDIO_FORMATS)]
+        file_path: str = os.path.join(artist_directory, f"{randomizer.randint(1, 20):02d} - Song #{file_index}{extension}")
+        makers[extension](file_path)
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def make_playlist(playlist_file_path: str|PosixPath|WindowsPath,
+                  library_file_paths: list[str],
+                  entries: int,
+                  relative_uri_ratio: float = 0.2,
+                  missing_file_ratio: float = 0.02,
+                  seed: int = 0):
+    """ Write an .m3u8 playlist of the given number of entries, picked from the library with repetition.
+
+    Entries are a mix of percent-encoded absolute 'file:///' uris, uris relative to the playlist's folder,
+    and uris of files that do not exist.
+    """
+
+    randomizer = random.Random(seed)
+    playlist_directory: str = os.path.dirname(os.path.abspath(playlist_file_path))
+    lines: list[str] = ["#EXTM3U"]
+    for entry_index in range(entries):
+        file_path: str = randomizer.choice(library_file_paths)
+        duration: int = randomizer.randint(60, 600)
+        lines.append(f"#EXTINF:{duration},Artist - {os.path.basename(file_path)}")
+
+        roll: float = randomizer.random()
+        if roll < missing_file_ratio:
+            lines.append("file:///" + quote(file_path.replace("Song #", f"Missing #{entry_index} ")))
+        elif roll < missing_file_ratio + relative_uri_ratio:
+            lines.append(quote(os.path.relpath(file_path, playlist_directory).replace(os.sep, "/")))
+        else:
+            lines.append("file:///" + quote(file_path.replace(os.sep, "/")))
+
+    with open(playlist_file_path, "w", encoding="utf-8") as playlist_file:
+        playlist_file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic music library and .m3u8 playlists.")
+    parser.add_argument("directory", help="Directory to create the library and playlists in.")
+    parser.add_argument("--library-size", type=int, default=400, help="Number of audio files in the library.")
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000], help="Playlist sizes to generate.")
+    args = parser.parse_args()
+
+    library: list[str] = make_library(os.path.join(args.directory, "library"), args.library_size)
+    for playlist_entries in args.entries:
+        make_playlist(os.path.join(args.directory, f"playlist_{playlist_entries}.m3u8"), library, playlist_entries)
@@ -0,0 +1,189 @@
+""" Writer of an exported album into a single .zip or .tar archive, streamed entry by entry. """
+
+import logging
+import os
+import time
+from pathlib import PosixPath, WindowsPath
+from typing import BinaryIO, TYPE_CHECKING
+
+from track_file_copier import TrackFileCopier, DEFAULT_BUFFER_SIZE
+
+if TYPE_CHECKING:
+    import tarfile
+    import zipfile
+
+ARCHIVE_EXTENSIONS: tuple[str, ...] = (".zip", ".tar")
+ARCHIVE_COMPRESSIONS: tuple[str, ...] = ("store", "deflate")
+
+# Entries of this size or larger need the zip64 extension, it has to be enabled before the entry is written.
+ZIP64_LIMIT: int = 0x7fffffff
+# The .zip format can not store earlier modification times.
+ZIP_MIN_DATE_TIME: tuple[int, ...] = (1980, 1, 1, 0, 0, 0)
+
+
+# Reason: tarfile only reads the entry file, the reader has no other methods to have.
+# pylint: disable-next=too-few-public-methods
+class _HeaderAndPayloadReader:
+    """ File-like reader of a header, followed by the rest of a file from its current position. """
+
+    _header: bytes = b""
+    _payload_file: BinaryIO = None
+
+    def __init__(self, header: bytes, payload_file: BinaryIO):
+        self._header = header
+        self._payload_file = payload_file
+
+    def read(self, size: int = -1) -> bytes:
+        """ Read from the header first, then from the payload file.
+        A read across the end of the header is filled from the payload, tarfile expects full sized reads.
+        """
+
+        if not self._header:
+            return self._payload_file.read(size)
+
+        header_chunk: bytes = self._header if size < 0 else self._header[:size]
+        self._header = self._header[len(header_chunk):]
+        if size < 0:
+            return header_chunk + self._payload_file.read()
+        if len(header_chunk) < size:
+            return header_chunk + self._payload_file.read(size - len(header_chunk))
+
+        return header_chunk
+
+
+class AlbumArchiveWriter:
+    """ Writer of an exported album into a single .zip or .tar archive, streamed entry by entry.
+
+    Every entry is a header (the rendered tag block of the track, or nothing), followed by the rest of an open file,
+    copied in buffer sized chunks, so the memory use does not grow with the file size.
+    Entries are stored uncompressed by default, audio files are compressed already. 'deflate' compresses .zip entries
+    and gzip compresses the whole .tar stream.
+
+    The archive is written to a .part file, and renamed to the archive path when it is closed without errors.
+    After a failed entry write, the archive is broken: no more entries are accepted, and it is removed when closed.
+    """
+
+    _logger: logging.Logger = None
+    _archive_path: str = None
+    _part_file_path: str = None
+    _compression: str = "store"
+    _buffer_size: int = DEFAULT_BUFFER_SIZE
+    _archive_file: "zipfile.ZipFile|tarfile.TarFile|None" = None
+    _is_broken: bool = False
+
+    def __init__(self,
+                 archive_path: str|PosixPath|WindowsPath,
+                 compression: str = "store",
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._logger = logging.getLogger("AlbumArchiveWriter")
+        self._archive_path = os.path.abspath(archive_path)
+        self._part_file_path = TrackFileCopier.get_part_file_path(self._archive_path)
+        self._compression = compression
+        self._buffer_size = buffer_size
+
+    def __enter__(self):
+        self.open()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._is_broken = True
+        self.close()
+
+    @staticmethod
+    def is_archive_path(output_path: str|PosixPath|WindowsPath|None) -> bool:
+        """ Check if an output path is an archive to export into, instead of a folder. """
+
+        return output_path is not None and str(output_path).lower().endswith(ARCHIVE_EXTENSIONS)
+
+    def is_broken(self) -> bool:
+        """ Check if an entry write failed, leaving the archive unusable. """
+
+        return self._is_broken
+
+    def open(self):
+        """ Start writing the archive's .part file. """
+
+        # Reason: The archive modules are slow to import, they are only needed for archive output.
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import tarfile
+        import zipfile
+        # pylint: enable=import-outside-toplevel,redefined-outer-name
+
+        os.makedirs(os.path.dirname(self._archive_path), exist_ok=True)
+        self._is_broken = False
+        if self._archive_path.lower().endswith(".zip"):
+            compression: int = zipfile.ZIP_DEFLATED if self._compression == "deflate" else zipfile.ZIP_STORED
+            # Reason: The archive stays open across the entry writes, until close() finishes it.
+            # pylint: disable-next=consider-using-with
+            self._archive_file = zipfile.ZipFile(self._part_file_path, "w", compression=compression, allowZip64=True)
+        else:
+            mode: str = "w|gz" if self._compression == "deflate" else "w|"
+            # Reason: The archive stays open across the entry writes, until close() finishes it.
+            # pylint: disable-next=consider-using-with
+            self._archive_file = tarfile.open(self._part_file_path, mode, copybufsize=self._buffer_size)
+
+    def add_entry(self, entry_name: str, payload_file: BinaryIO, payload_size: int, mtime: float, header: bytes = b""):
+        """ Write an entry: the header, then payload_size bytes of the payload file from its current position. """
+
+        # Reason: The archive modules are imported when the archive is opened, this only looks them up.
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import tarfile
+        import zipfile
+        # pylint: enable=import-outside-toplevel,redefined-outer-name
+
+        if self._is_broken:
+            raise OSError("The archive is broken by an earlier entry write error.")
+
+        try:
+            entry_size: int = len(header) + payload_size
+            if isinstance(self._archive_file, zipfile.ZipFile):
+                zip_info = zipfile.ZipInfo(entry_name, date_time=max(time.localtime(mtime)[:6], ZIP_MIN_DATE_TIME))
+                zip_info.compress_type = self._archive_file.compression
+                zip_info.file_size = entry_size
+                with self._archive_file.open(zip_info, "w", force_zip64=entry_size >= ZIP64_LIMIT) as entry_file:
+                    entry_file.write(header)
+                    self._copy_payload(payload_file, entry_file, payload_size)
+            else:
+                tar_info = tarfile.TarInfo(entry_name)
+                tar_info.size = entry_size
+                tar_info.mtime = int(mtime)
+                tar_info.mode = 0o644
+                self._archive_file.addfile(tar_info, _HeaderAndPayloadReader(header, payload_file))
+        except Exception:
+            self._is_broken = True
+
+            raise
+
+    def close(self):
+        """ Finish the archive and rename it into place, or remove it if it is broken. """
+
+        try:
+            if self._archive_file is not None:
+                self._archive_file.close()
+        except Exception as e:
+            self._logger.error("Archive close error: %s", e)
+            self._is_broken = True
+        finally:
+            self._archive_file = None
+
+        if self._is_broken:
+            self._logger.error("Archive is incomplete, removing it: %s", self._part_file_path)
+            if os.path.exists(self._part_file_path):
+                os.remove(self._part_file_path)
+
+            return
+
+        os.replace(self._part_file_path, self._archive_path)
+
+    def _copy_payload(self, payload_file: BinaryIO, entry_file: BinaryIO, payload_size: int):
+        """ Copy exactly payload_size bytes in buffer sized chunks. A file that changed size is an error. """
+
+        remaining_bytes: int = payload_size
+        while remaining_bytes > 0:
+            chunk: bytes = payload_file.read(min(self._buffer_size, remaining_bytes))
+            if not chunk:
+                raise OSError("Unexpected end of the file, it changed while it was archived.")
+            entry_file.write(chunk)
+            remaining_bytes -= len(chunk)
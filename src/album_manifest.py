@@ -0,0 +1,103 @@
+""" Manifest of an exported album, used to re-export only the changed tracks. """
+
+import json
+import logging
+import os
+import threading
+from pathlib import PosixPath, WindowsPath
+from typing import NamedTuple
+
+
+class AlbumManifestEntry(NamedTuple):
+    """ Exported track descriptor tuple, as stored in the manifest. """
+    source_path: str
+    size: int
+    mtime: float
+    order: int
+    file_name: str
+    tags: dict[str, str]
+
+
+class AlbumManifest:
+    """ Manifest of an exported album, stored as a .json file in the album's output directory.
+
+    Holds the source file state, playlist order, exported filename and applied tags of every exported track.
+    An exported file, whose tagging failed, is saved without tags, so the next incremental export tags it again.
+    """
+
+    MANIFEST_FILE_NAME: str = ".album_manifest.json"
+    MANIFEST_VERSION: int = 1
+
+    _logger: logging.Logger = None
+    _manifest_file_path: str|PosixPath|WindowsPath = None
+    _entries: list[AlbumManifestEntry] = None
+    _entries_lock: threading.Lock = None
+    _untagged_file_names: set[str] = None
+
+    def __init__(self, output_directory: str|PosixPath|WindowsPath):
+        self._logger = logging.getLogger("AlbumManifest")
+        self._manifest_file_path = os.path.join(output_directory, self.MANIFEST_FILE_NAME)
+        self._entries = []
+        self._entries_lock = threading.Lock()
+        self._untagged_file_names = set()
+
+    def load(self) -> list[AlbumManifestEntry]:
+        """ Read the entries of the previous export. Returns an empty list if there is no usable manifest. """
+
+        if not os.path.isfile(self._manifest_file_path):
+            self._logger.info("No album manifest found, exporting every track.")
+
+            return []
+
+        try:
+            with open(self._manifest_file_path, "r", encoding="utf-8") as file:
+                manifest: dict = json.load(file)
+
+            if manifest.get("version") != self.MANIFEST_VERSION:
+                self._logger.warning("Album manifest version mismatch, exporting every track.")
+
+                return []
+
+            return [AlbumManifestEntry(**entry) for entry in manifest["tracks"]]
+
+        except Exception as e:
+            self._logger.error("Album manifest load error, exporting every track: %s", e)
+
+            return []
+
+    def add_entry(self, entry: AlbumManifestEntry):
+        """ Record an exported track. Thread safe. """
+
+        with self._entries_lock:
+            self._entries.append(entry)
+
+    def discard_tags(self, file_name: str):
+        """ Record that the tags of an exported file could not be set, its entry is saved without tags.
+        The entry may be added before or after this call. Thread safe.
+        """
+
+        with self._entries_lock:
+            self._untagged_file_names.add(file_name)
+
+    def save(self):
+        """ Write the recorded entries, ordered by playlist order.
+        The manifest is written to a temporary file first and renamed over the old one.
+        """
+
+        with self._entries_lock:
+            entries = sorted((entry._replace(tags={}) if entry.file_name in self._untagged_file_names else entry
+                              for entry in self._entries), key=lambda entry: entry.order)
+
+        manifest: dict = {
+            "version": self.MANIFEST_VERSION,
+            "tracks": [entry._asdict() for entry in entries]
+        }
+
+        temporary_file_path: str = self._manifest_file_path + ".tmp"
+        try:
+            with open(temporary_file_path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, indent=1, ensure_ascii=False)
+            os.replace(temporary_file_path, self._manifest_file_path)
+            self._logger.debug("Album manifest saved with %s tracks.", len(entries))
+        except Exception as e:
+            self._logger.error("Album manifest save error: %s", e)
@@ -0,0 +1,172 @@
+""" Exporter of a playlist into a single .zip or .tar archive, instead of an album folder. """
+
+import os.path
+import time
+import uuid
+from typing import BinaryIO
+
+from album_archive_writer import AlbumArchiveWriter
+from album_manifest import AlbumManifestEntry
+from file_metadata_setter import FileMetadataSetter
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from track import Track
+
+
+# Reason: The exporter overrides how the base exporter exports the tracks, it adds one public method of its own.
+# pylint: disable-next=too-few-public-methods
+class ArchivePlaylistToAlbumExporter(PlaylistToAlbumExporter):
+    """ Exporter of a playlist into a single .zip or .tar archive, instead of an album folder.
+
+    The output directory is the path of the archive. The tracks are streamed into it one by one, in playlist order,
+    with the same names as in an album folder. The tag block of .mp3 and .flac files is rendered in memory and written
+    in front of the untouched audio payload, so every track is read once and written once.
+    Other formats are copied and tagged in a temporary file next to the archive first.
+
+    Tracks are added to the archive one at a time, the workers, engine and incremental export settings do not apply.
+    """
+
+    _archive_entry_names: set[str] = None
+    _is_archive_failed: bool = False
+
+    def export_album(self) -> bool:
+        """ Export the loaded tracks into the archive. Returns False if the archive could not be written. """
+
+        return super().export_album() and not self._is_archive_failed
+
+    def _get_planned_manifest_entries(self) -> dict[str, list[AlbumManifestEntry]]:
+        """ Every track is planned as a new member of the archive, there is no previous export to plan against. """
+
+        if self._config.incremental:
+            self._logger.warning("Incremental export is not supported with archive output, planning every track.")
+
+        return {}
+
+    def _copy_and_set_metadata(self):
+        """ Stream the loaded tracks into the archive. """
+
+        if self._config.incremental:
+            self._logger.warning("Incremental export is not supported with archive output, exporting every track.")
+
+        tracks_len, tracks_to_export = self._get_tracks_to_export()
+        if self._track_transcoder is not None:
+            tracks_to_export = self._transcode_tracks(tracks_to_export, tracks_len)
+
+        self._logger.info("Exporting album %s into archive %s", self._config.album_name, self._config.output_directory)
+        self._archive_entry_names = set()
+        self._is_archive_failed = False
+        try:
+            with AlbumArchiveWriter(self._config.output_directory,
+                                    self._config.archive_compression,
+                                    self._config.copy.buffer_size) as archive_writer:
+                for track_index, track in tracks_to_export:
+                    self._export_track_to_archive(archive_writer, track_index, tracks_len, track)
+                    if archive_writer.is_broken():
+                        self._logger.critical("Archive write error, the archive is not created.")
+                        self._is_archive_failed = True
+                        break
+        except OSError as e:
+            self._logger.critical("Archive error, the archive is not created: %s", e)
+            self._is_archive_failed = True
+
+    def _export_track_to_archive(self,
+                                 archive_writer: AlbumArchiveWriter,
+                                 track_index: int,
+                                 tracks_len: int,
+                                 track: Track):
+        """ Write a single track into the archive, with its metadata set. """
+
+        stage_start: float = time.perf_counter()
+        is_source_file: bool = self._context.source_file_cache.is_file(track.abs_file_path)
+        if not self._start_track_export(track_index, tracks_len, track, is_source_file, time.perf_counter() - stage_start):
+            return
+
+        stage_start = time.perf_counter()
+        entry_name: str = self._get_output_file_name(track, tracks_len)
+        if entry_name in self._archive_entry_names:
+            self._logger.warning("Name collision, the archive holds more than one %s", entry_name)
+        copy_source_file_path: str|None = None
+        is_exported: bool = False
+        try:
+            copy_source_file_path = self._get_copy_source(track)
+            entry_size: int = self._add_track_entry(archive_writer, entry_name, copy_source_file_path, track_index, track)
+            self._archive_entry_names.add(entry_name)
+            self._increment_stat("exported_tracks")
+            self._increment_stat("copied_bytes", entry_size)
+            is_exported = True
+
+        except Exception as e:
+            self._logger.error("Track archive error: %s", e)
+            self._increment_stat("copy_error_tracks")
+
+        if copy_source_file_path is not None:
+            self._update_copy_cache(track, copy_source_file_path, is_exported, False)
+
+        self._add_track_latency("copy", time.perf_counter() - stage_start, track_index + 1)
+
+    def _add_track_entry(self,
+                         archive_writer: AlbumArchiveWriter,
+                         entry_name: str,
+                         copy_source_file_path: str,
+                         track_index: int,
+                         track: Track) -> int:
+        """ Write the track's entry into the archive: its rendered tag block, followed by its audio payload.
+        Formats without a tag block renderer are tagged in a copy first. Returns the size of the archive entry.
+        """
+
+        with open(copy_source_file_path, "rb") as source_file:
+            tagged_header: tuple[bytes, int]|None = (b"", 0)
+            if self._config.set_file_metadata:
+                tagged_header = self._render_tagged_header(source_file, track_index, track)
+
+            if tagged_header is not None:
+                header, payload_offset = tagged_header
+                payload_size: int = os.fstat(source_file.fileno()).st_size - payload_offset
+                source_file.seek(payload_offset)
+                archive_writer.add_entry(entry_name,
+                                         source_file,
+                                         payload_size,
+                                         os.path.getmtime(copy_source_file_path),
+                                         header)
+
+                return len(header) + payload_size
+
+        return self._add_tagged_copy_to_archive(archive_writer, entry_name, copy_source_file_path, track_index)
+
+    def _render_tagged_header(self, source_file: BinaryIO, track_index: int, track: Track) -> tuple[bytes, int]|None:
+        """ Render the track's tag block. A tagging error exports the track untagged.
+        Returns None if the format can only be tagged in a copy of the file.
+        """
+
+        try:
+            return FileMetadataSetter.render_tagged_header(source_file,
+                                                           os.path.splitext(track.file_name)[1],
+                                                           self._get_track_metadata(track_index + 1))
+        except Exception as e:
+            self._logger.error("Media file metadata setting error: %s", e)
+            self._increment_stat("file_media_metadata_errors")
+            source_file.seek(0)
+
+            return b"", 0
+
+    def _add_tagged_copy_to_archive(self,
+                                    archive_writer: AlbumArchiveWriter,
+                                    entry_name: str,
+                                    copy_source_file_path: str,
+                                    track_index: int) -> int:
+        """ Copy the track to a temporary file next to the archive, tag it there, and write the copy into the archive.
+        Returns the size of the archive entry.
+        """
+
+        temporary_file_path: str = os.path.join(os.path.dirname(os.path.abspath(self._config.output_directory)),
+                                                f".{uuid.uuid4().hex}{os.path.splitext(entry_name)[1]}")
+        try:
+            self._track_file_copier.copy(copy_source_file_path, temporary_file_path, allow_hardlink=False)
+            self._set_track_file_metadata(temporary_file_path, track_index + 1)
+            with open(temporary_file_path, "rb") as temporary_file:
+                entry_size: int = os.fstat(temporary_file.fileno()).st_size
+                archive_writer.add_entry(entry_name, temporary_file, entry_size, os.path.getmtime(copy_source_file_path))
+
+            return entry_size
+        finally:
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
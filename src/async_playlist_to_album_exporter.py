@@ -0,0 +1,263 @@
+""" asyncio based exporter engine, for source and output folders on high latency network storage. """
+
+import asyncio
+import functools
+import os.path
+import shutil
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import PosixPath, WindowsPath
+from typing import Any, NamedTuple
+
+from export_context import ExportContext
+from playlist_exporter_configuration import PlaylistExporterConfiguration
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from track_file_copier import TrackFileCopier
+from track import Track
+
+
+class _TrackHosts(NamedTuple):
+    """ Operation limits of the storage hosts of a track's source file and of the album folder. """
+    source: asyncio.Semaphore
+    output: asyncio.Semaphore
+
+
+# Reason: The engine overrides how the base exporter exports the tracks, it adds no public methods of its own.
+# pylint: disable-next=too-few-public-methods
+class AsyncPlaylistToAlbumExporter(PlaylistToAlbumExporter):
+    """ asyncio based exporter engine, for source and output folders on high latency network storage.
+
+    Up to 'concurrency' tracks are exported at once. Every blocking file operation of a track (stat, open, read,
+    write, close, tag) runs on an executor thread, so the operations of many tracks overlap, and the plain copy
+    reads the next chunk of a file while the previous one is written.
+    Operations on the same storage host (UNC server, drive or mount point) are capped at 'per_host_concurrency'.
+
+    Parsing, incremental export and the statistics are the same as in the sync engine.
+    """
+
+    _io_executor: Executor|None = None
+    _io_latency: float = 0.0
+    _host_semaphores: dict[str, asyncio.Semaphore] = None
+    _storage_hosts: dict[str, str] = None
+
+    def __init__(self, config: PlaylistExporterConfiguration, context: ExportContext|None = None, io_latency: float = 0.0):
+        """ The blocking file operations run on the context's executor, or on an own one with a thread per track.
+        io_latency is an artificial delay in seconds, added to every file operation to test with a local folder,
+        as if it was on network storage.
+        """
+
+        super().__init__(config, context)
+        self._io_latency = io_latency
+        self._host_semaphores = {}
+        self._storage_hosts = {}
+
+    def _export_tracks(self, tracks: Iterable[tuple[int, Track]], tracks_len: int):
+        """ Export the tracks on an event loop. """
+
+        self._logger.info("Exporting tracks with the async engine, %s tracks at once.", self._config.engine.concurrency)
+        if self._context.executor is not None:
+            self._io_executor = self._context.executor
+            asyncio.run(self._export_tracks_async(tracks, tracks_len))
+        else:
+            with ThreadPoolExecutor(max_workers=self._config.engine.concurrency, thread_name_prefix="AsyncExportIO") as executor:
+                self._io_executor = executor
+                asyncio.run(self._export_tracks_async(tracks, tracks_len))
+
+        self._io_executor = None
+
+    async def _export_tracks_async(self, tracks: Iterable[tuple[int, Track]], tracks_len: int):
+        """ Start a task per track, with at most 'concurrency' unfinished tasks, and wait for all of them to finish. """
+
+        self._host_semaphores = {}
+        tracks_in_flight: asyncio.Semaphore = asyncio.Semaphore(self._config.engine.concurrency)
+        track_tasks: set[asyncio.Task] = set()
+        track_errors: list[BaseException] = []
+
+        def on_track_done(task: asyncio.Task):
+            tracks_in_flight.release()
+            track_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                track_errors.append(task.exception())
+
+        # The streaming parser reads the playlist and the source folders while iterating, off the event loop too.
+        track_iterator: Iterator[tuple[int, Track]] = iter(tracks)
+        while not track_errors:
+            await tracks_in_flight.acquire()
+            next_track: tuple[int, Track]|None = await self._run_blocking(None, next, track_iterator, None)
+            if next_track is None:
+                break
+
+            track_index, track = next_track
+            track_task: asyncio.Task = asyncio.create_task(self._export_track_async(track_index, tracks_len, track))
+            track_tasks.add(track_task)
+            track_task.add_done_callback(on_track_done)
+
+        if track_tasks:
+            await asyncio.wait(set(track_tasks))
+        if track_errors:
+            raise track_errors[0]
+
+    async def _export_track_async(self, track_index: int, tracks_len: int, track: Track):
+        """ Copy a single track into the album folder and set its metadata. """
+
+        hosts = _TrackHosts(await self._get_host_semaphore(track.abs_file_path),
+                            await self._get_host_semaphore(self._config.output_directory))
+
+        stage_start: float = time.perf_counter()
+        is_source_file: bool = await self._run_blocking(hosts.source, self._context.source_file_cache.is_file, track.abs_file_path)
+        stat_seconds: float = time.perf_counter() - stage_start
+        if not self._start_track_export(track_index, tracks_len, track, is_source_file, stat_seconds):
+            return
+
+        stage_start = time.perf_counter()
+        copy_source_file_path: str = await self._run_blocking(hosts.source, self._get_copy_source, track)
+        exported_track_file_abspath: str|bool|None = None
+        if self._config.tag_while_copying and self._config.set_file_metadata:
+            exported_track_file_abspath = await self._run_blocking(hosts.source,
+                                                                   self._copy_track_with_metadata,
+                                                                   track_index,
+                                                                   tracks_len,
+                                                                   track,
+                                                                   copy_source_file_path)
+
+        is_tagged_while_copying: bool = exported_track_file_abspath is not None
+        if not is_tagged_while_copying:
+            exported_track_file_abspath = await self._copy_track_async(track_index, tracks_len, track, copy_source_file_path, hosts)
+        await self._run_blocking(hosts.output,
+                                 self._update_copy_cache,
+                                 track,
+                                 copy_source_file_path,
+                                 exported_track_file_abspath,
+                                 not is_tagged_while_copying)
+        copy_seconds: float = time.perf_counter() - stage_start
+        self._add_track_latency("copy", copy_seconds, track_index + 1)
+
+        file_to_tag: str|None = self._get_file_to_tag(exported_track_file_abspath, track_index + 1, is_tagged_while_copying)
+        tag_seconds: float = 0.0 if file_to_tag is None \
+            else await self._run_blocking(hosts.output, self._set_track_file_metadata, file_to_tag, track_index + 1)
+
+        self._log_track_timings(track_index, tracks_len, track, (stat_seconds, copy_seconds, tag_seconds))
+        if exported_track_file_abspath:
+            await self._run_blocking(hosts.output,
+                                     self._register_exported_track,
+                                     track,
+                                     tracks_len,
+                                     exported_track_file_abspath)
+
+    async def _copy_track_async(self,
+                                track_index: int,
+                                tracks_len: int,
+                                track: Track,
+                                copy_source_file_path: str,
+                                hosts: "_TrackHosts") -> str|bool:
+        """ Copy the track with overlapped chunk reads and writes.
+
+        Other copy strategies are a single call, that the kernel or the file server completes on its own,
+        they run on the executor as they are. So do the copies under the limits of the I/O scheduler.
+        """
+
+        if self._config.copy.strategy != "copy" or self._context.io_scheduler.is_enabled():
+            return await self._run_blocking(hosts.source, self._copy_track, track_index, tracks_len, track,
+                                            copy_source_file_path)
+
+        self._logger.debug("Copying track %s/%s: %s", track_index + 1, tracks_len, track.title)
+        try:
+            output_file_abs_path: str = self._get_output_file_abs_path(track, tracks_len)
+            part_file_path: str = TrackFileCopier.get_part_file_path(output_file_abs_path)
+            copied_bytes: int = await self._copy_file_overlapped(copy_source_file_path, part_file_path, hosts)
+            await self._run_blocking(hosts.output, shutil.copystat, copy_source_file_path, part_file_path)
+            await self._run_blocking(hosts.output, os.replace, part_file_path, output_file_abs_path)
+            self._logger.debug("Track copy done with overlapped chunks.")
+            self._increment_stat("exported_tracks")
+            self._increment_stat("copied_bytes", copied_bytes)
+
+        except Exception as e:
+            return self._handle_track_copy_error(e)
+
+        return output_file_abs_path
+
+    async def _copy_file_overlapped(self, source_file_path: str, part_file_path: str, hosts: "_TrackHosts") -> int:
+        """ Copy the file chunk by chunk, reading the next chunk while the previous one is written.
+        Returns the number of copied bytes.
+        """
+
+        copy_buffer_size: int = self._config.copy.buffer_size
+        copied_bytes: int = 0
+        source_file = await self._run_blocking(hosts.source, open, source_file_path, "rb")
+        try:
+            part_file = await self._run_blocking(hosts.output, open, part_file_path, "wb")
+            try:
+                chunk: bytes = await self._run_blocking(hosts.source, source_file.read, copy_buffer_size)
+                while chunk:
+                    written_chunk, chunk = await self._gather_or_raise(
+                        self._run_blocking(hosts.output, part_file.write, chunk),
+                        self._run_blocking(hosts.source, source_file.read, copy_buffer_size)
+                    )
+                    copied_bytes += written_chunk
+            finally:
+                await self._run_blocking(hosts.output, part_file.close)
+        finally:
+            await self._run_blocking(hosts.source, source_file.close)
+
+        return copied_bytes
+
+    async def _run_blocking(self, host_semaphore: asyncio.Semaphore|None, function: Callable, *args) -> Any:
+        """ Run a blocking call on the executor, within the storage host's operation limit. """
+
+        blocking_call: Callable = functools.partial(function, *args)
+        if self._io_latency > 0:
+            blocking_call = functools.partial(self._call_with_latency, blocking_call)
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if host_semaphore is None:
+            return await loop.run_in_executor(self._io_executor, blocking_call)
+
+        async with host_semaphore:
+            return await loop.run_in_executor(self._io_executor, blocking_call)
+
+    def _call_with_latency(self, blocking_call: Callable) -> Any:
+        """ Hold the executor thread for the artificial latency, like a network round trip, then make the call. """
+
+        time.sleep(self._io_latency)
+
+        return blocking_call()
+
+    @staticmethod
+    async def _gather_or_raise(*coroutines) -> list:
+        """ Wait for every coroutine to finish, then raise the first error, if there is one. """
+
+        results: list = await asyncio.gather(*coroutines, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return results
+
+    async def _get_host_semaphore(self, file_path: str|PosixPath|WindowsPath) -> asyncio.Semaphore:
+        """ Get the operation limit of the storage host the file is on. """
+
+        directory_path: str = os.path.dirname(os.path.abspath(file_path))
+        storage_host: str|None = self._storage_hosts.get(directory_path)
+        if storage_host is None:
+            storage_host = await self._run_blocking(None, self._get_storage_host, directory_path)
+            self._storage_hosts[directory_path] = storage_host
+
+        if storage_host not in self._host_semaphores:
+            self._host_semaphores[storage_host] = asyncio.Semaphore(self._config.engine.per_host_concurrency)
+
+        return self._host_semaphores[storage_host]
+
+    @staticmethod
+    def _get_storage_host(directory_path: str) -> str:
+        """ Get the UNC server or drive of a Windows path, the mount point of a directory on other platforms. """
+
+        drive: str = os.path.splitdrive(directory_path)[0]
+        if drive:
+            return os.path.normcase(drive)
+
+        mount_point: str = directory_path
+        while not os.path.ismount(mount_point) and os.path.dirname(mount_point) != mount_point:
+            mount_point = os.path.dirname(mount_point)
+
+        return mount_point
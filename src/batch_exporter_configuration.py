@@ -0,0 +1,119 @@
+""" Class to load the album configurations of a batch export. """
+import logging
+import os.path
+from argparse import Namespace
+from pathlib import PosixPath, WindowsPath
+
+from playlist_exporter_configuration import PlaylistExporterConfiguration
+from utility.get_filename_without_extension import get_filename_without_extension
+
+
+class BatchExporterConfiguration:
+    """ Class to load the album configurations of a batch export from yaml or cli args.
+
+    A batch yaml file holds default values for every album, an 'albums' list of album configurations
+    and/or a 'playlist_directory', where every .m3u8 file is exported as an album named after the playlist file,
+    into its own folder in the 'output_directory'.
+    """
+
+    BATCH_ONLY_KEYS: tuple[str, ...] = ("albums", "playlist_directory", "batch_yaml_file_path", "yaml_file_path",
+                                        "stats_json", "plan", "watch", "profile", "trace_out")
+
+    _logger: logging.Logger = None
+    _album_configs: list[PlaylistExporterConfiguration] = None
+    _stats_json: str|None = None
+    _is_loaded: bool = False
+
+    def __init__(self):
+        self._logger = logging.getLogger("BatchExporterConfiguration")
+        self._album_configs = []
+
+    def is_loaded(self):
+        """ is_loaded prop getter """
+
+        return self._is_loaded
+
+    def get_album_configurations(self) -> list[PlaylistExporterConfiguration]:
+        """ Album configurations getter. """
+
+        return self._album_configs
+
+    def get_stats_json(self) -> str|None:
+        """ Getter of the path of the .json file to write the batch statistics to, None if not set. """
+
+        return self._stats_json
+
+    def load_yaml(self, yaml_abspath: str|PosixPath|WindowsPath):
+        """ Read the batch config values from a yaml file. """
+
+        self._logger.info("Loading batch configuration from .yaml file: %s", str(yaml_abspath))
+        config = PlaylistExporterConfiguration.read_yaml(yaml_abspath)
+        if not isinstance(config, dict):
+            self._logger.error("Invalid batch configuration, expected a mapping of values.")
+
+            return
+
+        self._load_albums(config)
+
+    def load_argparse_namespace(self, config: Namespace):
+        """ Read the batch config values from an argparse Namespace object when run in CLI mode. """
+
+        self._logger.info("Loading batch configuration from CLI args")
+        self._load_albums({key: value for key, value in vars(config).items() if value is not None})
+
+    def _load_albums(self, config: dict):
+        """ Load and validate every album configuration of the batch. """
+
+        self._stats_json = config.get("stats_json") or None
+        defaults: dict = {key: value for key, value in config.items() if key not in self.BATCH_ONLY_KEYS}
+        album_config_dicts: list[dict] = [defaults | album for album in config.get("albums") or []]
+
+        if config.get("playlist_directory") is not None:
+            album_config_dicts += self._get_playlist_directory_album_configs(config["playlist_directory"], defaults)
+
+        if not album_config_dicts:
+            self._logger.error("Batch configuration has no albums to export.")
+
+            return
+
+        self._album_configs = []
+        for album_config_dict in album_config_dicts:
+            album_config = PlaylistExporterConfiguration()
+            album_config.load_dict(album_config_dict)
+            if not album_config.is_loaded():
+                self._logger.error("Album configuration failed to load: %s", album_config_dict)
+
+                return
+
+            self._album_configs.append(album_config)
+
+        self._logger.info("Loaded %s album configurations.", len(self._album_configs))
+        self._is_loaded = True
+
+    def _get_playlist_directory_album_configs(self, playlist_directory: str, defaults: dict) -> list[dict]:
+        """ Get an album configuration for every .m3u8 playlist in the directory. """
+
+        if defaults.get("output_directory") is None:
+            self._logger.error("Playlist directory export needs an output directory for the album folders.")
+
+            return []
+
+        try:
+            playlist_file_names: list[str] = sorted(
+                file_name for file_name in os.listdir(playlist_directory) if file_name.lower().endswith(".m3u8")
+            )
+        except OSError as e:
+            self._logger.error("Playlist directory read error: %s", e)
+
+            return []
+
+        album_configs: list[dict] = []
+        for playlist_file_name in playlist_file_names:
+            album_name: str = get_filename_without_extension(playlist_file_name)
+            album_configs.append(defaults | {
+                "album_name": album_name,
+                "playlist_file_path": os.path.join(playlist_directory, playlist_file_name),
+                "output_directory": os.path.join(defaults["output_directory"], album_name)
+            })
+
+        return album_configs
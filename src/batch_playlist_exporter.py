@@ -0,0 +1,111 @@
+""" Exporter of multiple playlists as albums in one run. """
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from exporter_stats import ExporterStats
+from export_plan import ExportPlan
+from playlist_exporter_configuration import PlaylistExporterConfiguration
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from shared_export_context import SharedExportContext
+from trace_recorder import TraceRecorder
+
+
+class BatchPlaylistExporter:
+    """ Exporter of multiple playlists as albums in one run.
+
+    The albums are exported one after another, the track exports of every album run on one shared thread pool,
+    and the albums share the services of the shared export context.
+    """
+
+    _logger: logging.Logger = None
+    _album_configs: list[PlaylistExporterConfiguration] = None
+    _shared_context: SharedExportContext = None
+    _album_stats: list[tuple[str, ExporterStats]] = None
+
+    def __init__(self, album_configs: list[PlaylistExporterConfiguration], trace_recorder: TraceRecorder|None = None):
+        """ With a trace recorder, the spans of every album's export are recorded in it. """
+
+        self._logger = logging.getLogger("BatchPlaylistExporter")
+        self._album_configs = album_configs
+        self._shared_context = SharedExportContext(trace_recorder)
+        self._album_stats = []
+
+    def export_albums(self) -> bool:
+        """ Parse and export every album. Returns False if any of them failed. """
+
+        workers: int = max(
+            album_config.engine.concurrency if album_config.engine.name == "async" else album_config.engine.workers
+            for album_config in self._album_configs
+        )
+        albums_len: int = len(self._album_configs)
+        all_albums_exported: bool = True
+        self._album_stats = []
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TrackExport") as executor:
+            for album_index, album_config in enumerate(self._album_configs):
+                self._logger.info("Exporting album %s/%s: %s", album_index + 1, albums_len, album_config.album_name)
+                exporter: PlaylistToAlbumExporter = PlaylistToAlbumExporter.get_exporter_class(album_config)(
+                    album_config,
+                    self._shared_context.get_album_context(album_config, executor)
+                )
+                if not exporter.parse_playlist() or not exporter.export_album():
+                    self._logger.error("Album export failed: %s", album_config.album_name)
+                    all_albums_exported = False
+
+                self._album_stats.append((album_config.album_name, exporter.get_stats()))
+
+        self._shared_context.close()
+        self._logger.info("Batch export finished, statistics: %s", self.get_report())
+
+        return all_albums_exported
+
+    def plan_albums(self) -> list[ExportPlan]:
+        """ Parse and plan the export of every album, without exporting anything.
+        Albums whose playlist fails to load are left out of the returned plans.
+        """
+
+        export_plans: list[ExportPlan] = []
+        for album_config in self._album_configs:
+            exporter: PlaylistToAlbumExporter = PlaylistToAlbumExporter.get_exporter_class(album_config)(
+                album_config,
+                self._shared_context.get_album_context(album_config)
+            )
+            export_plan: ExportPlan|None = exporter.get_export_plan() if exporter.parse_playlist() else None
+            if export_plan is None:
+                self._logger.error("Album export planning failed: %s", album_config.album_name)
+                continue
+
+            export_plans.append(export_plan)
+
+        self._shared_context.close()
+
+        return export_plans
+
+    def get_total_stats(self) -> ExporterStats:
+        """ Get the summed statistics of every album. """
+
+        total_stats = ExporterStats()
+        for _, album_stats in self._album_stats:
+            total_stats += album_stats
+
+        return total_stats
+
+    def get_stats_dict(self) -> dict:
+        """ Get the statistics of every album and their total as a .json serializable dict. """
+
+        return {
+            "albums": [
+                {"album_name": album_name} | album_stats.to_dict() for album_name, album_stats in self._album_stats
+            ],
+            "total": self.get_total_stats().to_dict()
+        }
+
+    def get_report(self) -> str:
+        """ Get the statistics of every album and their total. """
+
+        report: str = ""
+        for album_name, album_stats in self._album_stats:
+            report += f"\nalbum '{album_name}': {album_stats}"
+
+        return report + f"\ntotal: {self.get_total_stats()}"
@@ -0,0 +1,384 @@
+""" Persistent, content addressed cache of source track files, shared by every export. """
+
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import PosixPath, WindowsPath
+from typing import Callable
+
+from io_scheduler import IoScheduler
+from track_file_copier import TrackFileCopier, DEFAULT_BUFFER_SIZE
+from utility.versioned_json_file import read_versioned_json, write_versioned_json
+
+
+# Reason: Fourteen is reasonable in this case, the cache settings, its index with the pins, and the background fills.
+# pylint: disable-next=too-many-instance-attributes
+class CopyCache:
+    """ Persistent, content addressed cache of source track files, shared by every export.
+
+    Source files are looked up by their path, size and modification time. On a miss, the track is exported from its
+    source, and the exported copy, before it is tagged, is cloned into the cache folder with reflink where the
+    filesystem supports it, else copied locally. Exports, whose output differs from the source file, fill the cache
+    from the source on a background thread. Later exports of the same file, in the same playlist, other albums
+    or later runs, read the local cached copy instead of the (possibly slow, remote) source.
+
+    With a content digest, cached files are named by the digest of their content, so identical files under different
+    paths are stored once. Without one, they are named after their path, size and modification time,
+    and the source is copied with the regular copy strategies.
+
+    The cache is capped at max_bytes, the least recently used files are removed first.
+    Cached files are pinned while a track is copied from them, pinned files are not removed.
+    """
+
+    INDEX_FILE_NAME: str = "copy_cache_index.json"
+    INDEX_VERSION: int = 1
+
+    _logger: logging.Logger = None
+    _cache_directory: str = None
+    _max_bytes: int = 0
+    _digest: str = "none"
+    _buffer_size: int = DEFAULT_BUFFER_SIZE
+    _track_file_copier: TrackFileCopier = None
+    _source_keys: dict[str, str] = None
+    _blob_source_keys: dict[str, set[str]] = None
+    _blob_sizes: OrderedDict[str, int] = None
+    _total_bytes: int = 0
+    _pins: dict[str, int] = None
+    _fill_executor: ThreadPoolExecutor|None = None
+    _fills: dict[str, Future] = None
+    _lock: threading.Lock = None
+
+    def __init__(self,
+                 cache_directory: str|PosixPath|WindowsPath,
+                 max_bytes: int,
+                 digest: str = "none",
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._logger = logging.getLogger("CopyCache")
+        self._cache_directory = os.path.abspath(cache_directory)
+        self._max_bytes = max_bytes
+        self._digest = self._get_available_digest(digest)
+        self._buffer_size = buffer_size
+        self._track_file_copier = TrackFileCopier("auto", buffer_size=buffer_size)
+        self._source_keys = {}
+        self._blob_source_keys = {}
+        self._blob_sizes = OrderedDict()
+        self._pins = {}
+        self._fills = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def get_cached_file(self, source_file_path: str|PosixPath|WindowsPath, size: int, mtime: float) -> str|None:
+        """ Get the path of the cached copy of a source file, None if it is not cached.
+        The cached copy is pinned until it is released with release_cached_file, it is not evicted while it is read.
+        """
+
+        source_key: str = self._get_source_key(source_file_path, size, mtime)
+        with self._lock:
+            blob_name: str|None = self._source_keys.get(source_key)
+            if blob_name is None:
+                return None
+
+            self._pins[blob_name] = self._pins.get(blob_name, 0) + 1
+
+        blob_path: str = self._get_blob_path(blob_name)
+        try:
+            if os.stat(blob_path).st_size == size:
+                with self._lock:
+                    if blob_name in self._blob_sizes:
+                        self._blob_sizes.move_to_end(blob_name)
+
+                return blob_path
+        except OSError:
+            pass
+
+        self._logger.debug("Cached copy is missing or changed, dropping it: %s", blob_path)
+        with self._lock:
+            self._unpin(blob_name)
+            self._remove_blob(blob_name)
+
+        return None
+
+    def release_cached_file(self, cached_file_path: str):
+        """ Unpin a cached copy returned by get_cached_file, once it is read. Other paths are ignored. """
+
+        with self._lock:
+            self._unpin(os.path.basename(cached_file_path))
+
+    def add_copy(self,
+                 source_file_path: str|PosixPath|WindowsPath,
+                 size: int,
+                 mtime: float,
+                 copy_file_path: str|PosixPath|WindowsPath) -> str|None:
+        """ Cache a source file from an unmodified copy of it, like a track exported before it is tagged,
+        instead of reading the source again. The copy is cloned with reflink where the filesystem supports it.
+        Returns the cached copy's path, None if the file can not be cached.
+        """
+
+        if size > self._max_bytes:
+            return None
+
+        source_key: str = self._get_source_key(source_file_path, size, mtime)
+        try:
+            os.makedirs(os.path.join(self._cache_directory, "blobs"), exist_ok=True)
+            if self._digest == "none":
+                blob_name: str = self._get_path_blob_name(source_key)
+                self._track_file_copier.copy(copy_file_path, self._get_blob_path(blob_name, create_directory=True), size)
+            else:
+                blob_name = f"{self._digest}-{self._hash_file(copy_file_path)}"
+                blob_path: str = self._get_blob_path(blob_name, create_directory=True)
+                if os.path.isfile(blob_path):
+                    self._logger.debug("Identical content is already cached: %s", source_file_path)
+                else:
+                    self._track_file_copier.copy(copy_file_path, blob_path, size)
+        except OSError as e:
+            self._logger.warning("Source file can not be cached: %s", e)
+
+            return None
+
+        return self._add_blob(source_key, blob_name, size)
+
+    def add_in_background(self,
+                          source_file_path: str|PosixPath|WindowsPath,
+                          size: int,
+                          mtime: float,
+                          io_scheduler: IoScheduler|None = None):
+        """ Copy a source file into the cache on the background thread, for exports whose output is not an unmodified
+        copy of the source. A source file, that is cached or being cached, is not copied again.
+        The copy reads the source within the admission and bandwidth limits of the export's I/O scheduler.
+        """
+
+        if size > self._max_bytes:
+            return
+
+        source_key: str = self._get_source_key(source_file_path, size, mtime)
+        with self._lock:
+            if source_key in self._source_keys or source_key in self._fills:
+                return
+
+            if self._fill_executor is None:
+                self._fill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="copy_cache_fill")
+            fill: Future = self._fill_executor.submit(self.add, source_file_path, size, mtime, io_scheduler)
+            self._fills[source_key] = fill
+        fill.add_done_callback(lambda _: self._remove_fill(source_key))
+
+    def add(self,
+            source_file_path: str|PosixPath|WindowsPath,
+            size: int,
+            mtime: float,
+            io_scheduler: IoScheduler|None = None) -> str|None:
+        """ Copy a source file into the cache. Returns the cached copy's path, None if the file can not be cached.
+        With an I/O scheduler, the copy waits for its admission, and is throttled to its bandwidth cap.
+        """
+
+        if size > self._max_bytes:
+            return None
+
+        if io_scheduler is None:
+            io_scheduler = IoScheduler()
+        throttle: Callable[[int], None]|None = io_scheduler.throttle if io_scheduler.is_bandwidth_limited() else None
+        source_key: str = self._get_source_key(source_file_path, size, mtime)
+        try:
+            os.makedirs(os.path.join(self._cache_directory, "blobs"), exist_ok=True)
+            with io_scheduler.reserve(source_file_path, size):
+                if self._digest == "none":
+                    blob_name: str = self._get_path_blob_name(source_key)
+                    track_file_copier: TrackFileCopier = self._track_file_copier if throttle is None \
+                        else TrackFileCopier("auto", buffer_size=self._buffer_size, throttle=throttle)
+                    track_file_copier.copy(source_file_path, self._get_blob_path(blob_name, create_directory=True), size)
+                else:
+                    blob_name = self._copy_with_digest(source_file_path, throttle)
+        except OSError as e:
+            self._logger.warning("Source file can not be cached: %s", e)
+
+            return None
+
+        return self._add_blob(source_key, blob_name, size)
+
+    def save(self):
+        """ Wait for the background copies, and write the cache index, replacing the previous one in one step. """
+
+        with self._lock:
+            fills: list[Future] = list(self._fills.values())
+        wait(fills)
+
+        with self._lock:
+            index: dict = {
+                "digest": self._digest,
+                "sources": dict(self._source_keys),
+                "blobs": list(self._blob_sizes.items())
+            }
+
+        try:
+            write_versioned_json(os.path.join(self._cache_directory, self.INDEX_FILE_NAME), self.INDEX_VERSION, index)
+        except OSError as e:
+            self._logger.error("Copy cache index save error: %s", e)
+
+    def _load(self):
+        """ Read the cache index of earlier runs, an unreadable index starts an empty cache. """
+
+        try:
+            index: dict|None = read_versioned_json(os.path.join(self._cache_directory, self.INDEX_FILE_NAME), self.INDEX_VERSION)
+            if index is None:
+                return
+
+            for blob_name, size in index["blobs"]:
+                self._blob_sizes[blob_name] = size
+                self._total_bytes += size
+            for source_key, blob_name in index["sources"].items():
+                if blob_name in self._blob_sizes:
+                    self._source_keys[source_key] = blob_name
+                    self._blob_source_keys.setdefault(blob_name, set()).add(source_key)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._logger.warning("Copy cache index can not be read, starting an empty cache: %s", e)
+            self._source_keys = {}
+            self._blob_source_keys = {}
+            self._blob_sizes = OrderedDict()
+            self._total_bytes = 0
+
+    def _add_blob(self, source_key: str, blob_name: str, size: int) -> str:
+        """ Register a cached file of a source file, and evict the least recently used files over the size cap.
+        Returns the cached file's path.
+        """
+
+        with self._lock:
+            self._source_keys[source_key] = blob_name
+            self._blob_source_keys.setdefault(blob_name, set()).add(source_key)
+            if blob_name not in self._blob_sizes:
+                self._blob_sizes[blob_name] = size
+                self._total_bytes += size
+            self._blob_sizes.move_to_end(blob_name)
+            self._evict()
+
+        return self._get_blob_path(blob_name)
+
+    def _remove_fill(self, source_key: str):
+        """ Forget a finished background copy. """
+
+        with self._lock:
+            self._fills.pop(source_key, None)
+
+    def _hash_file(self, file_path: str|PosixPath|WindowsPath) -> str:
+        """ Get the content digest of a file. """
+
+        content_hash = self._get_hash()
+        with open(file_path, "rb") as hashed_file:
+            while chunk := hashed_file.read(self._buffer_size):
+                content_hash.update(chunk)
+
+        return content_hash.hexdigest()
+
+    def _copy_with_digest(self, source_file_path: str|PosixPath|WindowsPath, throttle: Callable[[int], None]|None = None) -> str:
+        """ Copy the source file into the cache while hashing it, and name the copy after the digest.
+        Every chunk is passed to the throttle before it is copied. Returns the cached file's name.
+        """
+
+        content_hash = self._get_hash()
+        temporary_file_path: str = os.path.join(self._cache_directory, "blobs", f".{uuid.uuid4().hex}.part")
+        try:
+            with open(source_file_path, "rb") as source_file, open(temporary_file_path, "wb") as temporary_file:
+                while chunk := source_file.read(self._buffer_size):
+                    if throttle is not None:
+                        throttle(len(chunk))
+                    content_hash.update(chunk)
+                    temporary_file.write(chunk)
+
+            blob_name: str = f"{self._digest}-{content_hash.hexdigest()}"
+            blob_path: str = self._get_blob_path(blob_name, create_directory=True)
+            if os.path.isfile(blob_path):
+                self._logger.debug("Identical content is already cached: %s", source_file_path)
+            else:
+                os.replace(temporary_file_path, blob_path)
+        finally:
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+
+        return blob_name
+
+    def _get_hash(self):
+        """ Get a new hash object of the configured digest. """
+
+        if self._digest == "xxhash":
+            # Reason: Optional dependency, only imported if the xxhash digest is configured.
+            # pylint: disable-next=import-outside-toplevel,import-error
+            import xxhash
+
+            return xxhash.xxh3_128()
+
+        return hashlib.blake2b(digest_size=32)
+
+    def _get_available_digest(self, digest: str) -> str:
+        """ Fall back to blake2b if xxhash is configured, but not installed. """
+
+        if digest != "xxhash":
+            return digest
+
+        try:
+            # Reason: Optional dependency, only checked if the xxhash digest is configured.
+            # pylint: disable-next=import-outside-toplevel,import-error,unused-import
+            import xxhash
+        except ImportError:
+            self._logger.warning("xxhash is not installed, using the blake2b digest. Install it with: pip install xxhash")
+
+            return "blake2b"
+
+        return digest
+
+    def _evict(self):
+        """ Remove the least recently used files until the cache fits in its size cap. Call with the lock held.
+        The most recently added file and the pinned files are always kept.
+        """
+
+        for blob_name in list(self._blob_sizes)[:-1]:
+            if self._total_bytes <= self._max_bytes:
+                break
+            if blob_name in self._pins:
+                continue
+
+            self._logger.debug("Evicting cached file: %s", blob_name)
+            self._remove_blob(blob_name)
+
+    def _unpin(self, blob_name: str):
+        """ Release a pin of a cached file. Call with the lock held. """
+
+        pins: int = self._pins.get(blob_name, 0)
+        if pins > 1:
+            self._pins[blob_name] = pins - 1
+        else:
+            self._pins.pop(blob_name, None)
+
+    def _remove_blob(self, blob_name: str):
+        """ Forget a cached file and delete it. Call with the lock held. """
+
+        self._total_bytes -= self._blob_sizes.pop(blob_name, 0)
+        for source_key in self._blob_source_keys.pop(blob_name, set()):
+            self._source_keys.pop(source_key, None)
+
+        try:
+            os.remove(self._get_blob_path(blob_name))
+        except OSError:
+            pass
+
+    def _get_blob_path(self, blob_name: str, create_directory: bool = False) -> str:
+        """ Get the path of a cached file. The files are spread over subfolders by the first characters of the hash. """
+
+        blob_directory: str = os.path.join(self._cache_directory, "blobs", blob_name.split("-", 1)[1][:2])
+        if create_directory:
+            os.makedirs(blob_directory, exist_ok=True)
+
+        return os.path.join(blob_directory, blob_name)
+
+    @staticmethod
+    def _get_path_blob_name(source_key: str) -> str:
+        """ Get the name of a source file's cached copy, without a content digest. """
+
+        return "path-" + hashlib.blake2b(source_key.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _get_source_key(source_file_path: str|PosixPath|WindowsPath, size: int, mtime: float) -> str:
+        """ Get the cache key of a source file's current version. """
+
+        return f"{os.path.normcase(os.path.abspath(source_file_path))}|{size}|{mtime!r}"
@@ -0,0 +1,95 @@
+""" Index of directory listings, to answer file existence and stat queries without a filesystem call per file. """
+
+import logging
+import os
+import threading
+from pathlib import PosixPath, WindowsPath
+
+
+class DirectoryIndex:
+    """ Index of directory listings, to answer file existence and stat queries without a filesystem call per file.
+
+    Every directory is listed once with os.scandir, the first time a file in it is looked up.
+    Stat results come from the directory entries, on Windows the listing already contains them,
+    on other platforms they are fetched once per file and kept.
+    """
+
+    _logger: logging.Logger = None
+    _directories: dict[str, dict[str, os.DirEntry]] = None
+    _stat_results: dict[str, os.stat_result|None] = None
+    _lock: threading.Lock = None
+
+    def __init__(self):
+        self._logger = logging.getLogger("DirectoryIndex")
+        self._directories = {}
+        self._stat_results = {}
+        self._lock = threading.Lock()
+
+    def is_file(self, file_path: str|PosixPath|WindowsPath) -> bool:
+        """ Check if the path is an existing regular file, or a link to one. """
+
+        entry: os.DirEntry|None = self._get_entry(file_path)
+        if entry is None:
+            return False
+
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
+
+    def stat(self, file_path: str|PosixPath|WindowsPath) -> os.stat_result|None:
+        """ Get the stat result of a file, None if it does not exist. """
+
+        file_key: str = os.path.normcase(os.path.abspath(file_path))
+        with self._lock:
+            if file_key in self._stat_results:
+                return self._stat_results[file_key]
+
+        entry: os.DirEntry|None = self._get_entry(file_path)
+        stat_result: os.stat_result|None = None
+        if entry is not None:
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                stat_result = None
+
+        with self._lock:
+            self._stat_results[file_key] = stat_result
+
+        return stat_result
+
+    def clear(self):
+        """ Drop every directory listing, they are listed again on the next lookup. """
+
+        with self._lock:
+            self._directories = {}
+            self._stat_results = {}
+
+    def _get_entry(self, file_path: str|PosixPath|WindowsPath) -> os.DirEntry|None:
+        """ Get the directory entry of a file from its directory's listing. """
+
+        directory_path, file_name = os.path.split(os.path.abspath(file_path))
+        directory_entries: dict[str, os.DirEntry] = self._get_directory_entries(directory_path)
+
+        return directory_entries.get(os.path.normcase(file_name))
+
+    def _get_directory_entries(self, directory_path: str) -> dict[str, os.DirEntry]:
+        """ Get the entries of a directory, listing it on the first call. """
+
+        directory_key: str = os.path.normcase(directory_path)
+        with self._lock:
+            directory_entries: dict[str, os.DirEntry]|None = self._directories.get(directory_key)
+        if directory_entries is not None:
+            return directory_entries
+
+        directory_entries = {}
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    directory_entries[os.path.normcase(entry.name)] = entry
+            self._logger.debug("Indexed directory with %s entries: %s", len(directory_entries), directory_path)
+        except OSError as e:
+            self._logger.debug("Directory can not be listed: %s", e)
+
+        with self._lock:
+            return self._directories.setdefault(directory_key, directory_entries)
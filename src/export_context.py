@@ -0,0 +1,24 @@
+""" Services of an album export, that can be shared with the other exports of a run. """
+
+from concurrent.futures import Executor
+from typing import NamedTuple
+
+from copy_cache import CopyCache
+from io_scheduler import IoScheduler
+from library_index import LibraryIndex
+from source_file_cache import SourceFileCache
+from trace_recorder import TraceRecorder
+from track_prober import TrackProber
+
+
+class ExportContext(NamedTuple):
+    """ Services of an album export, that can be shared with the other exports of a run.
+    An exporter makes its own services for the ones that are not set, from its configuration.
+    """
+    source_file_cache: SourceFileCache|None = None
+    executor: Executor|None = None
+    copy_cache: CopyCache|None = None
+    io_scheduler: IoScheduler|None = None
+    library_index: LibraryIndex|None = None
+    track_prober: TrackProber|None = None
+    trace_recorder: TraceRecorder|None = None
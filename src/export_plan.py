@@ -0,0 +1,122 @@
+""" Plan of an album export: what would be done to every track, without doing it. """
+
+import os.path
+from typing import NamedTuple
+
+EXPORT_PLAN_FORMATS: tuple[str, ...] = ("table", "json")
+
+
+class ExportPlanAction(NamedTuple):
+    """ Planned action of a single track.
+
+    copy: the source file is copied to file_name, and tagged if tag is set.
+    keep: the file exported by the previous incremental export is up-to-date.
+    rename: the previous export of the track is renamed to file_name, and re-tagged if tag is set.
+    remove: the previous export of a track that is no longer in the playlist is removed.
+    missing: the source file does not exist, the track is skipped.
+    """
+    order: int
+    action: str
+    source_path: str
+    file_name: str|None
+    size: int|None
+    tag: bool
+
+
+class ExportPlan:
+    """ Plan of an album export: the ordered actions, the bytes to copy, the expected files and the name collisions. """
+
+    WRITING_ACTIONS: tuple[str, ...] = ("copy", "keep", "rename")
+
+    _album_name: str = None
+    _output_directory: str = None
+    _actions: list[ExportPlanAction] = None
+
+    def __init__(self, album_name: str, output_directory: str):
+        self._album_name = album_name
+        self._output_directory = output_directory
+        self._actions = []
+
+    def add_action(self, action: ExportPlanAction):
+        """ Add the next action of the plan. """
+
+        self._actions.append(action)
+
+    def get_actions(self) -> list[ExportPlanAction]:
+        """ Actions getter. """
+
+        return self._actions
+
+    def get_total_bytes(self) -> int:
+        """ Get the number of bytes the export copies. """
+
+        return sum(action.size or 0 for action in self._actions if action.action == "copy")
+
+    def get_action_counts(self) -> dict[str, int]:
+        """ Get the number of tracks of every planned action. """
+
+        action_counts: dict[str, int] = {}
+        for action in self._actions:
+            action_counts[action.action] = action_counts.get(action.action, 0) + 1
+
+        return action_counts
+
+    def get_collisions(self) -> dict[str, list[int]]:
+        """ Get the output file names, that more than one track is exported to, with the orders of those tracks.
+        The file of a later track overwrites the earlier one.
+        """
+
+        orders_by_file_name: dict[str, list[int]] = {}
+        file_names: dict[str, str] = {}
+        for action in self._actions:
+            if action.action in self.WRITING_ACTIONS:
+                file_name_key: str = os.path.normcase(action.file_name)
+                file_names.setdefault(file_name_key, action.file_name)
+                orders_by_file_name.setdefault(file_name_key, []).append(action.order)
+
+        return {
+            file_names[file_name_key]: orders
+            for file_name_key, orders in orders_by_file_name.items() if len(orders) > 1
+        }
+
+    def get_file_count(self) -> int:
+        """ Get the number of track files expected in the album folder after the export. """
+
+        return len({os.path.normcase(action.file_name) for action in self._actions if action.action in self.WRITING_ACTIONS})
+
+    def to_dict(self) -> dict:
+        """ Get the plan as a dict, for .json output. """
+
+        return {
+            "album_name": self._album_name,
+            "output_directory": self._output_directory,
+            "total_bytes": self.get_total_bytes(),
+            "file_count": self.get_file_count(),
+            "action_counts": self.get_action_counts(),
+            "collisions": [
+                {"file_name": file_name, "orders": orders} for file_name, orders in self.get_collisions().items()
+            ],
+            "actions": [action._asdict() for action in self._actions]
+        }
+
+    def format_table(self) -> str:
+        """ Get the plan as a text table. """
+
+        lines: list[str] = [
+            f"Album: {self._album_name} -> {self._output_directory}",
+            f"{'#':>6}  {'action':<8}{'bytes':>12}  {'tag':<4}file",
+        ]
+        for action in self._actions:
+            lines.append(f"{action.order:>6}  {action.action:<8}"
+                         f"{action.size if action.size is not None else '-':>12}  "
+                         f"{'yes' if action.tag else 'no':<4}"
+                         f"{action.file_name if action.file_name is not None else action.source_path}")
+
+        action_counts: str = ", ".join(f"{action} {count}" for action, count in self.get_action_counts().items())
+        lines.append(f"Actions: {action_counts or 'none'}")
+        lines.append(f"Bytes to copy: {self.get_total_bytes()}")
+        lines.append(f"Expected files: {self.get_file_count()}")
+        for file_name, orders in self.get_collisions().items():
+            lines.append(f"Name collision: {file_name} <- tracks {', '.join(str(order) for order in orders)}")
+
+        return "\n".join(lines)
@@ -1,6 +1,9 @@
 """ Dataclass to hold exporter statistics. """
 
-# Reason: Eight is reasonable in this case.
+# Stages with a per-track latency record. "copy" includes writing the tags when they are written while copying.
+TRACK_STAGES: tuple[str, ...] = ("stat", "transcode", "copy", "tag")
+
+# Reason: Twenty-four is reasonable in this case.
 # pylint: disable-next=too-many-instance-attributes
 class ExporterStats:
     """ Dataclass to hold exporter statistics. """
@@ -13,6 +16,25 @@ class ExporterStats:
     copy_error_tracks: int = 0
     file_media_metadata_errors: int = 0
     exported_tracks: int = 0
+    metadata_rewritten_bytes: int = 0
+    unchanged_tracks: int = 0
+    renamed_tracks: int = 0
+    removed_tracks: int = 0
+    copied_bytes: int = 0
+    dedup_hits: int = 0
+    dedup_bytes_saved: int = 0
+    library_index_hits: int = 0
+    library_index_misses: int = 0
+    probe_error_tracks: int = 0
+    probe_cache_hits: int = 0
+    transcoded_tracks: int = 0
+    transcode_cache_hits: int = 0
+    transcode_error_tracks: int = 0
+    stage_seconds: dict[str, float] = None
+    track_latencies: dict[str, list[float]] = None
+
+    def __init__(self):
+        self.reset()
 
     def reset(self):
         """ Set all stats to zero. """
@@ -25,6 +47,107 @@ class ExporterStats:
         self.copy_error_tracks = 0
         self.file_media_metadata_errors = 0
         self.exported_tracks = 0
+        self.metadata_rewritten_bytes = 0
+        self.unchanged_tracks = 0
+        self.renamed_tracks = 0
+        self.removed_tracks = 0
+        self.copied_bytes = 0
+        self.dedup_hits = 0
+        self.dedup_bytes_saved = 0
+        self.library_index_hits = 0
+        self.library_index_misses = 0
+        self.probe_error_tracks = 0
+        self.probe_cache_hits = 0
+        self.transcoded_tracks = 0
+        self.transcode_cache_hits = 0
+        self.transcode_error_tracks = 0
+        self.stage_seconds = {}
+        self.track_latencies = {stage: [] for stage in TRACK_STAGES}
+
+    def add_stage_seconds(self, stage: str, seconds: float):
+        """ Add to the wall time of a stage. """
+
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def add_track_latency(self, stage: str, seconds: float):
+        """ Record the time a stage took for a single track. """
+
+        self.track_latencies[stage].append(seconds)
+
+    def get_latency_summary(self, stage: str) -> dict[str, float|int]:
+        """ Get the count, total, p50, p95 and max of a stage's per-track latencies, in seconds. """
+
+        latencies: list[float] = sorted(self.track_latencies[stage])
+        if not latencies:
+            return {"count": 0, "total": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+        def percentile(rank: float) -> float:
+            return latencies[min(len(latencies) - 1, int(rank * len(latencies)))]
+
+        return {
+            "count": len(latencies),
+            "total": sum(latencies),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": latencies[-1]
+        }
+
+    def get_throughput(self, stage: str) -> float:
+        """ Get the MB/s of the copy or tag stage, measured over the time spent in the stage. """
+
+        stage_bytes: dict[str, int] = {"copy": self.copied_bytes, "tag": self.metadata_rewritten_bytes}
+        stage_total_seconds: float = sum(self.track_latencies[stage])
+        if stage_total_seconds <= 0:
+            return 0.0
+
+        return stage_bytes[stage] / stage_total_seconds / 1_000_000
+
+    def to_dict(self) -> dict:
+        """ Get the stats as a .json serializable dict. """
+
+        return {
+            "total_segments": self.total_segments,
+            "path_autorepaired_tracks": self.repaired_uris,
+            "skipped_tracks": self.skipped_tracks,
+            "loaded_tracks": self.loaded_tracks,
+            "file_not_found_tracks": self.file_not_found_tracks,
+            "copy_error_tracks": self.copy_error_tracks,
+            "file_media_metadata_errors": self.file_media_metadata_errors,
+            "exported_tracks": self.exported_tracks,
+            "metadata_rewritten_bytes": self.metadata_rewritten_bytes,
+            "unchanged_tracks": self.unchanged_tracks,
+            "renamed_tracks": self.renamed_tracks,
+            "removed_tracks": self.removed_tracks,
+            "copied_bytes": self.copied_bytes,
+            "dedup_hits": self.dedup_hits,
+            "dedup_bytes_saved": self.dedup_bytes_saved,
+            "library_index_hits": self.library_index_hits,
+            "library_index_misses": self.library_index_misses,
+            "probe_error_tracks": self.probe_error_tracks,
+            "probe_cache_hits": self.probe_cache_hits,
+            "transcoded_tracks": self.transcoded_tracks,
+            "transcode_cache_hits": self.transcode_cache_hits,
+            "transcode_error_tracks": self.transcode_error_tracks,
+            "stage_seconds": dict(self.stage_seconds),
+            "track_latency_seconds": {stage: self.get_latency_summary(stage) for stage in TRACK_STAGES},
+            "throughput_mb_per_second": {stage: self.get_throughput(stage) for stage in ("copy", "tag")}
+        }
+
+    def _get_timing_str(self) -> str:
+        """ Format the stage times, track latencies and throughputs. """
+
+        timing_str: str = "".join(
+            f"\n{stage}_seconds:{seconds:.3f}" for stage, seconds in self.stage_seconds.items()
+        )
+        for stage in TRACK_STAGES:
+            latency_summary: dict[str, float|int] = self.get_latency_summary(stage)
+            if latency_summary["count"]:
+                timing_str += f"\n{stage}_track_ms:p50 {latency_summary['p50'] * 1000:.2f}" \
+                              f" | p95 {latency_summary['p95'] * 1000:.2f}" \
+                              f" | max {latency_summary['max'] * 1000:.2f}"
+
+        return timing_str + f"\ncopy_mb_per_second:{self.get_throughput('copy'):.1f}" \
+                            f"\ntag_mb_per_second:{self.get_throughput('tag'):.1f}"
 
     def __str__(self):
 
@@ -34,8 +157,23 @@ class ExporterStats:
             "\nloaded_tracks:"+str(self.loaded_tracks)+\
             "\nfile_not_found_tracks:"+str(self.file_not_found_tracks)+\
             "\ncopy_error_tracks:"+str(self.copy_error_tracks)+\
-            "\nfile_media_metadata_errors:"+str(self.copy_error_tracks)+\
-            "\nexported_tracks:"+str(self.exported_tracks)+"\n]"
+            "\nfile_media_metadata_errors:"+str(self.file_media_metadata_errors)+\
+            "\nexported_tracks:"+str(self.exported_tracks)+\
+            "\nmetadata_rewritten_bytes:"+str(self.metadata_rewritten_bytes)+\
+            "\nunchanged_tracks:"+str(self.unchanged_tracks)+\
+            "\nrenamed_tracks:"+str(self.renamed_tracks)+\
+            "\nremoved_tracks:"+str(self.removed_tracks)+\
+            "\ncopied_bytes:"+str(self.copied_bytes)+\
+            "\ndedup_hits:"+str(self.dedup_hits)+\
+            "\ndedup_bytes_saved:"+str(self.dedup_bytes_saved)+\
+            "\nlibrary_index_hits:"+str(self.library_index_hits)+\
+            "\nlibrary_index_misses:"+str(self.library_index_misses)+\
+            "\nprobe_error_tracks:"+str(self.probe_error_tracks)+\
+            "\nprobe_cache_hits:"+str(self.probe_cache_hits)+\
+            "\ntranscoded_tracks:"+str(self.transcoded_tracks)+\
+            "\ntranscode_cache_hits:"+str(self.transcode_cache_hits)+\
+            "\ntranscode_error_tracks:"+str(self.transcode_error_tracks)+\
+            self._get_timing_str()+"\n]"
 
     def __add__(self, other):
 
@@ -48,5 +186,23 @@ class ExporterStats:
         summed_stats.copy_error_tracks = self.copy_error_tracks + other.copy_error_tracks
         summed_stats.file_media_metadata_errors = self.file_media_metadata_errors + other.file_media_metadata_errors
         summed_stats.exported_tracks = self.exported_tracks + other.exported_tracks
+        summed_stats.metadata_rewritten_bytes = self.metadata_rewritten_bytes + other.metadata_rewritten_bytes
+        summed_stats.unchanged_tracks = self.unchanged_tracks + other.unchanged_tracks
+        summed_stats.renamed_tracks = self.renamed_tracks + other.renamed_tracks
+        summed_stats.removed_tracks = self.removed_tracks + other.removed_tracks
+        summed_stats.copied_bytes = self.copied_bytes + other.copied_bytes
+        summed_stats.dedup_hits = self.dedup_hits + other.dedup_hits
+        summed_stats.dedup_bytes_saved = self.dedup_bytes_saved + other.dedup_bytes_saved
+        summed_stats.library_index_hits = self.library_index_hits + other.library_index_hits
+        summed_stats.library_index_misses = self.library_index_misses + other.library_index_misses
+        summed_stats.probe_error_tracks = self.probe_error_tracks + other.probe_error_tracks
+        summed_stats.probe_cache_hits = self.probe_cache_hits + other.probe_cache_hits
+        summed_stats.transcoded_tracks = self.transcoded_tracks + other.transcoded_tracks
+        summed_stats.transcode_cache_hits = self.transcode_cache_hits + other.transcode_cache_hits
+        summed_stats.transcode_error_tracks = self.transcode_error_tracks + other.transcode_error_tracks
+        for stage in self.stage_seconds.keys() | other.stage_seconds.keys():
+            summed_stats.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + other.stage_seconds.get(stage, 0.0)
+        for stage in TRACK_STAGES:
+            summed_stats.track_latencies[stage] = self.track_latencies[stage] + other.track_latencies[stage]
 
         return summed_stats
@@ -1,67 +1,298 @@
 """ Class to manipulate exported track file ID3 metadata, like track order, artist and album. """
 
+import importlib
+import io
 import logging
-from pathlib import Path, WindowsPath, PosixPath
+import os.path
+from pathlib import WindowsPath, PosixPath
+from typing import BinaryIO, TYPE_CHECKING
 
-from mutagen.easyid3 import EasyID3
-from mutagen.flac import FLAC
-from mutagen.asf import ASF
-from mutagen.wave import WAVE
+# Size of the ID3v1 tag at the end of an .mp3 file, that starts with the TAG marker.
+ID3V1_TAG_SIZE: int = 128
+
+if TYPE_CHECKING:
+    from mutagen.easyid3 import EasyID3
+    from mutagen.flac import FLAC
+    from mutagen.asf import ASF
+    from mutagen.wave import WAVE
 
 class FileMetadataSetter:
     """ Class to manipulate exported track file ID3 metadata, like track order, artist and album. """
 
+    # Module and class name of the mutagen loader of every supported format, by file extension.
+    # The mutagen format modules are slow to import, a loader is imported when the first file of its format is loaded.
+    LOADERS: dict[str, tuple[str, str]] = {
+        '.mp3': ('mutagen.easyid3', 'EasyID3'),  # MP3 with ID3 tags
+        '.flac': ('mutagen.flac', 'FLAC'),  # FLAC with Vorbis Comments
+        '.wma': ('mutagen.asf', 'ASF'),  # WMA with ASF metadata
+        '.wav': ('mutagen.wave', 'WAVE'),  # WAV with limited metadata support
+        '.opus': ('mutagen.oggopus', 'OggOpus')  # Opus with Vorbis Comments
+    }
+    # Name of the header renderer of every format, whose tags are in a header block before the audio payload.
+    # ASF headers hold stream properties next to the tags, WAV keeps its ID3 chunk inside the RIFF container,
+    # those are tagged after the copy.
+    HEADER_RENDERERS: dict[str, str] = {
+        '.mp3': '_render_id3_header',
+        '.flac': '_render_flac_header'
+    }
+    # Name of the reader of the size of the tag block, that a save rewrites in place, of every supported format.
+    TAG_SIZE_READERS: dict[str, str] = {
+        '.mp3': '_read_id3_tag_size',
+        '.flac': '_read_flac_tag_size',
+        '.wma': '_read_asf_tag_size',
+        '.wav': '_read_wave_tag_size',
+        '.opus': '_read_opus_tag_size'
+    }
+    # Imported loader classes by file extension, shared by all instances.
+    _loader_classes: dict[str, type] = {}
+
     _logger: logging.Logger = None
-    _track_file: EasyID3|FLAC|ASF|WAVE = None
+    _track_file: "EasyID3|FLAC|ASF|WAVE" = None
 
     def __init__(self, file_abs_path: str|WindowsPath|PosixPath):
         self._logger = logging.getLogger("FileMetadataSetter")
         self._track_file = self._load_file(file_abs_path)
 
-    def set_metadata(self, key: str, value: str):
+    def set_metadata(self, key: str, value: str) -> int:
         """ Generic method to set metadata for the audio file.
         Exceptions should be handled by the external API call's try catch.
         """
 
-        self._logger.debug("Setting metadata '%s' to '%s'", key, value)
-        self._track_file[key] = value
+        return self.apply({key: value})
+
+    def apply(self, metadata: dict[str, str]) -> int:
+        """ Stage all given metadata key-value pairs and save the file once.
+        Exceptions should be handled by the external API call's try catch.
+
+        Returns the number of bytes the save rewrote: the size of the tag block if it fit in its padding and was
+        rewritten in place, or the size of the saved file if the file was resized and its audio data moved.
+        """
+
+        for key, value in metadata.items():
+            self._logger.debug("Setting metadata '%s' to '%s'", key, value)
+            self._track_file[key] = value
+
+        file_path: str = self._track_file.filename
+        file_size: int = os.path.getsize(file_path)
         self._track_file.save()
-        self._logger.debug("Successfully set %s to %s", key, value)
+        self._logger.debug("Successfully set %s", metadata)
+
+        saved_file_size: int = os.path.getsize(file_path)
+        if saved_file_size != file_size:
+            return saved_file_size
+
+        tag_size: int|None = self._read_tag_size(file_path)
+
+        return tag_size if tag_size is not None else saved_file_size
+
+    @staticmethod
+    def _read_tag_size(file_abs_path: str|WindowsPath|PosixPath) -> int|None:
+        """ Read the size of the tag block of a file in bytes, None if the format or the file is not recognized. """
+
+        reader_name: str|None = FileMetadataSetter.TAG_SIZE_READERS.get(os.path.splitext(file_abs_path)[1].lower())
+        if reader_name is None:
+            return None
+
+        with open(file_abs_path, "rb") as track_file:
+            return getattr(FileMetadataSetter, reader_name)(track_file)
 
-    def set_tracknumber(self, track_number: int):
+    def set_tracknumber(self, track_number: int) -> int:
         """ Set the file's track number. """
-        self.set_metadata("tracknumber", str(track_number))
+        return self.set_metadata("tracknumber", str(track_number))
 
-    def set_album(self, album_name: str):
+    def set_album(self, album_name: str) -> int:
         """ Set the file's album. """
-        self.set_metadata("album", album_name)
+        return self.set_metadata("album", album_name)
 
-    def set_album_artist(self, album_artist_name: str):
+    def set_album_artist(self, album_artist_name: str) -> int:
         """ Set the file's album artist. """
-        self.set_metadata("albumartist", album_artist_name)
+        return self.set_metadata("albumartist", album_artist_name)
 
-    def set_artist(self, artist_name: str):
+    def set_artist(self, artist_name: str) -> int:
         """ Set the file's artist. """
-        self.set_metadata("artist", artist_name)
+        return self.set_metadata("artist", artist_name)
 
-    def _load_file(self, file_abs_path: Path):
+    def _load_file(self, file_abs_path: str|WindowsPath|PosixPath):
         """ Load the appropriate mutagen object based on the file extension. """
-        file_abs_path = Path(file_abs_path)
-        extension = file_abs_path.suffix.lower()
-
-        # Dictionary-based dispatch for handling different audio formats
-        loaders = {
-            '.mp3': EasyID3,  # MP3 with ID3 tags
-            '.flac': FLAC,  # FLAC with Vorbis Comments
-            '.wma': ASF,  # WMA with ASF metadata
-            '.wav': WAVE  # WAV with limited metadata support
-        }
-
-        if extension not in loaders:
+        extension = os.path.splitext(file_abs_path)[1].lower()
+
+        if extension not in self.LOADERS:
             self._logger.error("Unsupported file format: %s", extension)
 
             raise ValueError(f"Unsupported file format: {extension}")
 
         self._logger.debug("Loading %s file: %s", extension.upper(), file_abs_path)
 
-        return loaders[extension](file_abs_path)
+        return self._get_loader(extension)(file_abs_path)
+
+    @staticmethod
+    def _get_loader(extension: str) -> type:
+        """ Import the mutagen loader class of a supported file extension, once per extension. """
+
+        loader_class: type|None = FileMetadataSetter._loader_classes.get(extension)
+        if loader_class is None:
+            module_name, class_name = FileMetadataSetter.LOADERS[extension]
+            loader_class = getattr(importlib.import_module(module_name), class_name)
+            FileMetadataSetter._loader_classes[extension] = loader_class
+
+        return loader_class
+
+    @staticmethod
+    def render_tagged_header(source_file: BinaryIO, extension: str, metadata: dict[str, str]) -> tuple[bytes, int] | None:
+        """ Build the tag block of the source file with the given metadata applied, without touching the source file.
+
+        Returns the new header bytes and the offset in the source file where the untouched audio payload starts,
+        or None if the format's tag block can not be spliced in front of the payload.
+        The source file object is expected to be positioned at the start of the file.
+        """
+
+        renderer_name: str|None = FileMetadataSetter.HEADER_RENDERERS.get(extension.lower())
+        if renderer_name is None:
+            return None
+
+        return getattr(FileMetadataSetter, renderer_name)(source_file, metadata)
+
+    @staticmethod
+    def _render_id3_header(source_file: BinaryIO, metadata: dict[str, str]) -> tuple[bytes, int] | None:
+        """ Render a new ID3v2 tag for an .mp3 file.
+        Files with an ID3v1 tag at their end are tagged after the copy, the spliced payload would keep the old v1 tag.
+        """
+
+        if FileMetadataSetter._has_id3v1_tag(source_file):
+            return None
+
+        id3_header: bytes = source_file.read(10)
+        payload_offset: int = 0
+        easy_id3: type = FileMetadataSetter._get_loader('.mp3')
+        tags: EasyID3 = easy_id3()
+        if len(id3_header) == 10 and id3_header.startswith(b"ID3"):
+            # The tag size is a 28 bit syncsafe integer, the header and the optional footer are not included in it.
+            tag_size: int = 0
+            for size_byte in id3_header[6:10]:
+                tag_size = (tag_size << 7) | (size_byte & 0x7f)
+            has_footer: bool = bool(id3_header[5] & 0x10)
+            payload_offset = 10 + tag_size + (10 if has_footer else 0)
+
+            source_file.seek(0)
+            tags = easy_id3(io.BytesIO(source_file.read(payload_offset)))
+
+        for key, value in metadata.items():
+            tags[key] = value
+
+        rendered_header = io.BytesIO()
+        tags.save(rendered_header)
+
+        return rendered_header.getvalue(), payload_offset
+
+    @staticmethod
+    def _has_id3v1_tag(source_file: BinaryIO) -> bool:
+        """ Check if the file ends with a 128 byte ID3v1 tag. The file is positioned at its start afterwards. """
+
+        file_size: int = source_file.seek(0, os.SEEK_END)
+        has_id3v1_tag: bool = False
+        if file_size >= ID3V1_TAG_SIZE:
+            source_file.seek(file_size - ID3V1_TAG_SIZE)
+            has_id3v1_tag = source_file.read(3) == b"TAG"
+        source_file.seek(0)
+
+        return has_id3v1_tag
+
+    @staticmethod
+    def _render_flac_header(source_file: BinaryIO, metadata: dict[str, str]) -> tuple[bytes, int] | None:
+        """ Render the metadata blocks of a .flac file, the audio frames follow the last block. """
+
+        payload_offset: int|None = FileMetadataSetter._read_flac_tag_size(source_file)
+        if payload_offset is None:
+            return None
+
+        source_file.seek(0)
+        rendered_header = io.BytesIO(source_file.read(payload_offset))
+        tags: FLAC = FileMetadataSetter._get_loader('.flac')(rendered_header)
+        for key, value in metadata.items():
+            tags[key] = value
+        rendered_header.seek(0)
+        tags.save(rendered_header)
+
+        return rendered_header.getvalue(), payload_offset
+
+    @staticmethod
+    def _read_id3_tag_size(track_file: BinaryIO) -> int|None:
+        """ Read the size of the ID3v2 tag at the start of an .mp3 file, and of its ID3v1 tag at the end. """
+
+        id3_header: bytes = track_file.read(10)
+        tag_size: int = 0
+        if len(id3_header) == 10 and id3_header.startswith(b"ID3"):
+            # The tag size is a 28 bit syncsafe integer, the header and the optional footer are not included in it.
+            for size_byte in id3_header[6:10]:
+                tag_size = (tag_size << 7) | (size_byte & 0x7f)
+            tag_size += 10 + (10 if id3_header[5] & 0x10 else 0)
+        if FileMetadataSetter._has_id3v1_tag(track_file):
+            tag_size += ID3V1_TAG_SIZE
+
+        return tag_size or None
+
+    @staticmethod
+    def _read_flac_tag_size(track_file: BinaryIO) -> int|None:
+        """ Read the size of the metadata blocks of a .flac file, the offset of the audio frames after the last block. """
+
+        if track_file.read(4) != b"fLaC":
+            return None
+
+        payload_offset: int = 4
+        is_last_block: bool = False
+        while not is_last_block:
+            block_header: bytes = track_file.read(4)
+            if len(block_header) != 4:
+                return None
+            is_last_block = bool(block_header[0] & 0x80)
+            block_size: int = int.from_bytes(block_header[1:4], "big")
+            track_file.seek(block_size, os.SEEK_CUR)
+            payload_offset += 4 + block_size
+
+        return payload_offset
+
+    @staticmethod
+    def _read_asf_tag_size(track_file: BinaryIO) -> int|None:
+        """ Read the size of the header object of a .wma file, that holds its metadata. """
+
+        header_object: bytes = track_file.read(24)
+        if len(header_object) != 24:
+            return None
+
+        # A 16 byte GUID, then the object size as a little endian 64 bit integer.
+        return int.from_bytes(header_object[16:24], "little")
+
+    @staticmethod
+    def _read_wave_tag_size(track_file: BinaryIO) -> int|None:
+        """ Read the size of the ID3 chunk of a .wav file, with its chunk header. """
+
+        if track_file.read(12)[:4] != b"RIFF":
+            return None
+
+        while len(chunk_header := track_file.read(8)) == 8:
+            chunk_size: int = int.from_bytes(chunk_header[4:8], "little")
+            if chunk_header[:4].lower() == b"id3 ":
+                return 8 + chunk_size
+            # Chunks are padded to an even size.
+            track_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+        return None
+
+    @staticmethod
+    def _read_opus_tag_size(track_file: BinaryIO) -> int|None:
+        """ Read the size of the comment header pages of an .opus file, the header pages after the first one. """
+
+        tag_size: int = 0
+        page_index: int = 0
+        while len(page_header := track_file.read(27)) == 27 and page_header.startswith(b"OggS"):
+            segment_table: bytes = track_file.read(page_header[26])
+            page_size: int = 27 + len(segment_table) + sum(segment_table)
+            # Header pages have a granule position of 0, the audio pages after them a positive one.
+            if page_index > 0 and int.from_bytes(page_header[6:14], "little") != 0:
+                break
+            if page_index > 0:
+                tag_size += page_size
+            track_file.seek(page_size - 27 - len(segment_table), os.SEEK_CUR)
+            page_index += 1
+
+        return tag_size or None
@@ -0,0 +1,208 @@
+""" Scheduler of the track copies, that read from shared storage: bandwidth cap, bytes in flight cap
+and per device concurrency limit. """
+
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import PosixPath, WindowsPath
+from typing import BinaryIO
+
+from track_file_copier import DEFAULT_BUFFER_SIZE
+
+# A waiting copy is admitted next, once this many later requested, smaller copies were admitted before it,
+# so large files are not held back until the end of the export.
+MAX_ADMISSION_SKIPS: int = 16
+
+
+@dataclass(eq=False)
+class _IoRequest:
+    """ A copy waiting for, or holding its admission. The copies admitted before it count up its skips. """
+
+    size: int
+    device: int
+    sequence: int
+    skips: int = 0
+
+
+# Reason: Twelve is reasonable in this case, the limits, the admission queue and the bandwidth cap state.
+# pylint: disable-next=too-many-instance-attributes
+class IoScheduler:
+    """ Scheduler of the track copies, that read from shared storage.
+
+    - Bandwidth cap: the copied chunks of every copy share one rate limit, in MB/s.
+    - Bytes in flight cap: a copy is admitted only while the sizes of the running copies and its own size fit the cap.
+      A file larger than the cap is copied alone.
+    - Per device concurrency: number of copies at once reading from the same source device.
+
+    Waiting copies are admitted smallest first, so the tagging of small files starts early.
+    A copy passed over by smaller ones too many times is admitted next.
+    Every limit is disabled by 0, with every limit disabled, the scheduler does nothing.
+    """
+
+    _logger: logging.Logger = None
+    _bytes_per_second: float = 0.0
+    _max_bytes_in_flight: int = 0
+    _per_device_concurrency: int = 0
+    _condition: threading.Condition = None
+    _waiting_requests: list[_IoRequest] = None
+    _sequence: itertools.count = None
+    _bytes_in_flight: int = 0
+    _copies_by_device: dict[int, int] = None
+    _devices_by_directory: dict[str, int] = None
+    _bandwidth_lock: threading.Lock = None
+    _next_transfer_time: float = 0.0
+
+    def __init__(self, bandwidth_limit: float = 0.0, max_bytes_in_flight: int = 0, per_device_concurrency: int = 0):
+        """ The bandwidth limit is in MB/s. """
+
+        self._logger = logging.getLogger("IoScheduler")
+        self._bytes_per_second = bandwidth_limit * 1_000_000
+        self._max_bytes_in_flight = max_bytes_in_flight
+        self._per_device_concurrency = per_device_concurrency
+        self._condition = threading.Condition()
+        self._waiting_requests = []
+        self._sequence = itertools.count()
+        self._copies_by_device = {}
+        self._devices_by_directory = {}
+        self._bandwidth_lock = threading.Lock()
+
+    def is_enabled(self) -> bool:
+        """ Check if any of the limits is set. """
+
+        return self.is_bandwidth_limited() or self._is_admission_limited()
+
+    def is_bandwidth_limited(self) -> bool:
+        """ Check if the bandwidth cap is set. """
+
+        return self._bytes_per_second > 0
+
+    @contextmanager
+    def reserve(self, source_file_path: str|PosixPath|WindowsPath, size: int|None) -> Iterator[None]:
+        """ Wait until the copy of the source file is admitted, and hold its admission in the context.
+        The size of the source file is looked up if not given.
+        """
+
+        if not self._is_admission_limited():
+            yield
+
+            return
+
+        if size is None:
+            try:
+                size = os.path.getsize(source_file_path)
+            except OSError:
+                size = 0
+
+        request: _IoRequest = self._admit(size, self._get_device(source_file_path))
+        try:
+            yield
+        finally:
+            self._release(request)
+
+    def throttle(self, byte_count: int):
+        """ Wait until byte_count bytes can be transferred within the bandwidth cap. """
+
+        if self._bytes_per_second <= 0:
+            return
+
+        with self._bandwidth_lock:
+            now: float = time.monotonic()
+            transfer_time: float = max(now, self._next_transfer_time)
+            self._next_transfer_time = transfer_time + byte_count / self._bytes_per_second
+
+        if transfer_time > now:
+            time.sleep(transfer_time - now)
+
+    def copy_file_object(self, source_file: BinaryIO, output_file: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """ Copy the rest of the source file to the output file in buffer sized chunks, within the bandwidth cap. """
+
+        if not self.is_bandwidth_limited():
+            shutil.copyfileobj(source_file, output_file, buffer_size)
+
+            return
+
+        while chunk := source_file.read(buffer_size):
+            self.throttle(len(chunk))
+            output_file.write(chunk)
+
+    def _is_admission_limited(self) -> bool:
+        """ Check if copies wait for their admission. """
+
+        return self._max_bytes_in_flight > 0 or self._per_device_concurrency > 0
+
+    def _admit(self, size: int, device: int) -> _IoRequest:
+        """ Wait until the copy is the next one to admit, and count it as running. """
+
+        with self._condition:
+            request = _IoRequest(size, device, next(self._sequence))
+            self._waiting_requests.append(request)
+            self._condition.wait_for(lambda: self._get_next_request() is request)
+
+            self._waiting_requests.remove(request)
+            for waiting_request in self._waiting_requests:
+                if waiting_request.sequence < request.sequence:
+                    waiting_request.skips += 1
+            self._bytes_in_flight += size
+            self._copies_by_device[device] = self._copies_by_device.get(device, 0) + 1
+            # Another waiting copy may fit next to this one.
+            self._condition.notify_all()
+
+            return request
+
+    def _release(self, request: _IoRequest):
+        """ Count the copy as finished and wake up the waiting copies. """
+
+        with self._condition:
+            self._bytes_in_flight -= request.size
+            self._copies_by_device[request.device] -= 1
+            self._condition.notify_all()
+
+    def _get_next_request(self) -> _IoRequest|None:
+        """ Get the waiting copy to admit now, None if none of them fits the limits.
+        A copy that was passed over too many times blocks the smaller ones until it fits.
+        """
+
+        starved_requests: list[_IoRequest] = [
+            request for request in self._waiting_requests if request.skips >= MAX_ADMISSION_SKIPS
+        ]
+        if starved_requests:
+            starved_request: _IoRequest = min(starved_requests, key=lambda request: request.sequence)
+
+            return starved_request if self._fits(starved_request) else None
+
+        for request in sorted(self._waiting_requests, key=lambda request: (request.size, request.sequence)):
+            if self._fits(request):
+                return request
+
+        return None
+
+    def _fits(self, request: _IoRequest) -> bool:
+        """ Check if the copy can run next to the running copies. """
+
+        if 0 < self._per_device_concurrency <= self._copies_by_device.get(request.device, 0):
+            return False
+
+        return self._max_bytes_in_flight <= 0 \
+            or self._bytes_in_flight == 0 \
+            or self._bytes_in_flight + request.size <= self._max_bytes_in_flight
+
+    def _get_device(self, source_file_path: str|PosixPath|WindowsPath) -> int:
+        """ Get the id of the device the source file is on, looked up once per source folder. """
+
+        directory_path: str = os.path.dirname(os.path.abspath(source_file_path))
+        device: int|None = self._devices_by_directory.get(directory_path)
+        if device is None:
+            try:
+                device = os.stat(directory_path).st_dev
+            except OSError as e:
+                self._logger.debug("Source device lookup error: %s", e)
+                device = -1
+            self._devices_by_directory[directory_path] = device
+
+        return device
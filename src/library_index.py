@@ -0,0 +1,240 @@
+""" Persistent index of the music library, to find the current path of tracks that were moved or renamed. """
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import PosixPath, WindowsPath
+
+LIBRARY_INDEX_FILE_NAME: str = ".library_index.sqlite"
+LIBRARY_INDEX_VERSION: int = 1
+# File extensions of the indexed audio files.
+LIBRARY_EXTENSIONS: tuple[str, ...] = (".mp3", ".flac", ".wma", ".wav", ".m4a", ".ogg", ".opus")
+# A playlist's track duration and the indexed duration of a file match within this many seconds.
+DURATION_TOLERANCE_SECONDS: float = 2.0
+
+_SCHEMA: tuple[str, ...] = (
+    "CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, directory TEXT NOT NULL, name_key TEXT NOT NULL, "
+    "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, duration REAL, title_key TEXT)",
+    "CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent)",
+    "CREATE INDEX IF NOT EXISTS files_directory ON files (directory)",
+    "CREATE INDEX IF NOT EXISTS files_name_key ON files (name_key)",
+    "CREATE INDEX IF NOT EXISTS files_title_key ON files (title_key)",
+)
+
+
+class LibraryIndex:
+    """ Persistent index of the music library, to find the current path of tracks that were moved or renamed.
+
+    The audio files under the library root are stored in an SQLite file with their name, size, modification time,
+    duration, and an "artist - title" key from their tags, the same form as the titles of .m3u8 playlists.
+    A playlist path that does not exist is resolved by indexed lookups: files with the same name first,
+    then files with the same artist and title, the one with the closest duration. A file matched by its name is the
+    same track if its duration or its title matches too, a file matched by its title if its duration matches.
+    When the durations are unknown, a single existing file is taken, more than one is ambiguous and not resolved.
+
+    The index is updated incrementally: only the folders, whose modification time changed since the previous update,
+    are listed again, and only their new or changed files have their tags read. Folder modification times change when
+    files are added, removed or renamed in them, not when a file is edited in place, so the duration and tags of
+    edited files are updated when their folder changes next.
+    """
+
+    _logger: logging.Logger = None
+    _library_root: str = None
+    _index_file_path: str = None
+    _connection: sqlite3.Connection|None = None
+    _lock: threading.Lock = None
+
+    def __init__(self,
+                 library_root: str|PosixPath|WindowsPath,
+                 index_file_path: str|PosixPath|WindowsPath|None = None):
+        """ The index is stored in the library root by default. """
+
+        self._logger = logging.getLogger("LibraryIndex")
+        self._library_root = os.path.abspath(library_root)
+        self._index_file_path = os.path.abspath(index_file_path) if index_file_path is not None \
+            else os.path.join(self._library_root, LIBRARY_INDEX_FILE_NAME)
+        self._lock = threading.Lock()
+
+    def open(self):
+        """ Open the index file, an index of another version is rebuilt. """
+
+        self._connection = sqlite3.connect(self._index_file_path, check_same_thread=False)
+        # A journal file next to the index would change the modification time of its folder on every update,
+        # that folder would be listed again every time. The index can be rebuilt, it does not need a crash safe journal.
+        self._connection.execute("PRAGMA journal_mode = MEMORY")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] not in (0, LIBRARY_INDEX_VERSION):
+            self._logger.warning("Unknown library index version, rebuilding the index.")
+            self._connection.execute("DROP TABLE IF EXISTS directories")
+            self._connection.execute("DROP TABLE IF EXISTS files")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        self._connection.execute(f"PRAGMA user_version = {LIBRARY_INDEX_VERSION}")
+        self._connection.commit()
+
+    def close(self):
+        """ Close the index file. """
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def update(self) -> int:
+        """ Update the index with the changes of the library since the previous update.
+        Returns the number of folders listed again.
+        """
+
+        with self._lock, self._connection:
+            known_directories: dict[str, int] = dict(self._connection.execute("SELECT path, mtime_ns FROM directories"))
+            seen_directories: set[str] = set()
+            scanned_directories: int = 0
+            directories_to_scan: list[tuple[str, str|None]] = [(self._library_root, None)]
+            while directories_to_scan:
+                directory_path, parent_path = directories_to_scan.pop()
+                try:
+                    mtime_ns: int = os.stat(directory_path).st_mtime_ns
+                except OSError:
+                    continue
+
+                seen_directories.add(directory_path)
+                if known_directories.get(directory_path) == mtime_ns:
+                    directories_to_scan.extend(
+                        (subdirectory_path, directory_path) for (subdirectory_path,) in self._connection.execute(
+                            "SELECT path FROM directories WHERE parent = ?", (directory_path,)
+                        )
+                    )
+                    continue
+
+                directories_to_scan.extend(
+                    (subdirectory_path, directory_path) for subdirectory_path in self._scan_directory(directory_path)
+                )
+                self._connection.execute("INSERT OR REPLACE INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                                         (directory_path, parent_path, mtime_ns))
+                scanned_directories += 1
+
+            removed_directories: list[tuple[str]] = [
+                (directory_path,) for directory_path in known_directories.keys() - seen_directories
+            ]
+            self._connection.executemany("DELETE FROM files WHERE directory = ?", removed_directories)
+            self._connection.executemany("DELETE FROM directories WHERE path = ?", removed_directories)
+
+        self._logger.info("Library index updated, %s folders listed: %s", scanned_directories, self._library_root)
+
+        return scanned_directories
+
+    def resolve(self, file_path: str|PosixPath|WindowsPath, title: str|None, duration: float|None) -> str|None:
+        """ Find the current path of a track file, by its name, or by the artist and title of the playlist entry.
+        Returns None if there is no existing file for the track in the index, or more than one without a known duration.
+        """
+
+        title_key: str|None = self._get_title_key(title) if title else None
+        with self._lock:
+            candidates: list[tuple[str, float|None, str|None]] = self._connection.execute(
+                "SELECT path, duration, title_key FROM files WHERE name_key = ?",
+                (os.path.normcase(os.path.basename(str(file_path))),)
+            ).fetchall()
+            is_name_match: bool = bool(candidates)
+            if not candidates and title_key:
+                candidates = self._connection.execute("SELECT path, duration, title_key FROM files WHERE title_key = ?",
+                                                      (title_key,)).fetchall()
+
+        matching_candidates: list[tuple[float, str]] = []
+        unverified_candidate_paths: list[str] = []
+        for candidate_path, candidate_duration, candidate_title_key in candidates:
+            # Files matched by their name are the same track if their durations or titles match too,
+            # files matched by their title only if their durations match.
+            is_title_match: bool = is_name_match and title_key is not None and candidate_title_key == title_key
+            if candidate_duration is None or duration is None or duration <= 0:
+                if is_title_match:
+                    matching_candidates.append((DURATION_TOLERANCE_SECONDS, candidate_path))
+                else:
+                    unverified_candidate_paths.append(candidate_path)
+                continue
+
+            duration_difference: float = abs(candidate_duration - duration)
+            if duration_difference <= DURATION_TOLERANCE_SECONDS or is_title_match:
+                matching_candidates.append((duration_difference, candidate_path))
+
+        for _, candidate_path in sorted(matching_candidates):
+            if os.path.isfile(candidate_path):
+                return candidate_path
+
+        existing_candidate_paths: list[str] = [path for path in unverified_candidate_paths if os.path.isfile(path)]
+        if len(existing_candidate_paths) == 1:
+            return existing_candidate_paths[0]
+        if existing_candidate_paths:
+            self._logger.warning("Track matches %s library files without a known duration, not resolved: %s",
+                                 len(existing_candidate_paths),
+                                 file_path)
+
+        return None
+
+    def _scan_directory(self, directory_path: str) -> list[str]:
+        """ List a folder, update its new and changed files, and remove its deleted files from the index.
+        Returns the subfolders.
+        """
+
+        indexed_files: dict[str, tuple[int, int]] = {
+            path: (size, mtime_ns) for path, size, mtime_ns in self._connection.execute(
+                "SELECT path, size, mtime_ns FROM files WHERE directory = ?", (directory_path,)
+            )
+        }
+        subdirectory_paths: list[str] = []
+        file_paths: set[str] = set()
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectory_paths.append(entry.path)
+                    elif entry.name.lower().endswith(LIBRARY_EXTENSIONS) and entry.is_file():
+                        file_paths.add(entry.path)
+                        entry_stat: os.stat_result = entry.stat()
+                        if indexed_files.get(entry.path) != (entry_stat.st_size, entry_stat.st_mtime_ns):
+                            self._index_file(entry.path, directory_path, entry_stat)
+        except OSError as e:
+            self._logger.debug("Library folder can not be listed: %s", e)
+
+        self._connection.executemany("DELETE FROM files WHERE path = ?",
+                                     [(path,) for path in indexed_files.keys() - file_paths])
+
+        return subdirectory_paths
+
+    def _index_file(self, file_path: str, directory_path: str, file_stat: os.stat_result):
+        """ Read the duration and tags of a file, and store it in the index. """
+
+        duration: float|None = None
+        title_key: str|None = None
+        try:
+            # Reason: mutagen is slow to import, it is only needed while new files are indexed.
+            # pylint: disable-next=import-outside-toplevel
+            import mutagen
+
+            media_file = mutagen.File(file_path, easy=True)
+            if media_file is not None:
+                duration = getattr(media_file.info, "length", None)
+                tags = media_file.tags or {}
+                title: str = (tags.get("title") or [""])[0]
+                artist: str = (tags.get("artist") or [""])[0]
+                if title:
+                    title_key = self._get_title_key(f"{artist} - {title}" if artist else title)
+        except Exception as e:
+            self._logger.debug("Library file tags can not be read: %s: %s", file_path, e)
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files (path, directory, name_key, size, mtime_ns, duration, title_key) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (file_path,
+             directory_path,
+             os.path.normcase(os.path.basename(file_path)),
+             file_stat.st_size,
+             file_stat.st_mtime_ns,
+             duration,
+             title_key)
+        )
+
+    @staticmethod
+    def _get_title_key(title: str) -> str:
+        """ Get the lookup key of a title: case and surrounding whitespace are ignored. """
+
+        return " ".join(title.split()).casefold()
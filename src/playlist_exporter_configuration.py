@@ -6,11 +6,73 @@ from argparse import Namespace, ArgumentParser
 from pathlib import PosixPath, WindowsPath
 from typing import NamedTuple
 
-import yaml
-from cerberus import Validator
-
+from album_archive_writer import ARCHIVE_COMPRESSIONS
+from export_plan import EXPORT_PLAN_FORMATS
+from track_file_copier import COPY_STRATEGIES, DEFAULT_BUFFER_SIZE
 from utility.str_to_bool import str_to_bool
 from utility.get_filename_without_extension import get_filename_without_extension
+from utility.is_valid_by_schema import is_valid_by_schema
+
+# Choices of the options, whose modules are slow to import, they are imported only when their option is used.
+EXPORT_ENGINES: tuple[str, ...] = ("sync", "async")
+PARSER_BACKENDS: tuple[str, ...] = ("stream", "m3u8")
+COPY_CACHE_DIGESTS: tuple[str, ...] = ("none", "blake2b", "xxhash")
+TRANSCODE_FORMATS: tuple[str, ...] = ("mp3", "opus")
+
+
+class CopySettings(NamedTuple):
+    """ How the track files are copied. """
+    strategy: str = "auto"
+    buffer_size: int = DEFAULT_BUFFER_SIZE
+
+
+class EngineSettings(NamedTuple):
+    """ Which export engine exports the tracks, and how many at once. """
+    name: str = "sync"
+    workers: int = 1
+    concurrency: int = 16
+    per_host_concurrency: int = 4
+
+
+class CopyCacheSettings(NamedTuple):
+    """ Where and how much of the source files are cached, and how cached files are named. """
+    directory: str|None = None
+    max_bytes: int = 10 * 1024 ** 3
+    digest: str = "none"
+
+
+class TaggingSettings(NamedTuple):
+    """ How many processes tag the exported files, and how many files a process is sent at once. """
+    processes: int = 0
+    batch_size: int = 32
+
+
+class IoSettings(NamedTuple):
+    """ Limits of the track copies, that read from shared storage. 0 disables a limit. """
+    bandwidth_limit: float = 0.0
+    max_bytes_in_flight: int = 0
+    per_device_concurrency: int = 0
+
+
+class LibrarySettings(NamedTuple):
+    """ The music library folder to index, and the index file, for the tracks that were moved or renamed. """
+    root: str|None = None
+    index_file: str|None = None
+
+
+class ProbeSettings(NamedTuple):
+    """ How many threads read the audio headers of the tracks before the export, and where their results are kept. """
+    workers: int = 0
+    cache_file: str|None = None
+
+
+class TranscodeSettings(NamedTuple):
+    """ The format and bitrate to transcode the tracks to, None keeps their format, the encoder processes and the cache
+    folder of the transcoded tracks. """
+    output_format: str|None = None
+    bitrate: int = 192
+    processes: int = 0
+    cache_directory: str|None = None
 
 
 class PlaylistExporterConfigurationValues(NamedTuple):
@@ -19,22 +81,236 @@ class PlaylistExporterConfigurationValues(NamedTuple):
     playlist_file_path: str|None = None
     output_directory: str|None = None
     add_ordering_prefix_to_filename: bool|None = None
-
+    tag_while_copying: bool|None = None
+    incremental: bool|None = None
+    copy: CopySettings|None = None
+    set_file_metadata: bool|None = None
+    parser_backend: str|None = None
+    stats_json: str|None = None
+    engine: EngineSettings|None = None
+    copy_cache: CopyCacheSettings|None = None
+    tagging: TaggingSettings|None = None
+    archive_compression: str|None = None
+    io: IoSettings|None = None
+    library: LibrarySettings|None = None
+    probe: ProbeSettings|None = None
+    transcode: TranscodeSettings|None = None
+
+
+CONFIGURATION_SCHEMA: dict[str, dict] = {
+    'album_name': {
+        'type': 'string',
+        'nullable': True
+    },
+    'playlist_file_path': {
+        'type': 'string',
+        'required': True
+    },
+    'output_directory': {
+        'type': 'string',
+        'required': True
+    },
+    'add_ordering_prefix_to_filename': {
+        'type': 'boolean',
+        'nullable': True
+    },
+    'workers': {
+        'type': 'integer',
+        'min': 1,
+        'nullable': True
+    },
+    'tag_while_copying': {
+        'type': 'boolean',
+        'nullable': True
+    },
+    'incremental': {
+        'type': 'boolean',
+        'nullable': True
+    },
+    'copy_strategy': {
+        'type': 'string',
+        'allowed': list(COPY_STRATEGIES),
+        'nullable': True
+    },
+    'set_file_metadata': {
+        'type': 'boolean',
+        'nullable': True
+    },
+    'parser_backend': {
+        'type': 'string',
+        'allowed': list(PARSER_BACKENDS),
+        'nullable': True
+    },
+    'stats_json': {
+        'type': 'string',
+        'nullable': True
+    },
+    'engine': {
+        'type': 'string',
+        'allowed': list(EXPORT_ENGINES),
+        'nullable': True
+    },
+    'concurrency': {
+        'type': 'integer',
+        'min': 1,
+        'nullable': True
+    },
+    'per_host_concurrency': {
+        'type': 'integer',
+        'min': 1,
+        'nullable': True
+    },
+    'copy_buffer_size': {
+        'type': 'integer',
+        'min': 4096,
+        'nullable': True
+    },
+    'copy_cache_directory': {
+        'type': 'string',
+        'nullable': True
+    },
+    'copy_cache_max_bytes': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'copy_cache_digest': {
+        'type': 'string',
+        'allowed': list(COPY_CACHE_DIGESTS),
+        'nullable': True
+    },
+    'tagging_processes': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'tagging_batch_size': {
+        'type': 'integer',
+        'min': 1,
+        'nullable': True
+    },
+    'archive_compression': {
+        'type': 'string',
+        'allowed': list(ARCHIVE_COMPRESSIONS),
+        'nullable': True
+    },
+    'io_bandwidth_limit': {
+        'type': 'number',
+        'min': 0,
+        'nullable': True
+    },
+    'io_max_bytes_in_flight': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'io_per_device_concurrency': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'library_root': {
+        'type': 'string',
+        'nullable': True
+    },
+    'library_index_file': {
+        'type': 'string',
+        'nullable': True
+    },
+    'probe_workers': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'probe_cache_file': {
+        'type': 'string',
+        'nullable': True
+    },
+    'transcode': {
+        'type': 'string',
+        'allowed': ["none", *TRANSCODE_FORMATS],
+        'nullable': True
+    },
+    'transcode_bitrate': {
+        'type': 'integer',
+        'min': 8,
+        'nullable': True
+    },
+    'transcode_processes': {
+        'type': 'integer',
+        'min': 0,
+        'nullable': True
+    },
+    'transcode_cache_directory': {
+        'type': 'string',
+        'nullable': True
+    },
+    'yaml_file_path': {
+        'type': 'string',
+        'nullable': True
+    },
+    'debug': {
+        'type': 'boolean',
+        'nullable': True
+    },
+    'plan': {
+        'type': 'string',
+        'allowed': list(EXPORT_PLAN_FORMATS),
+        'nullable': True
+    },
+    'watch': {
+        'type': 'number',
+        'min': 0,
+        'nullable': True
+    },
+    'profile': {
+        'type': 'string',
+        'nullable': True
+    },
+    'trace_out': {
+        'type': 'string',
+        'nullable': True
+    },
+    'batch_yaml_file_path': {
+        'type': 'string',
+        'nullable': True
+    },
+    'playlist_directory': {
+        'type': 'string',
+        'nullable': True
+    }
+}
+
+
+# Reason: Twenty is reasonable in this case, the album values, and a settings record of every optional export stage.
+# pylint: disable-next=too-many-instance-attributes
 class PlaylistExporterConfiguration:
     """ Class to hold and load the configuration values from code, yaml or cli args. """
 
     _logger: logging.Logger = None
-    _validator: Validator = None
     _is_loaded: bool = False
 
     album_name: str|None = None
     playlist_file_path: str|None = None
     output_directory: str|None = None
     add_ordering_prefix_to_filename: bool|None = True
+    tag_while_copying: bool|None = False
+    incremental: bool|None = False
+    copy: CopySettings = CopySettings()
+    set_file_metadata: bool|None = True
+    parser_backend: str = "stream"
+    stats_json: str|None = None
+    engine: EngineSettings = EngineSettings()
+    copy_cache: CopyCacheSettings = CopyCacheSettings()
+    tagging: TaggingSettings = TaggingSettings()
+    archive_compression: str = "store"
+    io: IoSettings = IoSettings()
+    library: LibrarySettings = LibrarySettings()
+    probe: ProbeSettings = ProbeSettings()
+    transcode: TranscodeSettings = TranscodeSettings()
 
     def __init__(self):
         self._logger = logging.getLogger("PlaylistExporterConfiguration")
-        self._set_schema_validator()
 
     def __str__(self):
         return f"""
@@ -42,6 +318,20 @@ class PlaylistExporterConfiguration:
                 playlist_file_path: {self.playlist_file_path}
                 output_directory: {self.output_directory}
                 add_ordering_prefix_to_filename: {self.add_ordering_prefix_to_filename}
+                tag_while_copying: {self.tag_while_copying}
+                incremental: {self.incremental}
+                copy: {self.copy}
+                set_file_metadata: {self.set_file_metadata}
+                parser_backend: {self.parser_backend}
+                stats_json: {self.stats_json}
+                engine: {self.engine}
+                copy_cache: {self.copy_cache}
+                tagging: {self.tagging}
+                archive_compression: {self.archive_compression}
+                io: {self.io}
+                library: {self.library}
+                probe: {self.probe}
+                transcode: {self.transcode}
                 """
 
     def is_loaded(self):
@@ -49,36 +339,24 @@ class PlaylistExporterConfiguration:
 
         return self._is_loaded
 
-    def _set_schema_validator(self):
-        """ Set the configuration validator by schema. """
-        schema = {
-            'album_name': {
-                'type': 'string',
-                'nullable': True
-            },
-            'playlist_file_path': {
-                'type': 'string',
-                'required': True
-            },
-            'output_directory': {
-                'type': 'string',
-                'required': True
-            },
-            'add_ordering_prefix_to_filename': {
-                'type': 'boolean',
-                'nullable': True
-            },
-            'yaml_file_path': {
-                'type': 'string',
-                'nullable': True
-            },
-            'debug': {
-                'type': 'boolean',
-                'nullable': True
-            }
-        }
-
-        self._validator = Validator(schema)
+    def _validate(self, config: dict):
+        """ Validate the configuration values by the schema. Raises EnvironmentError with the validation errors.
+
+        Valid configurations pass a quick check, Cerberus is imported and its Validator built only to report errors.
+        """
+
+        if is_valid_by_schema(config, CONFIGURATION_SCHEMA):
+            return
+
+        # Reason: Cerberus is slow to import, it is only needed for configurations that fail the quick check.
+        # pylint: disable-next=import-outside-toplevel
+        from cerberus import Validator
+
+        validator = Validator(CONFIGURATION_SCHEMA)
+        if not validator.validate(config):
+            validation_error_msg = f"Invalid configuration loaded. Validation errors: {validator.errors}"
+
+            raise EnvironmentError(validation_error_msg)
 
     def _set_config_from_tuple(self, values: PlaylistExporterConfigurationValues):
         """ Class prop initialization from named tuple. """
@@ -87,6 +365,20 @@ class PlaylistExporterConfiguration:
         self.playlist_file_path = values.playlist_file_path
         self.output_directory = values.output_directory
         self.add_ordering_prefix_to_filename = values.add_ordering_prefix_to_filename
+        self.tag_while_copying = values.tag_while_copying
+        self.incremental = values.incremental
+        self.copy = values.copy
+        self.set_file_metadata = values.set_file_metadata
+        self.parser_backend = values.parser_backend
+        self.stats_json = values.stats_json
+        self.engine = values.engine
+        self.copy_cache = values.copy_cache
+        self.tagging = values.tagging
+        self.archive_compression = values.archive_compression
+        self.io = values.io
+        self.library = values.library
+        self.probe = values.probe
+        self.transcode = values.transcode
 
         self._is_loaded = True
 
@@ -94,10 +386,7 @@ class PlaylistExporterConfiguration:
         """ Load the configuration values from a dict. """
 
         try:
-            if not self._validator.validate(config):
-                validation_error_msg = f"Invalid configuration loaded. Validation errors: {self._validator.errors}"
-
-                raise EnvironmentError(validation_error_msg)
+            self._validate(config)
 
             if config["playlist_file_path"] is not None and config["album_name"] is None:
                 config["album_name"] = get_filename_without_extension(config["playlist_file_path"])
@@ -108,12 +397,39 @@ class PlaylistExporterConfiguration:
 
             config["add_ordering_prefix_to_filename"] = config["add_ordering_prefix_to_filename"] \
                 if config["add_ordering_prefix_to_filename"] is not None else True
+            config["tag_while_copying"] = config.get("tag_while_copying") \
+                if config.get("tag_while_copying") is not None else False
+            config["incremental"] = config.get("incremental") if config.get("incremental") is not None else False
+            config["set_file_metadata"] = config.get("set_file_metadata") \
+                if config.get("set_file_metadata") is not None else True
+            config["parser_backend"] = config.get("parser_backend") if config.get("parser_backend") is not None else "stream"
+            config["stats_json"] = config.get("stats_json") or None
+            config["archive_compression"] = config.get("archive_compression") \
+                if config.get("archive_compression") is not None else "store"
+            # "none" disables transcoding in yaml files.
+            config["transcode"] = config.get("transcode") if config.get("transcode") != "none" else None
 
             config_tuple = PlaylistExporterConfigurationValues(
                 album_name=config["album_name"],
                 playlist_file_path=config["playlist_file_path"],
                 output_directory=config["output_directory"],
-                add_ordering_prefix_to_filename=config["add_ordering_prefix_to_filename"]
+                add_ordering_prefix_to_filename=config["add_ordering_prefix_to_filename"],
+                tag_while_copying=config["tag_while_copying"],
+                incremental=config["incremental"],
+                copy=self._get_settings(CopySettings, config, ("copy_strategy", "copy_buffer_size")),
+                set_file_metadata=config["set_file_metadata"],
+                parser_backend=config["parser_backend"],
+                stats_json=config["stats_json"],
+                engine=self._get_settings(EngineSettings, config, ("engine", "workers", "concurrency", "per_host_concurrency")),
+                copy_cache=self._get_settings(CopyCacheSettings, config, ("copy_cache_directory", "copy_cache_max_bytes", "copy_cache_digest")),
+                tagging=self._get_settings(TaggingSettings, config, ("tagging_processes", "tagging_batch_size")),
+                archive_compression=config["archive_compression"],
+                io=self._get_settings(IoSettings, config, ("io_bandwidth_limit", "io_max_bytes_in_flight", "io_per_device_concurrency")),
+                library=self._get_settings(LibrarySettings, config, ("library_root", "library_index_file")),
+                probe=self._get_settings(ProbeSettings, config, ("probe_workers", "probe_cache_file")),
+                transcode=self._get_settings(TranscodeSettings,
+                                             config,
+                                             ("transcode", "transcode_bitrate", "transcode_processes", "transcode_cache_directory"))
             )
 
             self._set_config_from_tuple(config_tuple)
@@ -123,18 +439,42 @@ class PlaylistExporterConfiguration:
         except EnvironmentError as validation_error_msg:
             self._logger.error(validation_error_msg)
 
+    @staticmethod
+    def _get_settings(settings_type: type, config: dict, keys: tuple[str, ...]) -> tuple:
+        """ Get a settings record from the configuration values of its keys, given in the order of its fields.
+        The fields of the keys, that are not set, keep their default values.
+        """
+
+        return settings_type(**{field: config.get(key) for field, key in zip(settings_type._fields, keys)
+                                if config.get(key) not in (None, "")})
+
     def load_yaml(self, yaml_abspath: str|PosixPath|WindowsPath):
         """ Read the config values from a yaml file. """
 
         self._logger.info("Loading configuration from .yaml file: %s", str(yaml_abspath))
-        config = None
+        self._load_and_validate(self.read_yaml(yaml_abspath))
+
+    @staticmethod
+    def read_yaml(yaml_abspath: str|PosixPath|WindowsPath) -> object|None:
+        """ Read the content of a yaml file. Returns None if the file can not be read or parsed. """
+
         try:
+            # Reason: PyYAML is slow to import, it is only needed for .yaml configurations.
+            # pylint: disable-next=import-outside-toplevel
+            import yaml
+
             with open(yaml_abspath, 'r', encoding="utf-8") as file:
-                config = yaml.safe_load(file)
+                return yaml.safe_load(file)
 
         except Exception as e:
-            self._logger.error("YAML file load error: %s", e)
+            logging.getLogger("PlaylistExporterConfiguration").error("YAML file load error: %s", e)
+
+            return None
 
+    def load_dict(self, config: dict):
+        """ Read the config values from a dict. Keys missing from the dict are loaded with their default values. """
+
+        config = {key: None for key in CONFIGURATION_SCHEMA} | config
         self._load_and_validate(config)
 
     @staticmethod
@@ -145,14 +485,118 @@ class PlaylistExporterConfiguration:
                                          description="""A simple application to export tracks
                                           from an .m3u8 playlist file to a new folder as named album, with playlist ordering of the songs.""")
         parser.add_argument('-yaml', '--yaml_file_path', help='Absolute path of the .yaml config file.')
+        parser.add_argument('-batch', '--batch_yaml_file_path',
+                            help='Absolute path of a .yaml config file with multiple albums to export in one run.')
+        parser.add_argument('-pd', '--playlist_directory',
+                            help='Absolute path of a directory of .m3u8 playlist files to export in one run, '
+                                 'each into its own album folder in the output directory.')
         parser.add_argument('-an', '--album_name', help='Name of the album.')
         parser.add_argument('-pf', '--playlist_file_path', help='Absolute path of the .m3u8 playlist file.')
-        parser.add_argument('-out', '--output_directory', help='Absolute path of the export output directory.')
+        parser.add_argument('-out', '--output_directory',
+                            help='Absolute path of the export output directory, or of a .zip or .tar archive to export into.')
         parser.add_argument('-opf', '--add_ordering_prefix_to_filename',
                             type=str_to_bool,
                             nargs='?',  # Accepts an optional argument
                             const=True,  # Default to True if no value is provided
                             help='Enable/Disable automatic track # prefix function. Enabled by default.')
+        parser.add_argument('-w', '--workers', type=int,
+                            help='Number of tracks to copy and tag concurrently. Defaults to 1 (sequential export).')
+        parser.add_argument('-twc', '--tag_while_copying',
+                            type=str_to_bool,
+                            nargs='?',
+                            const=True,
+                            help='Write the album metadata into the exported file while copying it. Disabled by default.')
+        parser.add_argument('-inc', '--incremental',
+                            type=str_to_bool,
+                            nargs='?',
+                            const=True,
+                            help='Only export the tracks that changed since the previous export. Disabled by default.')
+        parser.add_argument('-cs', '--copy_strategy', choices=COPY_STRATEGIES,
+                            help='How track files are copied: auto, reflink, copy_file_range, hardlink, chunked or copy. '
+                                 'Defaults to auto.')
+        parser.add_argument('-cbs', '--copy_buffer_size', type=int,
+                            help='Buffer size in bytes of chunked copies. Defaults to 1048576 (1 MiB).')
+        parser.add_argument('-ccd', '--copy_cache_directory',
+                            help='Absolute path of a local folder to cache source files in, duplicate tracks in this '
+                                 'and later exports are copied from the cache. Disabled by default.')
+        parser.add_argument('-ccm', '--copy_cache_max_bytes', type=int,
+                            help='Size cap of the copy cache in bytes. Defaults to 10737418240 (10 GiB).')
+        parser.add_argument('-ccdg', '--copy_cache_digest', choices=COPY_CACHE_DIGESTS,
+                            help='Content digest of cached files, files with the same content are cached once: '
+                                 'none, blake2b or xxhash. Defaults to none.')
+        parser.add_argument('-sfm', '--set_file_metadata',
+                            type=str_to_bool,
+                            nargs='?',
+                            const=True,
+                            help='Enable/Disable setting album and track # metadata on the exported files. Enabled by default.')
+        parser.add_argument('-tp', '--tagging_processes', type=int,
+                            help='Number of processes to set the metadata of the exported files on, '
+                                 '0 sets it in the exporting thread. Defaults to 0.')
+        parser.add_argument('-tbs', '--tagging_batch_size', type=int,
+                            help='Number of files sent to a tagging process at once. Defaults to 32.')
+        parser.add_argument('-ac', '--archive_compression', choices=ARCHIVE_COMPRESSIONS,
+                            help='Compression of a .zip or .tar output archive: store (uncompressed) or deflate. '
+                                 'Defaults to store.')
+        parser.add_argument('-iobw', '--io_bandwidth_limit', type=float,
+                            help='Bandwidth cap of the track copies in MB/s, shared by every copy at once. '
+                                 'Defaults to 0 (unlimited).')
+        parser.add_argument('-iomb', '--io_max_bytes_in_flight', type=int,
+                            help='Cap of the summed size in bytes of the track files copied at once. '
+                                 'Defaults to 0 (unlimited).')
+        parser.add_argument('-iodc', '--io_per_device_concurrency', type=int,
+                            help='Number of track copies at once reading from the same source device. '
+                                 'Defaults to 0 (unlimited).')
+        parser.add_argument('-lr', '--library_root',
+                            help='Absolute path of the music library folder to index, tracks that were moved or '
+                                 'renamed are looked up in the index. Disabled by default.')
+        parser.add_argument('-lif', '--library_index_file',
+                            help='Path of the library index file. Defaults to .library_index.sqlite in the library root.')
+        parser.add_argument('-prw', '--probe_workers', type=int,
+                            help='Number of threads reading the audio headers of the tracks before the export, '
+                                 'for their real duration and bitrate. Unreadable files are skipped. '
+                                 'Defaults to 0 (no probing).')
+        parser.add_argument('-prc', '--probe_cache_file',
+                            help='Path of a .json file to keep the probe results in between runs.')
+        parser.add_argument('-tc', '--transcode', choices=TRANSCODE_FORMATS,
+                            help='Transcode the tracks to this format with ffmpeg (or lame/opusenc) before exporting them. '
+                                 'Disabled by default.')
+        parser.add_argument('-tcb', '--transcode_bitrate', type=int,
+                            help='Bitrate of the transcoded tracks in kbit/s. Defaults to 192.')
+        parser.add_argument('-tcp', '--transcode_processes', type=int,
+                            help='Number of encoder processes at once, 0 runs one per CPU core. Defaults to 0.')
+        parser.add_argument('-tcc', '--transcode_cache_directory',
+                            help='Folder to keep the transcoded tracks in between runs, unchanged tracks are not '
+                                 'encoded again. Disabled by default.')
+        parser.add_argument('-pb', '--parser_backend', choices=PARSER_BACKENDS,
+                            help='Playlist parser: stream (line by line, tracks are exported while the playlist is read) '
+                                 'or m3u8 (m3u8 library). Defaults to stream.')
+        parser.add_argument('-sj', '--stats_json',
+                            help='Path of a .json file to write the export statistics and stage timings to.')
+        parser.add_argument('-e', '--engine', choices=EXPORT_ENGINES,
+                            help='Export engine: sync (sequential, or a thread per track with workers > 1) '
+                                 'or async (overlapped file operations, for network storage). Defaults to sync.')
+        parser.add_argument('-c', '--concurrency', type=int,
+                            help='Number of tracks exported at once by the async engine. Defaults to 16.')
+        parser.add_argument('-phc', '--per_host_concurrency', type=int,
+                            help='Number of file operations at once on the same storage host or mount, '
+                                 'with the async engine. Defaults to 4.')
+        parser.add_argument('-plan', '--plan', choices=EXPORT_PLAN_FORMATS,
+                            nargs='?',
+                            const='table',
+                            help='Print the export plan as a table or json instead of exporting: the action, target name '
+                                 'and size of every track, the bytes to copy, the expected files and the name collisions.')
+        parser.add_argument('-watch', '--watch', type=float,
+                            nargs='?',
+                            const=1.0,
+                            help='Keep running, and export the added, removed and reordered tracks incrementally '
+                                 'every time the playlist file is saved. The optional value is the debounce time '
+                                 'in seconds, saves within it are exported once. Defaults to 1.')
+        parser.add_argument('-prof', '--profile', type=str,
+                            help='Run the export under cProfile and write the profile statistics to this file. '
+                                 'Read it with python -m pstats or another pstats viewer.')
+        parser.add_argument('-trace', '--trace-out', '--trace_out', dest='trace_out', type=str,
+                            help='Write a Chrome trace event .json file with a span for every stage of the export '
+                                 'and of every track: resolve, stat, copy and tag.')
         parser.add_argument('-d', '--debug', action='store_true', help='Enable debug level logging.')
 
         return parser
@@ -1,75 +1,122 @@
 """ .m3u8 to list[Track] parser utility class. """
 import logging
 import os
+import time
+from collections.abc import Iterator
 from pathlib import PosixPath, WindowsPath
-from urllib.parse import unquote
-
-import m3u8
-from m3u8 import Segment
+from urllib.parse import quote, unquote
 
+from directory_index import DirectoryIndex
 from exporter_stats import ExporterStats
+from library_index import LibraryIndex
+from trace_recorder import TraceRecorder
 from track import Track
+from track_table import TrackTable
 
 
+# Reason: Eight is reasonable in this case, the parser keeps the services it resolves and records the tracks with.
+# pylint: disable-next=too-many-instance-attributes
 class PlaylistParser:
     """ .m3u8 to list[Track] parser utility class. """
 
     _logger: logging.Logger = None
     _playlist_file_path: str|PosixPath|WindowsPath
-    _tracks: list[Track] = []
+    _parser_backend: str = "stream"
+    _tracks: TrackTable = None
     _stats: ExporterStats = None
+    _directory_index: DirectoryIndex = None
+    _library_index: LibraryIndex|None = None
+    _trace_recorder: TraceRecorder|None = None
+
+    def __init__(self,
+                 playlist_file_path: str|PosixPath|WindowsPath,
+                 parser_backend: str = "stream",
+                 directory_index: DirectoryIndex|None = None,
+                 library_index: LibraryIndex|None = None,
+                 trace_recorder: TraceRecorder|None = None):
+        """ With a library index, track paths that can not be repaired or do not exist are looked up in it.
+        With a trace recorder, the resolution of every track's path is recorded as a span.
+        """
 
-    def __init__(self, playlist_file_path: str|PosixPath|WindowsPath):
         self._logger = logging.getLogger("PlaylistParser")
         self._playlist_file_path = playlist_file_path
+        self._parser_backend = parser_backend
+        self._directory_index = directory_index if directory_index is not None else DirectoryIndex()
+        self._library_index = library_index
+        self._trace_recorder = trace_recorder
+        self._tracks = TrackTable()
         self._stats = ExporterStats()
 
     def parse_playlist(self) -> bool:
         """ Parse the .m3u8 playlist for tracks and tracknumbers. """
 
         self._logger.debug("Loading .m3u8 playlist from file...")
-        self._stats.reset()
-
-        playlist_absolute_file_uri: str|PosixPath|WindowsPath = "file:///"+os.path.abspath(self._playlist_file_path)
-        self._logger.debug("playlist_absolute_filepath: %s", playlist_absolute_file_uri)
-        playlist: m3u8.M3U8
+        self._tracks = TrackTable()
 
         try:
-            playlist = m3u8.load(playlist_absolute_file_uri)
+            for track in self.iter_tracks():
+                self._tracks.append(track)
         except Exception as e:
             self._logger.critical("Playlist failed to load: %s",e)
 
             return False
 
-        self._logger.debug("Loaded playlist content: %s", playlist.dumps())
-        self._stats.total_segments = len(playlist.segments)
+        self._logger.debug("Loaded tracks: %s", self._tracks)
+
+        return True
+
+    def count_segments(self) -> int|None:
+        """ Count the track segments of the playlist without building the tracks.
+        Returns None if the playlist fails to load.
+        """
+
+        try:
+            return sum(1 for _ in self._iter_segments())
+        except Exception as e:
+            self._logger.critical("Playlist failed to load: %s",e)
 
-        for track_index, segment in enumerate(playlist.segments):
-            track_uri: str = unquote(str(segment.uri))
+            return None
+
+    def iter_tracks(self) -> Iterator[Track]:
+        """ Parse the .m3u8 playlist and yield its tracks one by one. The stats are updated as the tracks are yielded. """
+
+        self._stats.reset()
+
+        for track_index, (segment_uri, segment_title, segment_duration) in enumerate(self._iter_segments()):
+            resolve_start: float = time.perf_counter() if self._trace_recorder is not None else 0.0
+            self._stats.total_segments += 1
+            track_uri: str = unquote(str(segment_uri))
             if not track_uri.startswith("file:///"):
                 self._logger.debug("Unsupported track uri. Attempting path auto repair:\n -Track: %s \n -uri: %s",
-                                  segment.title,
+                                  segment_title,
                                   track_uri)
-                repaired_uri: str|bool = self._get_repaired_uri(track_uri)
+                repaired_uri: str|bool = self._get_repaired_uri(track_uri) \
+                    or self._get_library_index_uri(track_uri, segment_title, segment_duration)
                 if not repaired_uri:
                     self._logger.error("Path auto repair failed, skipping track.")
                     self._stats.skipped_tracks +=1
 
                 else:
                     self._logger.debug("Path auto repair successful, new track uri:\n %s", repaired_uri)
-                    segment.uri = repaired_uri
+                    track_uri = unquote(repaired_uri)
                     self._stats.repaired_uris += 1
+            elif self._library_index is not None:
+                track_file_abspath: str = os.path.abspath(track_uri.replace("file:///", "", 1))
+                if not self._directory_index.is_file(track_file_abspath):
+                    library_uri: str|None = self._get_library_index_uri(track_file_abspath, segment_title, segment_duration)
+                    if library_uri is not None:
+                        track_uri = unquote(library_uri)
 
-            track: Track = self._get_track_by_segment_data(track_index, segment)
-            self._tracks.append(track)
+            self._stats.loaded_tracks += 1
+            track: Track = self._get_track_by_segment_data(track_index, track_uri, segment_title, segment_duration)
+            if self._trace_recorder is not None:
+                self._trace_recorder.add_span("resolve", resolve_start, time.perf_counter() - resolve_start,
+                                              args={"track": track_index + 1})
 
-        self._logger.debug("Loaded tracks: %s", self._tracks)
-        self._stats.loaded_tracks = len(self._tracks)
+            yield track
 
-        return True
-
-    def get_tracks(self) -> list[Track]:
-        """ Tracks getter. """
+    def get_tracks(self) -> TrackTable:
+        """ Tracks getter. The table is a read only Sequence[Track], that builds the Track tuples on access. """
 
         return self._tracks
 
@@ -91,23 +138,97 @@ class PlaylistParser:
         self._logger.debug("repaired_filepath: %s", repaired_filepath)
         file_abspath_from_uri: str|PosixPath|WindowsPath = os.path.abspath(repaired_filepath)
 
-        if not os.path.isfile(file_abspath_from_uri):
+        if not self._directory_index.is_file(file_abspath_from_uri):
             return False
 
         repaired_uri = "file:///"+repaired_filepath
 
         return repaired_uri
 
-    @staticmethod
-    def _get_track_by_segment_data(track_index: int, segment: Segment):
-        """ Get a Track object from segment data. """
+    def _get_library_index_uri(self, file_path: str, title: str, duration: float) -> str|None:
+        """ Look up the current path of a missing track file in the library index.
+        Returns None without a library index, or if the track is not in it.
+        """
+
+        if self._library_index is None:
+            return None
+
+        library_file_path: str|None = self._library_index.resolve(file_path, title, duration)
+        if library_file_path is None:
+            self._logger.debug("Track is not found in the library index: %s", file_path)
+            self._stats.library_index_misses += 1
+
+            return None
+
+        self._logger.debug("Track found in the library index:\n %s", library_file_path)
+        self._stats.library_index_hits += 1
+
+        # The uri is unquoted before the track is built, the path is quoted so a % in it is kept.
+        return "file:///" + quote(library_file_path)
+
+    def _iter_segments(self) -> Iterator[tuple[str, str, float]]:
+        """ Yield the uri, title and duration of the playlist's track segments with the configured parser backend. """
+
+        if self._parser_backend == "m3u8":
+            return self._iter_m3u8_segments()
+
+        return self._iter_streamed_segments()
+
+    def _iter_m3u8_segments(self) -> Iterator[tuple[str, str, float]]:
+        """ Load the whole playlist with the m3u8 library and yield its segments. """
+
+        # Reason: The m3u8 library is slow to import, it is only needed by its parser backend.
+        # pylint: disable-next=import-outside-toplevel
+        import m3u8
+
+        playlist_absolute_file_uri: str|PosixPath|WindowsPath = "file:///"+os.path.abspath(self._playlist_file_path)
+        self._logger.debug("playlist_absolute_filepath: %s", playlist_absolute_file_uri)
+        playlist: m3u8.M3U8 = m3u8.load(playlist_absolute_file_uri)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Loaded playlist content: %s", playlist.dumps())
+
+        for segment in playlist.segments:
+            # A trailing #EXTINF line without a uri is loaded as a segment without uri, it is not a track.
+            if segment.uri is not None:
+                yield segment.uri, segment.title, segment.duration
+
+    def _iter_streamed_segments(self) -> Iterator[tuple[str, str, float]]:
+        """ Read the playlist line by line and yield its segments, following the m3u8 library's parsing rules:
+        A segment is a uri line, that follows an #EXTINF:<duration>,<title> line. Other lines are ignored.
+        """
+
+        playlist_file_abspath: str|PosixPath|WindowsPath = os.path.abspath(self._playlist_file_path)
+        self._logger.debug("playlist_absolute_filepath: %s", playlist_file_abspath)
+
+        with open(playlist_file_abspath, "r", encoding="utf-8-sig") as playlist_file:
+            expect_segment: bool = False
+            segment_title: str = ""
+            segment_duration: float = 0.0
+            for line in playlist_file:
+                line = line.strip()
+                if line.startswith("#EXTINF"):
+                    extinf_chunks: list[str] = line.replace("#EXTINF:", "").split(",", 1)
+                    segment_duration = float(extinf_chunks[0])
+                    segment_title = extinf_chunks[1] if len(extinf_chunks) == 2 else ""
+                    expect_segment = True
+                elif expect_segment and line and not line.startswith("#"):
+                    yield line, segment_title, segment_duration
+                    expect_segment = False
+
+    def _get_track_by_segment_data(self, track_index: int, track_uri: str, segment_title: str, segment_duration: float):
+        """ Get a Track object from segment data, with the file size and modification time from the directory index.
+        The track uri is already unquoted.
+        """
 
-        track_file_abspath = os.path.abspath(unquote(str(segment.uri.replace("file:///", "", 1))))
+        track_file_abspath = os.path.abspath(track_uri.replace("file:///", "", 1))
+        track_file_stat: os.stat_result|None = self._directory_index.stat(track_file_abspath)
 
         return Track(
             abs_file_path=track_file_abspath,
             file_name=os.path.basename(track_file_abspath),
             order=track_index + 1,
-            title=segment.title,
-            duration=segment.duration
+            title=segment_title,
+            duration=segment_duration,
+            file_size=track_file_stat.st_size if track_file_stat is not None else None,
+            file_mtime=track_file_stat.st_mtime if track_file_stat is not None else None
         )
@@ -2,45 +2,196 @@
 
 import logging
 import os.path
+import heapq
 import re
 import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import PosixPath, WindowsPath
 
+from album_archive_writer import AlbumArchiveWriter
+from album_manifest import AlbumManifest, AlbumManifestEntry
+from copy_cache import CopyCache
+from export_context import ExportContext
 from playlist_exporter_configuration import PlaylistExporterConfiguration
 from exporter_stats import ExporterStats
+from export_plan import ExportPlan, ExportPlanAction
+from io_scheduler import IoScheduler
+from library_index import LibraryIndex
 from playlist_parser import PlaylistParser
+from process_pool_tagger import ProcessPoolTagger, TagResult
+from source_file_cache import SourceFileCache
 from file_metadata_setter import FileMetadataSetter
-from utility.track_duration_formatter import format_duration
 from track import Track
+from track_table import TrackTable
+from track_file_copier import TrackFileCopier
+from track_prober import ProbeResult, TrackProber
+from track_transcoder import TranscodeResult, TrackTranscoder
 
+# Leading track number prefix of a file name, one or more digits followed by a hyphen and space.
+NUMERIC_PREFIX_PATTERN: re.Pattern = re.compile(r'^\d+ - ')
 
+
+# Reason: The exporter holds the state of the parsed playlist and of every export stage,
+# the services it shares with the other exports of a run are grouped in the export context.
+# pylint: disable-next=too-many-instance-attributes
 class PlaylistToAlbumExporter:
     """ Main class of the .m3u8 playlist file to album exporter. """
 
     _logger: logging.Logger = None
     _config: PlaylistExporterConfiguration = None
     _stats: ExporterStats = None
+    _stats_lock: threading.Lock = None
     _playlist_parser: PlaylistParser = None
+    _manifest: AlbumManifest|None = None
+    _track_file_copier: TrackFileCopier = None
+    # The shared services of the export, with the ones the exporter made for itself.
+    _context: ExportContext = None
+    # The exporter closes the library index it opened itself, a shared one is closed by its owner.
+    _owns_library_index: bool = False
+    _track_transcoder: TrackTranscoder|None = None
+    _transcoded_files: dict[str, str] = None
+    _process_pool_tagger: ProcessPoolTagger|None = None
     _export_enabled: bool = False
+    _stream_tracks: bool = False
+    _tracks_len: int = 0
+    # Track count and its number of digits, of the last zero-padded track number.
+    _track_number_width: tuple[int, int] = (0, 1)
     _tracks: list[Track] = []
 
-    def __init__(self, config: PlaylistExporterConfiguration):
+    def __init__(self, config: PlaylistExporterConfiguration, context: ExportContext|None = None):
+        """ The services of the context can be shared between the exporters of a batch run, the exporter makes its own
+        for the ones that are not set. With a trace recorder, the stages of the export and of every track are recorded
+        as spans.
+        """
+
         self._logger = logging.getLogger("PlaylistToAlbumExporter")
         self._config = config
         self._stats = ExporterStats()
-        self._playlist_parser = PlaylistParser(self._config.playlist_file_path)
+        self._stats_lock = threading.Lock()
+        self._context = self._get_export_context(context if context is not None else ExportContext())
+        self._playlist_parser = PlaylistParser(self._config.playlist_file_path,
+                                               self._config.parser_backend,
+                                               self._context.source_file_cache.get_directory_index(),
+                                               self._context.library_index,
+                                               self._context.trace_recorder)
+        # Incremental export compares the whole playlist with the previous export, probing reads the headers of
+        # every track and transcoding encodes every track, before exporting anything.
+        self._stream_tracks = self._config.parser_backend == "stream" and not self._config.incremental \
+            and self._config.probe.workers == 0 and self._config.transcode.output_format is None
+        if self._config.transcode.output_format is not None:
+            self._track_transcoder = TrackTranscoder(self._config.transcode.output_format,
+                                                     self._config.transcode.bitrate,
+                                                     self._config.transcode.processes,
+                                                     self._config.transcode.cache_directory)
+            self._transcoded_files = {}
+        self._track_file_copier = TrackFileCopier(self._config.copy.strategy,
+                                                  allow_hardlink=not self._config.set_file_metadata,
+                                                  buffer_size=self._config.copy.buffer_size,
+                                                  throttle=self._context.io_scheduler.throttle
+                                                  if self._context.io_scheduler.is_bandwidth_limited() else None)
+        if self._config.tagging.processes > 0 and self._config.set_file_metadata:
+            self._process_pool_tagger = ProcessPoolTagger(self._config.tagging.processes,
+                                                          self._config.tagging.batch_size,
+                                                          self._handle_tag_result)
+
+    def _get_export_context(self, context: ExportContext) -> ExportContext:
+        """ Get the export context with the services, that are not shared, made from the configuration. """
+
+        if context.library_index is None and self._config.library.root is not None:
+            context = context._replace(library_index=self.open_library_index(self._config))
+            self._owns_library_index = context.library_index is not None
+        if context.source_file_cache is None:
+            context = context._replace(source_file_cache=SourceFileCache())
+        if context.track_prober is None and self._config.probe.workers > 0:
+            context = context._replace(track_prober=TrackProber(self._config.probe.workers, self._config.probe.cache_file))
+        if context.io_scheduler is None:
+            context = context._replace(io_scheduler=IoScheduler(*self._config.io))
+        if context.copy_cache is None and self._config.copy_cache.directory is not None:
+            context = context._replace(copy_cache=CopyCache(self._config.copy_cache.directory,
+                                                            self._config.copy_cache.max_bytes,
+                                                            self._config.copy_cache.digest,
+                                                            self._config.copy.buffer_size))
+
+        return context
+
+    @staticmethod
+    def open_library_index(config: PlaylistExporterConfiguration) -> LibraryIndex|None:
+        """ Open the configured library index, and update it with the changes of the library.
+        Returns None if the index can not be opened or updated, the tracks are exported without it.
+        """
+
+        logger: logging.Logger = logging.getLogger("PlaylistToAlbumExporter")
+        library_index = LibraryIndex(config.library.root, config.library.index_file)
+        try:
+            library_index.open()
+            library_index.update()
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Library index error, exporting without it: %s", e)
+            library_index.close()
+
+            return None
+
+        return library_index
+
+    @staticmethod
+    def get_exporter_class(config: PlaylistExporterConfiguration) -> type["PlaylistToAlbumExporter"]:
+        """ Get the exporter of the configured output and engine. """
+
+        # Reason: The archive exporter is only needed for archive output, asyncio is slow to import,
+        # it is only needed by the async engine.
+        # pylint: disable=import-outside-toplevel
+        if AlbumArchiveWriter.is_archive_path(config.output_directory):
+            from archive_playlist_to_album_exporter import ArchivePlaylistToAlbumExporter
+
+            return ArchivePlaylistToAlbumExporter
+        if config.engine.name == "async":
+            from async_playlist_to_album_exporter import AsyncPlaylistToAlbumExporter
+
+            return AsyncPlaylistToAlbumExporter
+        # pylint: enable=import-outside-toplevel
+
+        return PlaylistToAlbumExporter
+
+    def _close_library_index(self):
+        """ Close the library index, if the exporter opened it. The tracks are resolved when it is closed. """
+
+        if self._owns_library_index:
+            self._context.library_index.close()
+            self._owns_library_index = False
 
     def parse_playlist(self) -> bool:
-        """ Parse the playlist, enable export if successful. """
+        """ Parse the playlist, enable export if successful.
+
+        With the streaming parser backend only the tracks are counted here,
+        they are parsed one by one during the export.
+        """
 
         self._logger.info("Parsing playlist...")
-        if not self._playlist_parser.parse_playlist():
-            self._logger.error("Playlist failed to load, export disabled, exiting. ")
+        parse_start: float = time.perf_counter()
+        if self._stream_tracks:
+            tracks_len: int|None = self._playlist_parser.count_segments()
+            if tracks_len is None:
+                self._logger.error("Playlist failed to load, export disabled, exiting. ")
+                self._close_library_index()
 
-            return False
+                return False
 
+            self._tracks_len = tracks_len
+        else:
+            if not self._playlist_parser.parse_playlist():
+                self._logger.error("Playlist failed to load, export disabled, exiting. ")
+                self._close_library_index()
+
+                return False
+
+            self._stats += self._playlist_parser.get_stats()
+
+        self._add_stage_seconds("parse", parse_start)
         self._logger.info("Parsing successful.")
-        self._stats += self._playlist_parser.get_stats()
         self._export_enabled = True
 
         return True
@@ -54,11 +205,127 @@ class PlaylistToAlbumExporter:
             return False
 
         self._logger.info("Exporting Album...")
+        export_start: float = time.perf_counter()
         self._copy_and_set_metadata()
+        if self._context.copy_cache is not None:
+            self._context.copy_cache.save()
+        if self._track_transcoder is not None:
+            self._track_transcoder.close()
+        if self._stream_tracks:
+            self._check_streamed_track_count()
+            self._stats += self._playlist_parser.get_stats()
+        self._close_library_index()
+        self._add_stage_seconds("export", export_start)
         self._logger.info("Export finished, statistics: %s", self._stats)
 
         return True
 
+    def get_tracks(self) -> TrackTable|None:
+        """ Get the parsed tracks, None with the streaming parser backend, that parses them during the export. """
+
+        if not self._export_enabled or self._stream_tracks:
+            return None
+
+        return self._playlist_parser.get_tracks()
+
+    def get_stats(self) -> ExporterStats:
+        """ Stats getter. """
+
+        return self._stats
+
+    def get_export_plan(self) -> ExportPlan|None:
+        """ Plan the export of the parsed playlist, without copying, tagging or creating the album folder.
+
+        Every track is resolved and stat'ed from the directory index, and gets the same target name as in the export.
+        An incremental export is planned against the previous export's manifest.
+        Returns None if no playlist was parsed successfully.
+        """
+
+        if not self._export_enabled:
+            self._logger.error("Export planning is disabled. Successfully parse a playlist first.")
+
+            return None
+
+        tracks_len: int
+        tracks: Iterable[Track]
+        if self._stream_tracks:
+            tracks_len = self._tracks_len
+            tracks = self._playlist_parser.iter_tracks()
+        else:
+            tracks = self._playlist_parser.get_tracks()
+            tracks_len = len(tracks)
+
+        previous_entries_by_source: dict[str, list[AlbumManifestEntry]] = self._get_planned_manifest_entries()
+        export_plan = ExportPlan(self._config.album_name, self._config.output_directory)
+        for track in tracks:
+            export_plan.add_action(self._plan_track(track, tracks_len, previous_entries_by_source))
+
+        for removed_entries in previous_entries_by_source.values():
+            for removed_entry in removed_entries:
+                if os.path.isfile(os.path.join(self._config.output_directory, removed_entry.file_name)):
+                    export_plan.add_action(ExportPlanAction(removed_entry.order, "remove", removed_entry.source_path,
+                                                            removed_entry.file_name, removed_entry.size, False))
+
+        if self._stream_tracks:
+            self._check_streamed_track_count()
+
+        return export_plan
+
+    def _get_planned_manifest_entries(self) -> dict[str, list[AlbumManifestEntry]]:
+        """ Get the entries of the previous export's manifest by their source file paths, to plan an incremental export
+        against. Empty if the export is not incremental.
+        """
+
+        previous_entries_by_source: dict[str, list[AlbumManifestEntry]] = {}
+        if self._config.incremental:
+            for entry in AlbumManifest(self._config.output_directory).load():
+                previous_entries_by_source.setdefault(entry.source_path, []).append(entry)
+
+        return previous_entries_by_source
+
+    def _plan_track(self,
+                    track: Track,
+                    tracks_len: int,
+                    previous_entries_by_source: dict[str, list[AlbumManifestEntry]]) -> ExportPlanAction:
+        """ Plan the export of a track, against the previous export of its source file if there is one. """
+
+        if self._track_transcoder is not None:
+            track = self._get_transcoded_track(track)
+        if not self._context.source_file_cache.is_file(track.abs_file_path):
+            return ExportPlanAction(track.order, "missing", track.abs_file_path, None, None, False)
+
+        action: str = "copy"
+        is_tagged: bool = self._config.set_file_metadata
+        new_entry: AlbumManifestEntry|None = self._get_manifest_entry(track, tracks_len)
+        previous_entry: AlbumManifestEntry|None = None
+        if new_entry is not None and self._config.incremental:
+            previous_entry = self._claim_previous_manifest_entry(previous_entries_by_source, new_entry)
+        if previous_entry is not None:
+            is_unchanged: bool = previous_entry.file_name == new_entry.file_name and previous_entry.tags == new_entry.tags
+            action = "keep" if is_unchanged else "rename"
+            is_tagged = previous_entry.tags != new_entry.tags and self._config.set_file_metadata
+
+        return ExportPlanAction(
+            track.order,
+            action,
+            track.abs_file_path,
+            self._get_output_file_name(track, tracks_len),
+            track.file_size,
+            is_tagged
+        )
+
+    def _check_streamed_track_count(self):
+        """ Warn if the playlist was saved between counting its tracks and streaming them.
+        The numbers and the zero padding of the streamed tracks are based on the earlier count.
+        """
+
+        streamed_tracks: int = self._playlist_parser.get_stats().total_segments
+        if streamed_tracks != self._tracks_len:
+            self._logger.warning("Playlist changed during the export, %s tracks were counted and %s streamed, "
+                                 "track numbers may be off, export the album again.",
+                                 self._tracks_len,
+                                 streamed_tracks)
+
     def _copy_and_set_metadata(self):
         """ Copy the loaded tracks into the designated album folder.
          Set album and track # metadata.
@@ -74,73 +341,653 @@ class PlaylistToAlbumExporter:
                                self._config.output_directory,
                                e)
 
-        tracks: list[Track] = self._playlist_parser.get_tracks()
-        tracks_len: int = len(tracks)
-        for track_index, track in enumerate(tracks):
-            if not os.path.isfile(track.abs_file_path):
-                self._logger.error("Track %s/%s file not found. Skipping:\n -Track: %s \n -filepath: %s, ",
+        tracks_len, tracks_to_export = self._get_tracks_to_export()
+        if self._config.incremental:
+            self._manifest = AlbumManifest(self._config.output_directory)
+            tracks_to_export = self._apply_manifest_changes(tracks_to_export, tracks_len)
+        if self._track_transcoder is not None:
+            tracks_to_export = self._transcode_tracks(tracks_to_export, tracks_len)
+
+        self._export_tracks(tracks_to_export, tracks_len)
+        if self._process_pool_tagger is not None:
+            self._process_pool_tagger.close()
+
+        if self._manifest is not None:
+            self._manifest.save()
+
+    def _get_tracks_to_export(self) -> tuple[int, Iterable[tuple[int, Track]]]:
+        """ Get the number of tracks, and the indexed tracks to export, without the probed unreadable ones.
+        With transcoding, the tracks have the file names of the output format.
+        """
+
+        if self._stream_tracks:
+            return self._tracks_len, enumerate(self._playlist_parser.iter_tracks())
+
+        tracks: TrackTable = self._playlist_parser.get_tracks()
+        # The Track tuples are built one by one as they are exported, not all at once.
+        tracks_to_export: Iterable[tuple[int, Track]] = self._probe_tracks(tracks) if self._context.track_prober is not None \
+            else enumerate(tracks)
+        if self._track_transcoder is not None:
+            tracks_to_export = ((track_index, self._get_transcoded_track(track)) for track_index, track in tracks_to_export)
+
+        return len(tracks), tracks_to_export
+
+    def _probe_tracks(self, tracks: TrackTable) -> list[tuple[int, Track]]:
+        """ Read the headers of the track files, replace the playlist durations with the probed ones,
+        and leave out the tracks with unreadable files. Returns the indexed tracks to export.
+        """
+
+        self._logger.info("Probing %s track files...", len(tracks))
+        probe_start: float = time.perf_counter()
+        probe_results: list[ProbeResult|None]
+        cache_hits: int
+        probe_results, cache_hits = self._context.track_prober.probe_tracks(list(tracks))
+        self._context.track_prober.save()
+        self._increment_stat("probe_cache_hits", cache_hits)
+
+        tracks_to_export: list[tuple[int, Track]] = []
+        for track_index, probe_result in enumerate(probe_results):
+            if probe_result is None:
+                tracks_to_export.append((track_index, tracks[track_index]))
+            elif probe_result.error is not None:
+                track: Track = tracks[track_index]
+                self._logger.error("Track %s/%s file can not be read. Skipping:\n -Track: %s \n -filepath: %s \n -error: %s",
                                    track_index + 1,
-                                   tracks_len,
+                                   len(tracks),
                                    track.title,
-                                   track.abs_file_path)
-                self._stats.file_not_found_tracks += 1
+                                   track.abs_file_path,
+                                   probe_result.error)
+                self._increment_stat("probe_error_tracks")
             else:
-                self._logger.info("Exporting track %s/%s: %s | %s", track_index + 1,
-                                  tracks_len,
-                                  track.title,
-                                  format_duration(track.duration)
-                                  )
-                exported_track_file_abspath = self._copy_track(track_index, tracks_len, track)
+                tracks.set_audio_info(track_index, probe_result.duration, probe_result.bitrate)
+                tracks_to_export.append((track_index, tracks[track_index]))
+        self._add_stage_seconds("probe", probe_start)
 
-                if exported_track_file_abspath:
-                    self._set_track_file_metadata(track.abs_file_path, track_index + 1)
+        return tracks_to_export
 
-    def _copy_track(self, track_index: int, tracks_len: int, track: Track) -> str | bool:
-        """ Copy the track and rename if prefixing is enabled. """
+    def _get_transcoded_track(self, track: Track) -> Track:
+        """ Get a track with the file name and bitrate of its transcoded file. """
 
-        self._logger.debug("Copying track %s/%s: %s", track_index + 1, tracks_len, track.title)
-        self._logger.debug("Copying track details: %s", track.title)
-        try:
-            output_file_abs_path: str
-            if self._config.add_ordering_prefix_to_filename:
-                cleaned_track_name = self._strip_numeric_prefix(track.file_name)
-                track_file_name: str = self._format_track_number_with_zero_padding(track.order, tracks_len) + " - " + cleaned_track_name
-                output_file_abs_path = os.path.join(self._config.output_directory, track_file_name)
+        return track._replace(file_name=self._track_transcoder.get_output_file_name(track.file_name),
+                              bitrate=self._track_transcoder.get_bitrate())
+
+    def _transcode_tracks(self, tracks: Iterable[tuple[int, Track]], tracks_len: int) -> list[tuple[int, Track]]:
+        """ Encode the source files of the tracks, before they are exported, and leave out the tracks whose
+        files failed to encode. The transcoded files are exported instead of the source files.
+        Returns the indexed tracks to export.
+        """
+
+        indexed_tracks: list[tuple[int, Track]] = list(tracks)
+        tracks_to_transcode: list[Track] = [
+            track for _, track in indexed_tracks if self._context.source_file_cache.is_file(track.abs_file_path)
+        ]
+        self._logger.info("Transcoding %s track files to %s...", len(tracks_to_transcode), self._config.transcode.output_format)
+        transcode_start: float = time.perf_counter()
+        transcode_results: dict[str, TranscodeResult] = self._track_transcoder.transcode_tracks(tracks_to_transcode)
+        for result in transcode_results.values():
+            if result.error is None:
+                self._increment_stat("transcode_cache_hits" if result.is_cached else "transcoded_tracks")
+                self._add_track_latency("transcode", result.seconds)
+
+        tracks_to_export: list[tuple[int, Track]] = []
+        for track_index, track in indexed_tracks:
+            transcode_result: TranscodeResult|None = transcode_results.get(str(track.abs_file_path))
+            if transcode_result is not None and transcode_result.error is not None:
+                self._logger.error("Track %s/%s file can not be transcoded. Skipping:\n -Track: %s \n -filepath: %s \n -error: %s",
+                                   track_index + 1,
+                                   tracks_len,
+                                   track.title,
+                                   track.abs_file_path,
+                                   transcode_result.error)
+                self._increment_stat("transcode_error_tracks")
+                continue
+
+            if transcode_result is not None:
+                self._transcoded_files[str(track.abs_file_path)] = transcode_result.file_path
+            # Tracks with a missing source file are logged and counted when they are exported.
+            tracks_to_export.append((track_index, track))
+        self._add_stage_seconds("transcode", transcode_start)
+
+        return tracks_to_export
+
+    def _export_tracks(self, tracks: Iterable[tuple[int, Track]], tracks_len: int):
+        """ Copy and tag the tracks, one by one or on a thread pool. """
+
+        if self._config.engine.workers > 1:
+            self._export_tracks_concurrently(tracks, tracks_len)
+        else:
+            for track_index, track in tracks:
+                self._export_track(track_index, tracks_len, track)
+
+    def _apply_manifest_changes(self, tracks: Iterable[tuple[int, Track]], tracks_len: int) -> list[tuple[int, Track]]:
+        """ Compare the tracks with the previous export's manifest and update the album folder in place.
+
+        Tracks with an unchanged source file and target name are kept, tracks that only moved in the playlist are renamed
+        and re-tagged, exported files of tracks that left the playlist are removed.
+        Returns the tracks that still have to be exported.
+        """
+
+        previous_entries_by_source: dict[str, list[AlbumManifestEntry]] = {}
+        for entry in self._manifest.load():
+            previous_entries_by_source.setdefault(entry.source_path, []).append(entry)
+
+        tracks_to_export: list[tuple[int, Track]] = []
+        tracks_to_rename: list[tuple[AlbumManifestEntry, AlbumManifestEntry]] = []
+        for track_index, track in tracks:
+            new_entry: AlbumManifestEntry|None = self._get_manifest_entry(track, tracks_len)
+            previous_entry: AlbumManifestEntry|None = None
+            if new_entry is not None:
+                previous_entry = self._claim_previous_manifest_entry(previous_entries_by_source, new_entry)
+
+            if previous_entry is None:
+                tracks_to_export.append((track_index, track))
+            elif previous_entry.file_name == new_entry.file_name and previous_entry.tags == new_entry.tags:
+                self._logger.debug("Track %s/%s unchanged: %s", track_index + 1, tracks_len, track.title)
+                self._manifest.add_entry(new_entry)
+                self._increment_stat("unchanged_tracks")
             else:
-                output_file_abs_path = os.path.join(self._config.output_directory, track.file_name)
+                tracks_to_rename.append((previous_entry, new_entry))
+
+        for removed_entries in previous_entries_by_source.values():
+            for removed_entry in removed_entries:
+                self._remove_exported_file(removed_entry)
+
+        self._rename_exported_files(tracks_to_rename)
+
+        return tracks_to_export
 
-            shutil.copy2(track.abs_file_path, output_file_abs_path)
-            self._logger.debug("Track copy done.")
-            self._stats.exported_tracks += 1
+    def _get_manifest_entry(self, track: Track, tracks_len: int) -> AlbumManifestEntry|None:
+        """ Get the manifest entry of a track's export. Returns None if the source file can not be stat'ed. """
 
+        if track.file_size is None:
+            return None
+
+        return AlbumManifestEntry(
+            source_path=track.abs_file_path,
+            size=track.file_size,
+            mtime=track.file_mtime,
+            order=track.order,
+            file_name=self._get_output_file_name(track, tracks_len),
+            tags=self._get_track_metadata(track.order) if self._config.set_file_metadata else {}
+        )
+
+    def _claim_previous_manifest_entry(self,
+                                       previous_entries_by_source: dict[str, list[AlbumManifestEntry]],
+                                       new_entry: AlbumManifestEntry) -> AlbumManifestEntry|None:
+        """ Take the previous export of the same, unmodified source file out of the unclaimed previous entries.
+        An entry with the same target name is preferred, so duplicate tracks keep their files.
+        """
+
+        candidates: list[AlbumManifestEntry] = [
+            entry for entry in previous_entries_by_source.get(new_entry.source_path, [])
+            if entry.size == new_entry.size
+            and entry.mtime == new_entry.mtime
+            and os.path.isfile(os.path.join(self._config.output_directory, entry.file_name))
+        ]
+        if not candidates:
+            return None
+
+        claimed_entry: AlbumManifestEntry = next(
+            (entry for entry in candidates if entry.file_name == new_entry.file_name),
+            candidates[0]
+        )
+        previous_entries_by_source[new_entry.source_path].remove(claimed_entry)
+
+        return claimed_entry
+
+    def _remove_exported_file(self, entry: AlbumManifestEntry):
+        """ Remove the exported file of a track that is no longer in the playlist. """
+
+        exported_file_abs_path: str = os.path.join(self._config.output_directory, entry.file_name)
+        if not os.path.isfile(exported_file_abs_path):
+            return
+
+        self._logger.info("Removing track no longer in the playlist: %s", entry.file_name)
+        try:
+            os.remove(exported_file_abs_path)
+            self._increment_stat("removed_tracks")
         except Exception as e:
-            self._logger.error("Track copy error: %s", e)
+            self._logger.error("Track removal error: %s", e)
+
+    def _rename_exported_files(self, renamed_entries: list[tuple[AlbumManifestEntry, AlbumManifestEntry]]):
+        """ Rename and re-tag the exported files of reordered tracks.
+
+        Files are moved to temporary names first, so that swapped track names do not overwrite each other.
+        """
+
+        temporary_file_paths: list[tuple[str, AlbumManifestEntry, AlbumManifestEntry]] = []
+        for previous_entry, new_entry in renamed_entries:
+            exported_file_abs_path: str = os.path.join(self._config.output_directory, previous_entry.file_name)
+            temporary_file_path: str = os.path.join(self._config.output_directory,
+                                                    f".{new_entry.order}.{previous_entry.file_name}.renaming")
+            try:
+                os.replace(exported_file_abs_path, temporary_file_path)
+                temporary_file_paths.append((temporary_file_path, previous_entry, new_entry))
+            except Exception as e:
+                self._logger.error("Track rename error: %s", e)
+
+        for temporary_file_path, previous_entry, new_entry in temporary_file_paths:
+            self._logger.info("Renaming track: %s -> %s", previous_entry.file_name, new_entry.file_name)
+            renamed_file_abs_path: str = os.path.join(self._config.output_directory, new_entry.file_name)
+            try:
+                os.replace(temporary_file_path, renamed_file_abs_path)
+            except Exception as e:
+                self._logger.error("Track rename error: %s", e)
+                continue
+
+            if previous_entry.tags != new_entry.tags and self._config.set_file_metadata:
+                if self._unshare_exported_file(renamed_file_abs_path):
+                    self._set_track_file_metadata(renamed_file_abs_path, new_entry.order)
+                else:
+                    self._discard_manifest_tags(renamed_file_abs_path)
+            self._manifest.add_entry(new_entry)
+            self._increment_stat("renamed_tracks")
+
+    def _unshare_exported_file(self, exported_file_abs_path: str) -> bool:
+        """ Copy an exported file in place, if it is a hard link, before it is tagged in place.
+        A file exported with the hardlink copy strategy is the source file, and maybe a file of other albums,
+        tagging it would tag them too. Returns False if the file can not be copied, it must not be tagged then.
+        """
+
+        try:
+            if os.stat(exported_file_abs_path).st_nlink == 1:
+                return True
+
+            self._logger.debug("Exported file is a hard link, copying it before tagging: %s", exported_file_abs_path)
+            self._track_file_copier.copy(exported_file_abs_path, exported_file_abs_path, allow_hardlink=False)
+        except OSError as e:
+            self._logger.error("Hard linked track can not be copied, it is not tagged: %s", e)
+            self._increment_stat("file_media_metadata_errors")
 
             return False
 
+        return True
+
+    def _export_tracks_concurrently(self, tracks: Iterable[tuple[int, Track]], tracks_len: int):
+        """ Copy and tag the tracks on a thread pool.
+
+        The number of submitted, but unfinished tracks is capped at twice the worker count,
+        so a long playlist does not queue up every track at once.
+        """
+
+        self._logger.info("Exporting tracks with %s workers.", self._config.engine.workers)
+        if self._context.executor is not None:
+            self._submit_tracks(self._context.executor, tracks, tracks_len)
+        else:
+            with ThreadPoolExecutor(max_workers=self._config.engine.workers, thread_name_prefix="TrackExport") as executor:
+                self._submit_tracks(executor, tracks, tracks_len)
+
+    def _submit_tracks(self, executor: ThreadPoolExecutor, tracks: Iterable[tuple[int, Track]], tracks_len: int):
+        """ Submit the track exports to the executor and wait for all of them to finish. """
+
+        max_tracks_in_flight: int = self._config.engine.workers * 2
+        if self._context.io_scheduler.is_enabled():
+            tracks = self._order_small_tracks_first(tracks, max_tracks_in_flight)
+
+        tracks_in_flight: set[Future] = set()
+        for track_index, track in tracks:
+            if len(tracks_in_flight) >= max_tracks_in_flight:
+                done, tracks_in_flight = wait(tracks_in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+
+            tracks_in_flight.add(executor.submit(self._export_track, track_index, tracks_len, track))
+
+        for future in tracks_in_flight:
+            future.result()
+
+    @staticmethod
+    def _order_small_tracks_first(tracks: Iterable[tuple[int, Track]], window_size: int) -> Iterator[tuple[int, Track]]:
+        """ Reorder the tracks smallest first, within a window of the next tracks of the playlist.
+        The tracks keep their index, their file names and track numbers still follow the playlist order.
+        """
+
+        window: list[tuple[int, int, Track]] = []
+        for track_index, track in tracks:
+            heapq.heappush(window, (track.file_size or 0, track_index, track))
+            if len(window) > window_size:
+                _, next_track_index, next_track = heapq.heappop(window)
+                yield next_track_index, next_track
+
+        while window:
+            _, next_track_index, next_track = heapq.heappop(window)
+            yield next_track_index, next_track
+
+    def _export_track(self, track_index: int, tracks_len: int, track: Track):
+        """ Copy a single track into the album folder and set its metadata. """
+
+        stage_start: float = time.perf_counter()
+        is_source_file: bool = self._context.source_file_cache.is_file(track.abs_file_path)
+        stat_seconds: float = time.perf_counter() - stage_start
+        if not self._start_track_export(track_index, tracks_len, track, is_source_file, stat_seconds):
+            return
+
+        stage_start = time.perf_counter()
+        copy_source_file_path: str = self._get_copy_source(track)
+        exported_track_file_abspath: str|bool|None = None
+        if self._config.tag_while_copying and self._config.set_file_metadata:
+            exported_track_file_abspath = self._copy_track_with_metadata(track_index, tracks_len, track,
+                                                                         copy_source_file_path)
+
+        is_tagged_while_copying: bool = exported_track_file_abspath is not None
+        if not is_tagged_while_copying:
+            exported_track_file_abspath = self._copy_track(track_index, tracks_len, track, copy_source_file_path)
+        self._update_copy_cache(track, copy_source_file_path, exported_track_file_abspath, not is_tagged_while_copying)
+        copy_seconds: float = time.perf_counter() - stage_start
+        self._add_track_latency("copy", copy_seconds, track_index + 1)
+
+        tag_seconds: float = 0.0
+        file_to_tag: str|None = self._get_file_to_tag(exported_track_file_abspath, track_index + 1, is_tagged_while_copying)
+        if file_to_tag is not None:
+            tag_seconds = self._set_track_file_metadata(file_to_tag, track_index + 1)
+
+        self._log_track_timings(track_index, tracks_len, track, (stat_seconds, copy_seconds, tag_seconds))
+        if exported_track_file_abspath:
+            self._register_exported_track(track, tracks_len, exported_track_file_abspath)
+
+    def _start_track_export(self, track_index: int, tracks_len: int, track: Track, is_source_file: bool, stat_seconds: float) -> bool:
+        """ Record the time the source file check of a track took, and log the start of its export.
+        Returns False if its source file does not exist, the track is logged and counted as not found then.
+        """
+
+        self._add_track_latency("stat", stat_seconds, track_index + 1)
+        if not is_source_file:
+            self._logger.error("Track %s/%s file not found. Skipping:\n -Track: %s \n -filepath: %s, ",
+                               track_index + 1,
+                               tracks_len,
+                               track.title,
+                               track.abs_file_path)
+            self._increment_stat("file_not_found_tracks")
+
+            return False
+
+        self._logger.info("Exporting track %s/%s: %s | %s s", track_index + 1,
+                          tracks_len,
+                          track.title,
+                          track.duration
+                          )
+
+        return True
+
+    def _get_file_to_tag(self, exported_track_file_abspath: str|bool|None, track_order: int, is_tagged_while_copying: bool) -> str|None:
+        """ Get the exported file, that is tagged in place after its copy. With tagging processes, the file is queued
+        for them instead. Returns None if the file is not tagged after its copy, or queued for the tagging processes.
+        """
+
+        if not exported_track_file_abspath or not self._config.set_file_metadata or is_tagged_while_copying:
+            return None
+
+        if self._process_pool_tagger is not None:
+            self._process_pool_tagger.submit(exported_track_file_abspath, self._get_track_metadata(track_order))
+
+            return None
+
+        return exported_track_file_abspath
+
+    def _log_track_timings(self, track_index: int, tracks_len: int, track: Track, stage_seconds: tuple[float, float, float]):
+        """ Log the seconds the stat, copy and tag stages of a track took, at DEBUG level. """
+
+        if self._logger.isEnabledFor(logging.DEBUG):
+            stat_seconds, copy_seconds, tag_seconds = stage_seconds
+            self._logger.debug("Track %s/%s timings: stat %.2f ms | copy %.2f ms | tag %.2f ms | %s",
+                               track_index + 1,
+                               tracks_len,
+                               stat_seconds * 1000,
+                               copy_seconds * 1000,
+                               tag_seconds * 1000,
+                               track.abs_file_path)
+
+    def _register_exported_track(self, track: Track, tracks_len: int, exported_track_file_abspath: str):
+        """ Register the exported file as a replica of the source file, and in the manifest of an incremental export.
+        Only untagged, byte identical copies are replicas: a tagged file holds the tags of its own album, that an export
+        reading it would keep if its own tagging failed or was disabled. A transcoded file is not a copy either.
+        """
+
+        if not self._config.set_file_metadata and self._track_transcoder is None:
+            self._context.source_file_cache.add_replica(track.abs_file_path, exported_track_file_abspath)
+
+        if self._manifest is not None:
+            manifest_entry: AlbumManifestEntry|None = self._get_manifest_entry(track, tracks_len)
+            if manifest_entry is not None:
+                self._manifest.add_entry(manifest_entry)
+
+    def _increment_stat(self, stat_name: str, amount: int = 1):
+        """ Thread safe increment of an exporter statistic. """
+
+        with self._stats_lock:
+            setattr(self._stats, stat_name, getattr(self._stats, stat_name) + amount)
+
+    def _add_track_latency(self, stage: str, seconds: float, track_order: int|None = None):
+        """ Thread safe record of the time a stage took for a single track.
+        With a trace recorder and the track's order, the stage is recorded as a span, that ended now.
+        """
+
+        with self._stats_lock:
+            self._stats.add_track_latency(stage, seconds)
+        if self._context.trace_recorder is not None and track_order is not None:
+            self._context.trace_recorder.add_span(stage, time.perf_counter() - seconds, seconds,
+                                          args={"album": self._config.album_name, "track": track_order})
+
+    def _add_stage_seconds(self, stage: str, stage_start: float):
+        """ Record the time an export stage took since it started, and its span with a trace recorder. """
+
+        stage_seconds: float = time.perf_counter() - stage_start
+        self._stats.add_stage_seconds(stage, stage_seconds)
+        if self._context.trace_recorder is not None:
+            self._context.trace_recorder.add_span(stage, stage_start, stage_seconds, "stage", {"album": self._config.album_name})
+
+    def _copy_track(self, track_index: int, tracks_len: int, track: Track, copy_source_file_path: str) -> str | bool:
+        """ Copy the track from the path its content is read from, and rename if prefixing is enabled. """
+
+        self._logger.debug("Copying track %s/%s: %s", track_index + 1, tracks_len, track.title)
+        try:
+            output_file_abs_path: str = self._get_output_file_abs_path(track, tracks_len)
+            with self._context.io_scheduler.reserve(track.abs_file_path, track.file_size):
+                # Cached and transcoded files are private to their cache, the exported file is never linked to them.
+                is_source_copy: bool = copy_source_file_path == track.abs_file_path
+                copy_strategy: str = self._track_file_copier.copy(
+                    copy_source_file_path,
+                    output_file_abs_path,
+                    track.file_size if is_source_copy else None,
+                    allow_hardlink=is_source_copy
+                )
+            self._logger.debug("Track copy done with %s.", copy_strategy)
+            self._increment_stat("exported_tracks")
+            self._increment_stat("copied_bytes", os.path.getsize(output_file_abs_path))
+
+        except Exception as e:
+            return self._handle_track_copy_error(e)
+
+        return output_file_abs_path
+
+    def _handle_track_copy_error(self, error: Exception) -> bool:
+        """ Log and count a failed track copy. Returns False, the result of a failed copy. """
+
+        self._logger.error("Track copy error: %s", error)
+        self._increment_stat("copy_error_tracks")
+
+        return False
+
+    def _copy_track_with_metadata(self,
+                                  track_index: int,
+                                  tracks_len: int,
+                                  track: Track,
+                                  copy_source_file_path: str) -> str | bool | None:
+        """ Write the track's new tag block to the output file, then stream the untouched audio payload after it.
+        The source is read once and the output is written once, there is no tag rewrite after the copy.
+
+        Returns None if the file can only be tagged after copying.
+        """
+
+        self._logger.debug("Copying track with metadata %s/%s: %s", track_index + 1, tracks_len, track.title)
+        part_file_path: str|None = None
+        try:
+            output_file_abs_path: str = self._get_output_file_abs_path(track, tracks_len)
+            with self._context.io_scheduler.reserve(track.abs_file_path, track.file_size):
+                with open(copy_source_file_path, "rb") as source_file:
+                    try:
+                        tagged_header: tuple[bytes, int] | None = FileMetadataSetter.render_tagged_header(
+                            source_file,
+                            os.path.splitext(track.file_name)[1],
+                            self._get_track_metadata(track_index + 1)
+                        )
+                    except Exception as e:
+                        self._logger.error("Media file metadata setting error: %s", e)
+                        self._increment_stat("file_media_metadata_errors")
+                        self._discard_manifest_tags(output_file_abs_path)
+                        # Export the file untagged, the same as a failed tagging after a plain copy.
+                        tagged_header = (b"", 0)
+
+                    if tagged_header is None:
+                        self._logger.debug("Format can not be tagged while copying, falling back to copy then tag.")
+
+                        return None
+
+                    header, payload_offset = tagged_header
+                    source_file.seek(payload_offset)
+                    part_file_path = TrackFileCopier.get_part_file_path(output_file_abs_path)
+                    with open(part_file_path, "wb") as part_file:
+                        part_file.write(header)
+                        self._context.io_scheduler.copy_file_object(source_file, part_file, self._config.copy.buffer_size)
+
+                shutil.copystat(copy_source_file_path, part_file_path)
+                os.replace(part_file_path, output_file_abs_path)
+            self._logger.debug("Track copy with metadata done.")
+            self._increment_stat("exported_tracks")
+            self._increment_stat("copied_bytes", os.path.getsize(output_file_abs_path))
+
+        except Exception as e:
+            return self._handle_track_copy_error(e)
+        finally:
+            if part_file_path is not None and os.path.exists(part_file_path):
+                os.remove(part_file_path)
+
         return output_file_abs_path
 
-    def _set_track_file_metadata(self, file_abs_path: str | PosixPath | WindowsPath, track_order: int):
-        """ Set track file media metadata. """
+    def _get_copy_source(self, track: Track) -> str:
+        """ Get the path to read a track's content from, instead of its source file if possible:
+        an earlier exported copy of the same source file in this run, or its copy in the copy cache.
+        A copy cache file is pinned until _update_copy_cache releases it. Transcoded tracks are read from their
+        transcoded file.
+        """
+
+        if self._transcoded_files:
+            transcoded_file_path: str|None = self._transcoded_files.get(str(track.abs_file_path))
+            if transcoded_file_path is not None:
+                return transcoded_file_path
+
+        copy_source_file_path: str = self._context.source_file_cache.get_copy_source(track.abs_file_path)
+        if copy_source_file_path == track.abs_file_path and self._context.copy_cache is not None and track.file_size is not None:
+            cached_file_path: str|None = self._context.copy_cache.get_cached_file(track.abs_file_path,
+                                                                           track.file_size,
+                                                                           track.file_mtime)
+            if cached_file_path is None:
+                return track.abs_file_path
+
+            copy_source_file_path = cached_file_path
+
+        if copy_source_file_path != track.abs_file_path:
+            self._logger.debug("Duplicate track, reading it from %s", copy_source_file_path)
+            self._increment_stat("dedup_hits")
+            self._increment_stat("dedup_bytes_saved", track.file_size or 0)
+
+        return copy_source_file_path
+
+    def _update_copy_cache(self,
+                           track: Track,
+                           copy_source_file_path: str,
+                           exported_track_file_abspath: str|bool|None,
+                           is_unmodified_copy: bool):
+        """ Release the copy cache file a track was read from. A track read from its source file is cached once it is
+        exported: from the exported file if it is still an unmodified copy of the source, else from the source file in
+        the background, so a miss does not write the track twice before it is exported.
+        """
+
+        if self._context.copy_cache is None:
+            return
+
+        if copy_source_file_path != track.abs_file_path:
+            self._context.copy_cache.release_cached_file(copy_source_file_path)
+        elif exported_track_file_abspath and track.file_size is not None:
+            if is_unmodified_copy:
+                self._context.copy_cache.add_copy(track.abs_file_path, track.file_size, track.file_mtime, exported_track_file_abspath)
+            else:
+                self._context.copy_cache.add_in_background(track.abs_file_path, track.file_size, track.file_mtime, self._context.io_scheduler)
+
+    def _get_output_file_abs_path(self, track: Track, tracks_len: int) -> str:
+        """ Get the exported track's path, with the track number prefix if prefixing is enabled. """
+
+        return os.path.join(self._config.output_directory, self._get_output_file_name(track, tracks_len))
+
+    def _get_output_file_name(self, track: Track, tracks_len: int) -> str:
+        """ Get the exported track's file name, with the track number prefix if prefixing is enabled. """
+
+        if self._config.add_ordering_prefix_to_filename:
+            return self._format_track_number_with_zero_padding(track.order, tracks_len) + " - " \
+                + self._strip_numeric_prefix(track.file_name)
+
+        return track.file_name
+
+    def _get_track_metadata(self, track_order: int) -> dict[str, str]:
+        """ Get the album metadata to set on an exported track. """
+
+        return {
+            "album": self._config.album_name,
+            "tracknumber": str(track_order)
+        }
+
+    def _set_track_file_metadata(self, file_abs_path: str | PosixPath | WindowsPath, track_order: int) -> float:
+        """ Set track file media metadata. Returns the seconds it took. """
 
         self._logger.debug("Setting media file metadata...")
+        tag_start: float = time.perf_counter()
         try:
             metadata_setter = FileMetadataSetter(file_abs_path)
-            metadata_setter.set_album(self._config.album_name)
-            metadata_setter.set_tracknumber(track_order)
+            rewritten_bytes: int = metadata_setter.apply(self._get_track_metadata(track_order))
+            self._increment_stat("metadata_rewritten_bytes", rewritten_bytes)
             self._logger.debug("Media file metadata successfully set.")
         except Exception as e:
             self._logger.error("Media file metadata setting error: %s", e)
-            self._stats.file_media_metadata_errors += 1
+            self._increment_stat("file_media_metadata_errors")
+            self._discard_manifest_tags(file_abs_path)
 
-    @staticmethod
-    def _format_track_number_with_zero_padding(track_number: int, tracks_len: int) -> str:
-        """Format the track number with zero-padding based on the total number of tracks."""
+        tag_seconds: float = time.perf_counter() - tag_start
+        self._add_track_latency("tag", tag_seconds, track_order)
+
+        return tag_seconds
+
+    def _discard_manifest_tags(self, file_abs_path: str | PosixPath | WindowsPath):
+        """ Save the manifest entry of an exported file, whose tagging failed, without tags.
+        The next incremental export sees the tags changed, and tags the file again.
+        """
+
+        if self._manifest is not None:
+            self._manifest.discard_tags(os.path.basename(file_abs_path))
 
-        num_digits = len(str(tracks_len))
-        zero_padded_track_number: str = str(track_number).zfill(num_digits)
+    def _handle_tag_result(self, result: TagResult):
+        """ Count the result of a file tagged by a tagging process.
+        The manifest entry of a file, that was not tagged, is saved without tags.
+        """
+
+        self._add_track_latency("tag", result.seconds)
+        if result.error is None:
+            self._increment_stat("metadata_rewritten_bytes", result.rewritten_bytes)
+            self._logger.debug("Media file metadata successfully set: %s", result.file_path)
+        else:
+            self._logger.error("Media file metadata setting error: %s", result.error)
+            self._increment_stat("file_media_metadata_errors")
+            self._discard_manifest_tags(result.file_path)
+
+    def _format_track_number_with_zero_padding(self, track_number: int, tracks_len: int) -> str:
+        """Format the track number with zero-padding based on the total number of tracks.
+        The padding width is computed once per track count, not for every track."""
 
-        return zero_padded_track_number
+        padded_tracks_len, num_digits = self._track_number_width
+        if padded_tracks_len != tracks_len:
+            num_digits = len(str(tracks_len))
+            self._track_number_width = (tracks_len, num_digits)
+
+        return str(track_number).zfill(num_digits)
 
     @staticmethod
     def _strip_numeric_prefix(filename: str) -> str:
@@ -149,6 +996,4 @@ class PlaylistToAlbumExporter:
         A numeric prefix is defined as one or more digits followed by a hyphen and space.
         """
 
-        pattern = r'^\d+ - '
-
-        return re.sub(pattern, '', filename)
+        return NUMERIC_PREFIX_PATTERN.sub('', filename)
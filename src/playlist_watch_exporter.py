@@ -0,0 +1,151 @@
+""" Exporter, that keeps an album in sync with its playlist while the playlist is edited. """
+
+import copy
+import logging
+from collections import Counter
+from collections.abc import Callable
+
+from exporter_stats import ExporterStats
+from export_context import ExportContext
+from playlist_exporter_configuration import PlaylistExporterConfiguration
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from playlist_watcher import PlaylistWatcher
+from trace_recorder import TraceRecorder
+from track_table import TrackTable
+
+
+class PlaylistWatchExporter:
+    """ Exporter, that keeps an album in sync with its playlist while the playlist is edited.
+
+    The album is exported once, then the playlist file is watched. After every save, the playlist is parsed again
+    and compared with the previous parse. If tracks were added, removed or reordered, the album is exported
+    incrementally: the added tracks are copied, the removed ones are removed and the reordered ones are renamed,
+    the rest of the album folder is left as it is. A save without track changes exports nothing.
+
+    The export is always incremental in watch mode, the playlist is parsed in full before every export.
+    The library index is opened and updated once, and shared by the exports until the watch stops.
+    """
+
+    _logger: logging.Logger = None
+    _config: PlaylistExporterConfiguration = None
+    _watcher: PlaylistWatcher = None
+    _on_exported: Callable[[ExporterStats], None]|None = None
+    # The library index and the trace recorder shared by the exports.
+    _context: ExportContext = None
+    _previous_tracks: TrackTable|None = None
+    _export_count: int = 0
+
+    def __init__(self,
+                 config: PlaylistExporterConfiguration,
+                 watcher: PlaylistWatcher|None = None,
+                 on_exported: Callable[[ExporterStats], None]|None = None,
+                 trace_recorder: TraceRecorder|None = None):
+        """ The playlist is watched with the given watcher, or with one with the default debounce time.
+        on_exported is called with the statistics of every export. The spans of every export are recorded in the
+        trace recorder.
+        """
+
+        self._logger = logging.getLogger("PlaylistWatchExporter")
+        # The caller's configuration is left as it is, only the watch mode's own copy is made incremental.
+        self._config = copy.copy(config)
+        if not self._config.incremental:
+            self._logger.info("Watch mode exports incrementally, incremental export is enabled.")
+            self._config.incremental = True
+        self._watcher = watcher if watcher is not None else PlaylistWatcher(config.playlist_file_path)
+        self._on_exported = on_exported
+        self._context = ExportContext(trace_recorder=trace_recorder)
+
+    def get_export_count(self) -> int:
+        """ Get the number of exports done. """
+
+        return self._export_count
+
+    def run(self, max_exports: int|None = None):
+        """ Export the album, then export the changes of every playlist save until stopped,
+        or until max_exports exports are done.
+        """
+
+        self._logger.info("Watching playlist %s with %s.",
+                          self._config.playlist_file_path,
+                          "inotify" if self._watcher.is_inotify() else "polling")
+        try:
+            self.export_changes()
+            while (max_exports is None or self._export_count < max_exports) and self._watcher.wait_for_change():
+                self.export_changes()
+        finally:
+            self._watcher.close()
+            self.close()
+
+        self._logger.info("Stopped watching playlist %s.", self._config.playlist_file_path)
+
+    def stop(self):
+        """ Stop watching, from another thread. The running export is finished first. """
+
+        self._watcher.stop()
+
+    def close(self):
+        """ Close the library index. """
+
+        if self._context.library_index is not None:
+            self._context.library_index.close()
+            self._context = self._context._replace(library_index=None)
+
+    def export_changes(self) -> bool:
+        """ Parse the playlist, and export the album if its tracks changed since the previous export.
+        Returns False if the playlist failed to load or the export failed, the next save is exported again.
+        """
+
+        if self._context.library_index is None and self._config.library.root is not None:
+            self._context = self._context._replace(library_index=PlaylistToAlbumExporter.open_library_index(self._config))
+        exporter: PlaylistToAlbumExporter = PlaylistToAlbumExporter.get_exporter_class(self._config)(self._config,
+                                                                                                   self._context)
+        if not exporter.parse_playlist():
+            self._logger.error("Playlist failed to load, waiting for the next change.")
+
+            return False
+
+        tracks: TrackTable = exporter.get_tracks()
+        if self._previous_tracks is not None:
+            if self._is_same_tracks(self._previous_tracks, tracks):
+                self._logger.info("Playlist saved without track changes, nothing to export.")
+
+                return True
+
+            added_tracks, removed_tracks, moved_tracks = self._count_track_changes(self._previous_tracks, tracks)
+            self._logger.info("Playlist changed: %s added, %s removed, %s moved tracks.",
+                              added_tracks,
+                              removed_tracks,
+                              moved_tracks)
+
+        if not exporter.export_album():
+            return False
+
+        self._previous_tracks = tracks
+        self._export_count += 1
+        if self._on_exported is not None:
+            self._on_exported(exporter.get_stats())
+
+        return True
+
+    @staticmethod
+    def _is_same_tracks(previous_tracks: TrackTable, tracks: TrackTable) -> bool:
+        """ Check if two parses hold the same tracks, in the same order. """
+
+        return len(previous_tracks) == len(tracks) \
+            and all(previous_track == track for previous_track, track in zip(previous_tracks, tracks))
+
+    @staticmethod
+    def _count_track_changes(previous_tracks: TrackTable, tracks: TrackTable) -> tuple[int, int, int]:
+        """ Count the added, removed and moved tracks, by their source file paths. """
+
+        previous_paths: Counter = Counter(str(track.abs_file_path) for track in previous_tracks)
+        paths: Counter = Counter(str(track.abs_file_path) for track in tracks)
+        previous_orders: dict[str, set[int]] = {}
+        for track in previous_tracks:
+            previous_orders.setdefault(str(track.abs_file_path), set()).add(track.order)
+        moved_tracks: int = sum(
+            1 for track in tracks
+            if str(track.abs_file_path) in previous_orders and track.order not in previous_orders[str(track.abs_file_path)]
+        )
+
+        return sum((paths - previous_paths).values()), sum((previous_paths - paths).values()), moved_tracks
@@ -0,0 +1,207 @@
+""" Watcher of a playlist file, that waits for the file to be saved. """
+
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import PosixPath, WindowsPath
+
+# inotify event masks, from <sys/inotify.h>.
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+# Playlist editors save in place, or write a temporary file and rename it over the playlist.
+WATCH_MASK: int = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT_HEADER: struct.Struct = struct.Struct("iIII")
+INOTIFY_READ_SIZE: int = 64 * 1024
+
+DEFAULT_POLL_INTERVAL: float = 1.0
+# The longest time a wait blocks without checking the stop event.
+STOP_CHECK_INTERVAL: float = 0.5
+
+
+# Reason: Eight is reasonable in this case, the inotify and the polled file signatures are kept apart.
+# pylint: disable-next=too-many-instance-attributes
+class PlaylistWatcher:
+    """ Watcher of a playlist file, that waits for the file to be saved.
+
+    On Linux, the playlist's folder is watched with inotify, and the events of the playlist file wake up the waiting
+    thread. Elsewhere, or if inotify is not available, the size, modification time and inode of the file are polled.
+    A change is reported once the file was not changed for the debounce time, so a burst of saves is one change.
+    Changes that leave the size, modification time and inode of the file as they were are not reported.
+    """
+
+    _logger: logging.Logger = None
+    _playlist_file_path: str = None
+    _debounce_seconds: float = 1.0
+    _poll_interval: float = DEFAULT_POLL_INTERVAL
+    _stop_event: threading.Event = None
+    _inotify_fd: int|None = None
+    _file_signature: tuple[int, int, int]|None = None
+    _polled_file_signature: tuple[int, int, int]|None = None
+
+    def __init__(self,
+                 playlist_file_path: str|PosixPath|WindowsPath,
+                 debounce_seconds: float = 1.0,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 use_inotify: bool = True):
+        """ use_inotify False polls the file on Linux too. """
+
+        self._logger = logging.getLogger("PlaylistWatcher")
+        self._playlist_file_path = os.path.abspath(playlist_file_path)
+        self._debounce_seconds = debounce_seconds
+        self._poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._file_signature = self._get_file_signature()
+        self._polled_file_signature = self._file_signature
+        self._inotify_fd = self._open_inotify() if use_inotify else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def is_inotify(self) -> bool:
+        """ Check if the file is watched with inotify, instead of polling. """
+
+        return self._inotify_fd is not None
+
+    def stop(self):
+        """ Stop waiting, from another thread. wait_for_change returns False. """
+
+        self._stop_event.set()
+
+    def close(self):
+        """ Stop watching the file. """
+
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def wait_for_change(self) -> bool:
+        """ Wait until the playlist file is changed and not changed again for the debounce time.
+        Returns False if the watcher is stopped.
+        """
+
+        while not self._stop_event.is_set():
+            if not self._wait_for_event(None):
+                continue
+
+            # Debounce: wait until there are no more events for the debounce time.
+            while self._wait_for_event(self._debounce_seconds):
+                pass
+
+            if self._stop_event.is_set():
+                break
+
+            file_signature: tuple[int, int, int]|None = self._get_file_signature()
+            if file_signature is None:
+                self._logger.warning("Playlist file is missing, waiting for it: %s", self._playlist_file_path)
+            if file_signature is not None and file_signature != self._file_signature:
+                self._file_signature = file_signature
+
+                return True
+            self._file_signature = file_signature
+
+        return False
+
+    def _wait_for_event(self, timeout: float|None) -> bool:
+        """ Wait at most timeout seconds, or until stopped if None, for an event of the playlist file. """
+
+        deadline: float|None = time.monotonic() + timeout if timeout is not None else None
+        while not self._stop_event.is_set():
+            wait_seconds: float = STOP_CHECK_INTERVAL
+            if deadline is not None:
+                wait_seconds = min(wait_seconds, deadline - time.monotonic())
+                if wait_seconds <= 0:
+                    return False
+
+            if self._inotify_fd is not None:
+                if self._read_inotify_events(wait_seconds):
+                    return True
+            else:
+                self._stop_event.wait(min(wait_seconds, self._poll_interval))
+                file_signature: tuple[int, int, int]|None = self._get_file_signature()
+                if file_signature != self._polled_file_signature:
+                    # The next poll compares with this state, so the debounce waits for the file to stop changing.
+                    self._polled_file_signature = file_signature
+
+                    return True
+
+        return False
+
+    def _read_inotify_events(self, timeout: float) -> bool:
+        """ Wait for inotify events, and check if any of them is an event of the playlist file. """
+
+        readable_fds, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if not readable_fds:
+            return False
+
+        try:
+            events: bytes = os.read(self._inotify_fd, INOTIFY_READ_SIZE)
+        except BlockingIOError:
+            return False
+
+        playlist_file_name: bytes = os.fsencode(os.path.basename(self._playlist_file_path))
+        offset: int = 0
+        is_playlist_event: bool = False
+        while offset + INOTIFY_EVENT_HEADER.size <= len(events):
+            _, mask, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(events, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name: bytes = events[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if mask & IN_Q_OVERFLOW or name == playlist_file_name:
+                is_playlist_event = True
+
+        return is_playlist_event
+
+    def _open_inotify(self) -> int|None:
+        """ Start watching the playlist's folder with inotify. Returns None if inotify is not available. """
+
+        if not sys.platform.startswith("linux"):
+            return None
+
+        # Reason: ctypes is only needed to call inotify on Linux.
+        # pylint: disable=import-outside-toplevel
+        import ctypes
+        import ctypes.util
+        # pylint: enable=import-outside-toplevel
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            inotify_fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if inotify_fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+            if libc.inotify_add_watch(inotify_fd,
+                                      os.fsencode(os.path.dirname(self._playlist_file_path)),
+                                      ctypes.c_uint32(WATCH_MASK)) < 0:
+                error_number: int = ctypes.get_errno()
+                os.close(inotify_fd)
+                raise OSError(error_number, os.strerror(error_number))
+        except (OSError, AttributeError) as e:
+            self._logger.warning("inotify is not available, polling the playlist file instead: %s", e)
+
+            return None
+
+        self._logger.debug("Watching %s with inotify.", self._playlist_file_path)
+
+        return inotify_fd
+
+    def _get_file_signature(self) -> tuple[int, int, int]|None:
+        """ Get the size, modification time and inode of the playlist file, None if it does not exist. """
+
+        try:
+            file_stat: os.stat_result = os.stat(self._playlist_file_path)
+        except OSError:
+            return None
+
+        return file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino
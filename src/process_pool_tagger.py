@@ -0,0 +1,134 @@
+""" Metadata tagging on a process pool, for tagging to scale with CPU cores. """
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from typing import NamedTuple
+
+from file_metadata_setter import FileMetadataSetter
+
+
+class TagWorkItem(NamedTuple):
+    """ A file to tag in a worker process. """
+    file_path: str
+    metadata: dict[str, str]
+
+
+class TagResult(NamedTuple):
+    """ Result of tagging a file in a worker process. """
+    file_path: str
+    rewritten_bytes: int = 0
+    seconds: float = 0.0
+    error: str|None = None
+
+
+def tag_files(work_items: list[TagWorkItem]) -> list[TagResult]:
+    """ Tag a batch of files. Runs in the worker processes, errors are returned, not raised. """
+
+    results: list[TagResult] = []
+    for work_item in work_items:
+        tag_start: float = time.perf_counter()
+        try:
+            rewritten_bytes: int = FileMetadataSetter(work_item.file_path).apply(work_item.metadata)
+            results.append(TagResult(work_item.file_path, rewritten_bytes, time.perf_counter() - tag_start))
+        except Exception as e:
+            results.append(TagResult(work_item.file_path, seconds=time.perf_counter() - tag_start, error=str(e)))
+
+    return results
+
+
+# Reason: Eight is reasonable in this case, the pool settings and the state of the batches in flight.
+# pylint: disable-next=too-many-instance-attributes
+class ProcessPoolTagger:
+    """ Metadata tagging on a process pool, for tagging to scale with CPU cores.
+
+    mutagen holds the GIL while it parses and saves a file, so tagging on threads runs on one core at a time.
+    Files submitted here are collected into batches, every batch is tagged in one worker process call,
+    to spread the inter-process overhead over many files. Only the file paths and tags are sent to the workers,
+    and only small result records come back, that are passed to the result handler as the batches finish.
+    """
+
+    _logger: logging.Logger = None
+    _processes: int = 1
+    _batch_size: int = 32
+    _result_handler: Callable[[TagResult], None] = None
+    _executor: Executor|None = None
+    _pending_work_items: list[TagWorkItem] = None
+    _batches_in_flight: dict[Future, list[TagWorkItem]] = None
+    _batches_done: threading.Condition = None
+
+    def __init__(self, processes: int, batch_size: int, result_handler: Callable[[TagResult], None]):
+        self._logger = logging.getLogger("ProcessPoolTagger")
+        self._processes = processes
+        self._batch_size = batch_size
+        self._result_handler = result_handler
+        self._pending_work_items = []
+        self._batches_in_flight = {}
+        self._batches_done = threading.Condition()
+
+    def submit(self, file_path: str, metadata: dict[str, str]):
+        """ Queue a file for tagging. A full batch is sent to the process pool right away. """
+
+        with self._batches_done:
+            self._pending_work_items.append(TagWorkItem(file_path, metadata))
+            if len(self._pending_work_items) >= self._batch_size:
+                self._submit_pending_batch()
+
+    def close(self):
+        """ Send the last, partial batch, wait until the results of every batch are handled,
+        and shut the process pool down.
+        """
+
+        with self._batches_done:
+            if self._pending_work_items:
+                self._submit_pending_batch()
+            self._batches_done.wait_for(lambda: not self._batches_in_flight)
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _submit_pending_batch(self):
+        """ Send the queued files to the process pool as one batch. Call with the condition's lock held. """
+
+        if self._executor is None:
+            # Reason: multiprocessing is slow to import, it is only imported when the first batch is sent.
+            # pylint: disable=import-outside-toplevel
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # pylint: enable=import-outside-toplevel
+
+            self._logger.info("Starting %s tagging processes.", self._processes)
+            # Worker processes are spawned, not forked, forking a process with running threads is not safe.
+            self._executor = ProcessPoolExecutor(max_workers=self._processes,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+
+        batch: Future = self._executor.submit(tag_files, self._pending_work_items)
+        self._batches_in_flight[batch] = self._pending_work_items
+        self._pending_work_items = []
+        batch.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, batch: Future):
+        """ Pass the results of a finished batch to the result handler.
+        If the worker process failed, every file of the batch is reported as failed.
+        """
+
+        with self._batches_done:
+            work_items: list[TagWorkItem] = self._batches_in_flight[batch]
+
+        results: list[TagResult]
+        if batch.exception() is not None:
+            self._logger.error("Tagging process error: %s", batch.exception())
+            results = [TagResult(work_item.file_path, error=str(batch.exception())) for work_item in work_items]
+        else:
+            results = batch.result()
+
+        try:
+            for result in results:
+                self._result_handler(result)
+        finally:
+            with self._batches_done:
+                del self._batches_in_flight[batch]
+                self._batches_done.notify_all()
@@ -1,15 +1,20 @@
 """ CLI utility runner class for the exporter. """
+import json
 import logging
 import os.path
 from argparse import Namespace, ArgumentParser
 from pathlib import WindowsPath, PosixPath
+from typing import TYPE_CHECKING
 
-import coloredlogs
-
-from playlist_to_album_exporter import PlaylistToAlbumExporter
+from export_plan import ExportPlan
 from playlist_exporter_configuration import PlaylistExporterConfiguration
 from utility.check_python_version import check_python_version
 
+if TYPE_CHECKING:
+    from cProfile import Profile
+    from playlist_to_album_exporter import PlaylistToAlbumExporter
+    from trace_recorder import TraceRecorder
+
 def run_cli() -> int:
     """ Run the CLI API for the application """
 
@@ -18,9 +23,60 @@ def run_cli() -> int:
     parser: ArgumentParser = exporter_config.get_args_parser()
     args: Namespace = parser.parse_args()
 
+    # Reason: The logging setup and the exporters are imported after the arguments are parsed,
+    # so --help and invalid arguments exit without importing them.
+    # pylint: disable-next=import-outside-toplevel
+    import coloredlogs
+
     log_level = 'Debug' if args.debug else 'Info'
     args.debug = None
     coloredlogs.install(level=log_level, fmt='%(levelname)s|%(name)s: %(message)s')
+
+    # Reason: The profiler and the trace recorder are only needed when their output is asked for.
+    # pylint: disable=import-outside-toplevel
+    trace_recorder: "TraceRecorder|None" = None
+    if args.trace_out is not None:
+        from trace_recorder import TraceRecorder
+
+        trace_recorder = TraceRecorder()
+    if args.profile is None:
+        exit_code: int = run_command(args, exporter_config, trace_recorder)
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            exit_code = profiler.runcall(run_command, args, exporter_config, trace_recorder)
+        finally:
+            write_profile(args.profile, profiler)
+    # pylint: enable=import-outside-toplevel
+    if trace_recorder is not None:
+        write_trace(args.trace_out, trace_recorder)
+
+    return exit_code
+
+def run_command(args: Namespace,
+                exporter_config: PlaylistExporterConfiguration,
+                trace_recorder: "TraceRecorder|None" = None) -> int:
+    """ Run the export, batch export, plan or watch mode given by the arguments. """
+
+    if args.batch_yaml_file_path is not None or args.playlist_directory is not None:
+        return run_batch(args, trace_recorder)
+
+    if not load_configuration(args, exporter_config):
+        return 1
+
+    if args.plan is not None:
+        return run_plan(exporter_config, args.plan, trace_recorder)
+
+    if args.watch is not None:
+        return run_watch(exporter_config, args.watch, trace_recorder)
+
+    return run_export(exporter_config, trace_recorder)
+
+def load_configuration(args: Namespace, exporter_config: PlaylistExporterConfiguration) -> bool:
+    """ Load the configuration from the yaml file given by the arguments, or from the arguments. """
+
     logger = logging.getLogger("Playlist Exporter CLI Utility")
 
     try:
@@ -33,19 +89,166 @@ def run_cli() -> int:
     if not exporter_config.is_loaded():
         logger.critical("Configuration failed to load.")
 
-        return 1
+        return False
 
     logger.info("Configuration: %s", exporter_config)
 
-    exporter = PlaylistToAlbumExporter(exporter_config)
+    return True
+
+def run_export(exporter_config: PlaylistExporterConfiguration, trace_recorder: "TraceRecorder|None" = None) -> int:
+    """ Export the album, and write its statistics if asked for. """
+
+    exporter: "PlaylistToAlbumExporter" = make_exporter(exporter_config, trace_recorder)
+    if not exporter.parse_playlist() or not exporter.export_album():
+        return 1
+
+    if exporter_config.stats_json is not None:
+        write_stats_json(exporter_config.stats_json, exporter.get_stats().to_dict())
+
+    return 0
+
+def run_plan(exporter_config: PlaylistExporterConfiguration,
+             plan_format: str,
+             trace_recorder: "TraceRecorder|None" = None) -> int:
+    """ Print the export plan of the album, without exporting it. """
+
+    exporter: "PlaylistToAlbumExporter" = make_exporter(exporter_config, trace_recorder)
     if not exporter.parse_playlist():
         return 1
 
-    if not exporter.export_album():
+    export_plan: ExportPlan|None = exporter.get_export_plan()
+    if export_plan is None:
+        return 1
+
+    print_export_plans([export_plan], plan_format)
+
+    return 0
+
+def make_exporter(exporter_config: PlaylistExporterConfiguration,
+                  trace_recorder: "TraceRecorder|None" = None) -> "PlaylistToAlbumExporter":
+    """ Make the exporter of the configured output and engine. """
+
+    # Reason: The exporters are imported after the arguments are parsed.
+    # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from export_context import ExportContext
+    from playlist_to_album_exporter import PlaylistToAlbumExporter
+    # pylint: enable=import-outside-toplevel,redefined-outer-name
+
+    return PlaylistToAlbumExporter.get_exporter_class(exporter_config)(exporter_config,
+                                                                       ExportContext(trace_recorder=trace_recorder))
+
+def run_watch(exporter_config: PlaylistExporterConfiguration,
+              debounce_seconds: float,
+              trace_recorder: "TraceRecorder|None" = None) -> int:
+    """ Export the album, then export the changes of the playlist every time it is saved, until interrupted. """
+
+    # Reason: The watch modules are only needed in watch mode.
+    # pylint: disable=import-outside-toplevel
+    from exporter_stats import ExporterStats
+    from playlist_watch_exporter import PlaylistWatchExporter
+    from playlist_watcher import PlaylistWatcher
+    # pylint: enable=import-outside-toplevel
+
+    logger = logging.getLogger("Playlist Exporter CLI Utility")
+
+    def write_watch_stats_json(stats: ExporterStats):
+        if exporter_config.stats_json is not None:
+            write_stats_json(exporter_config.stats_json, stats.to_dict())
+
+    watch_exporter = PlaylistWatchExporter(exporter_config,
+                                           PlaylistWatcher(exporter_config.playlist_file_path, debounce_seconds),
+                                           write_watch_stats_json,
+                                           trace_recorder)
+    try:
+        watch_exporter.run()
+    except KeyboardInterrupt:
+        logger.info("Watch mode interrupted, exiting.")
+
+    return 0
+
+def run_batch(args: Namespace, trace_recorder: "TraceRecorder|None" = None) -> int:
+    """ Export multiple playlists given by a batch yaml file or a playlist directory. """
+
+    # Reason: The batch modules are only needed in batch mode.
+    # pylint: disable=import-outside-toplevel
+    from batch_exporter_configuration import BatchExporterConfiguration
+    from batch_playlist_exporter import BatchPlaylistExporter
+    # pylint: enable=import-outside-toplevel
+
+    logger = logging.getLogger("Playlist Exporter CLI Utility")
+    if args.watch is not None:
+        logger.critical("Watch mode exports a single playlist, it is not supported in batch mode.")
+
+        return 1
+
+    batch_config = BatchExporterConfiguration()
+    if args.batch_yaml_file_path is not None:
+        batch_config.load_yaml(os.path.abspath(args.batch_yaml_file_path))
+    else:
+        batch_config.load_argparse_namespace(args)
+
+    if not batch_config.is_loaded():
+        logger.critical("Batch configuration failed to load.")
+
+        return 1
+
+    batch_exporter = BatchPlaylistExporter(batch_config.get_album_configurations(), trace_recorder)
+    if args.plan is not None:
+        export_plans: list[ExportPlan] = batch_exporter.plan_albums()
+        print_export_plans(export_plans, args.plan)
+
+        return 0 if len(export_plans) == len(batch_config.get_album_configurations()) else 1
+
+    all_albums_exported: bool = batch_exporter.export_albums()
+    if batch_config.get_stats_json() is not None:
+        write_stats_json(batch_config.get_stats_json(), batch_exporter.get_stats_dict())
+
+    if not all_albums_exported:
         return 1
 
     return 0
 
+def print_export_plans(export_plans: list[ExportPlan], plan_format: str):
+    """ Print export plans to stdout as tables or json, the log is written to stderr. """
+
+    if plan_format == "json":
+        plans: list[dict] = [export_plan.to_dict() for export_plan in export_plans]
+        print(json.dumps(plans[0] if len(plans) == 1 else plans, indent=1))
+    else:
+        print("\n\n".join(export_plan.format_table() for export_plan in export_plans))
+
+def write_stats_json(stats_json_file_path: str|WindowsPath|PosixPath, stats: dict):
+    """ Write the export statistics to a .json file. """
+
+    logger = logging.getLogger("Playlist Exporter CLI Utility")
+    try:
+        with open(stats_json_file_path, "w", encoding="utf-8") as stats_json_file:
+            json.dump(stats, stats_json_file, indent=1)
+        logger.info("Statistics written to %s", stats_json_file_path)
+    except OSError as e:
+        logger.error("Statistics .json file write error: %s", e)
+
+
+def write_profile(profile_file_path: str|WindowsPath|PosixPath, profiler: "Profile"):
+    """ Write the profile statistics of the run to a pstats file. """
+
+    logger = logging.getLogger("Playlist Exporter CLI Utility")
+    try:
+        profiler.dump_stats(profile_file_path)
+        logger.info("Profile written to %s, read it with: python -m pstats %s", profile_file_path, profile_file_path)
+    except OSError as e:
+        logger.error("Profile file write error: %s", e)
+
+def write_trace(trace_file_path: str|WindowsPath|PosixPath, trace_recorder: "TraceRecorder"):
+    """ Write the recorded spans to a Chrome trace event .json file. """
+
+    logger = logging.getLogger("Playlist Exporter CLI Utility")
+    try:
+        trace_recorder.save(trace_file_path)
+        logger.info("Trace with %s spans written to %s", trace_recorder.get_span_count(), trace_file_path)
+    except OSError as e:
+        logger.error("Trace file write error: %s", e)
+
 
 if __name__ == '__main__':
     run_cli()
@@ -0,0 +1,112 @@
+""" Services shared by the album exports of a batch run. """
+
+import os.path
+from concurrent.futures import Executor
+
+from copy_cache import CopyCache
+from export_context import ExportContext
+from io_scheduler import IoScheduler
+from library_index import LibraryIndex
+from playlist_exporter_configuration import PlaylistExporterConfiguration, IoSettings
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from source_file_cache import SourceFileCache
+from trace_recorder import TraceRecorder
+from track_prober import TrackProber
+
+
+class SharedExportContext:
+    """ Services shared by the album exports of a batch run.
+
+    The source file cache is shared by every album, so a track that is in many albums is stat'ed and read from its
+    source once. Albums with the same copy cache folder share one copy cache, and albums with the same I/O limits one
+    I/O scheduler. Albums with the same library index share it, it is updated once and closed when the run ends, and
+    albums with the same probe cache file share one track prober, so a track that is in many albums is probed once.
+    """
+
+    _source_file_cache: SourceFileCache = None
+    _copy_caches: dict[str, CopyCache] = None
+    _io_schedulers: dict[IoSettings, IoScheduler] = None
+    _library_indexes: dict[tuple[str, str|None], LibraryIndex|None] = None
+    _track_probers: dict[tuple[str|None, int], TrackProber] = None
+    _trace_recorder: TraceRecorder|None = None
+
+    def __init__(self, trace_recorder: TraceRecorder|None = None):
+        """ With a trace recorder, the spans of every album's export are recorded in it. """
+
+        self._source_file_cache = SourceFileCache()
+        self._copy_caches = {}
+        self._io_schedulers = {}
+        self._library_indexes = {}
+        self._track_probers = {}
+        self._trace_recorder = trace_recorder
+
+    def get_album_context(self, album_config: PlaylistExporterConfiguration, executor: Executor|None = None) -> ExportContext:
+        """ Get the export context of an album, with the services it shares with the other albums. """
+
+        return ExportContext(source_file_cache=self._source_file_cache,
+                             executor=executor,
+                             copy_cache=self._get_copy_cache(album_config),
+                             io_scheduler=self._get_io_scheduler(album_config),
+                             library_index=self._get_library_index(album_config),
+                             track_prober=self._get_track_prober(album_config),
+                             trace_recorder=self._trace_recorder)
+
+    def close(self):
+        """ Close the shared library indexes, the next run opens and updates them again. """
+
+        for library_index in self._library_indexes.values():
+            if library_index is not None:
+                library_index.close()
+        self._library_indexes = {}
+
+    def _get_copy_cache(self, album_config: PlaylistExporterConfiguration) -> CopyCache|None:
+        """ Get the shared copy cache of the album's copy cache folder, None if copy caching is disabled. """
+
+        if album_config.copy_cache.directory is None:
+            return None
+
+        copy_cache_directory: str = os.path.normcase(os.path.abspath(album_config.copy_cache.directory))
+        if copy_cache_directory not in self._copy_caches:
+            self._copy_caches[copy_cache_directory] = CopyCache(copy_cache_directory,
+                                                                album_config.copy_cache.max_bytes,
+                                                                album_config.copy_cache.digest,
+                                                                album_config.copy.buffer_size)
+
+        return self._copy_caches[copy_cache_directory]
+
+    def _get_io_scheduler(self, album_config: PlaylistExporterConfiguration) -> IoScheduler:
+        """ Get the shared I/O scheduler of the album's I/O limits. """
+
+        if album_config.io not in self._io_schedulers:
+            self._io_schedulers[album_config.io] = IoScheduler(*album_config.io)
+
+        return self._io_schedulers[album_config.io]
+
+    def _get_library_index(self, album_config: PlaylistExporterConfiguration) -> LibraryIndex|None:
+        """ Get the shared, updated library index of the album, None if it is not set or can not be opened. """
+
+        if album_config.library.root is None:
+            return None
+
+        library_index_key: tuple[str, str|None] = (os.path.normcase(os.path.abspath(album_config.library.root)),
+                                                   album_config.library.index_file)
+        if library_index_key not in self._library_indexes:
+            self._library_indexes[library_index_key] = PlaylistToAlbumExporter.open_library_index(album_config)
+
+        return self._library_indexes[library_index_key]
+
+    def _get_track_prober(self, album_config: PlaylistExporterConfiguration) -> TrackProber|None:
+        """ Get the shared track prober of the album's probe cache file and workers, None if probing is disabled. """
+
+        if album_config.probe.workers == 0:
+            return None
+
+        track_prober_key: tuple[str|None, int] = (
+            os.path.normcase(os.path.abspath(album_config.probe.cache_file))
+            if album_config.probe.cache_file is not None else None,
+            album_config.probe.workers
+        )
+        if track_prober_key not in self._track_probers:
+            self._track_probers[track_prober_key] = TrackProber(album_config.probe.workers, album_config.probe.cache_file)
+
+        return self._track_probers[track_prober_key]
@@ -0,0 +1,95 @@
+""" Cache of source track file state, shared between the albums of an export run. """
+
+import logging
+import os
+import threading
+from pathlib import PosixPath, WindowsPath
+from typing import NamedTuple
+
+from directory_index import DirectoryIndex
+
+
+class _SourceFileReplica(NamedTuple):
+    """ An exported copy of a source file, with its state right after the export. """
+    file_path: str
+    size: int
+    mtime_ns: int
+
+
+class SourceFileCache:
+    """ Cache of source track file state, shared between the albums of an export run.
+
+    Every source file is stat'ed once per run, from the directory index. After a source file is exported without
+    changes, the exported copy is registered as a replica, later exports of the same source read the local replica
+    instead of the (possibly slow, remote) source file again. Tagged copies are not replicas.
+    """
+
+    _logger: logging.Logger = None
+    _directory_index: DirectoryIndex = None
+    _replicas: dict[str, _SourceFileReplica] = None
+    _lock: threading.Lock = None
+
+    def __init__(self):
+        self._logger = logging.getLogger("SourceFileCache")
+        self._directory_index = DirectoryIndex()
+        self._replicas = {}
+        self._lock = threading.Lock()
+
+    def get_directory_index(self) -> DirectoryIndex:
+        """ Directory index getter. """
+
+        return self._directory_index
+
+    def stat(self, file_path: str|PosixPath|WindowsPath) -> os.stat_result|None:
+        """ Get the stat result of a source file, None if it does not exist. """
+
+        return self._directory_index.stat(file_path)
+
+    def is_file(self, file_path: str|PosixPath|WindowsPath) -> bool:
+        """ Check if the source file exists and is a regular file. """
+
+        return self._directory_index.is_file(file_path)
+
+    def add_replica(self, source_file_path: str|PosixPath|WindowsPath, exported_file_path: str|PosixPath|WindowsPath):
+        """ Register an exported copy of a source file. The first exported copy is kept. """
+
+        source_file_path = str(source_file_path)
+        with self._lock:
+            if source_file_path in self._replicas:
+                return
+
+        try:
+            replica_stat: os.stat_result = os.stat(exported_file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            self._replicas.setdefault(source_file_path, _SourceFileReplica(
+                file_path=str(exported_file_path),
+                size=replica_stat.st_size,
+                mtime_ns=replica_stat.st_mtime_ns
+            ))
+
+    def get_copy_source(self, source_file_path: str|PosixPath|WindowsPath) -> str:
+        """ Get the path to read a source file's content from: an unmodified replica if there is one, else the source. """
+
+        source_file_path = str(source_file_path)
+        with self._lock:
+            replica: _SourceFileReplica|None = self._replicas.get(source_file_path)
+
+        if replica is None:
+            return source_file_path
+
+        try:
+            replica_stat: os.stat_result = os.stat(replica.file_path)
+            if replica_stat.st_size == replica.size and replica_stat.st_mtime_ns == replica.mtime_ns:
+                self._logger.debug("Reading %s from replica %s", source_file_path, replica.file_path)
+
+                return replica.file_path
+        except OSError:
+            pass
+
+        with self._lock:
+            self._replicas.pop(source_file_path, None)
+
+        return source_file_path
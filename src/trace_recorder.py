@@ -0,0 +1,67 @@
+""" Recorder of the stage spans of an export, written as a Chrome trace event file. """
+
+import json
+import os
+import threading
+import time
+from pathlib import PosixPath, WindowsPath
+
+
+class TraceRecorder:
+    """ Recorder of the stage spans of an export, written as a Chrome trace event file.
+
+    Every span is a complete ("X") event on the thread that recorded it, with its start and duration in microseconds
+    since the recorder was created. The file loads into chrome://tracing, Perfetto and other trace event viewers.
+    The exporters and the parser record their spans only when they are given a recorder.
+    """
+
+    _events: list[dict] = None
+    _thread_names: dict[int, str] = None
+    _origin: float = 0.0
+    _pid: int = 0
+    _lock: threading.Lock = None
+
+    def __init__(self):
+        self._events = []
+        self._thread_names = {}
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, seconds: float, category: str = "track", args: dict|None = None):
+        """ Record a span, that started at the given time.perf_counter() value and took the given seconds. """
+
+        thread: threading.Thread = threading.current_thread()
+        event: dict = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round(seconds * 1e6, 3),
+            "pid": self._pid,
+            "tid": thread.ident
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            if thread.ident not in self._thread_names:
+                self._thread_names[thread.ident] = thread.name
+
+    def get_span_count(self) -> int:
+        """ Get the number of recorded spans. """
+
+        return len(self._events)
+
+    def save(self, file_path: str|PosixPath|WindowsPath):
+        """ Write the recorded spans and the names of their threads to a trace event .json file. """
+
+        with self._lock:
+            thread_name_events: list[dict] = [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"name": thread_name}}
+                for thread_id, thread_name in self._thread_names.items()
+            ]
+            trace: dict = {"traceEvents": thread_name_events + self._events, "displayTimeUnit": "ms"}
+
+        with open(file_path, "w", encoding="utf-8") as trace_file:
+            json.dump(trace, trace_file)
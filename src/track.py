@@ -11,10 +11,11 @@ class Track(NamedTuple):
     order: int
     title: str
     duration: int
+    file_size: int|None = None
+    file_mtime: float|None = None
+    bitrate: int|None = None
 
     def __str__(self):
-        return "[\nabs_file_path:"+str(self.abs_file_path)+\
-            "\nfile_name:"+self.file_name+\
-            "\norder:"+str(self.order)+\
-            "\ntitle:"+self.title+\
-            "\nduration:"+str(self.duration)+"\n]"
+        return f"[\nabs_file_path:{self.abs_file_path}\nfile_name:{self.file_name}\norder:{self.order}" \
+               f"\ntitle:{self.title}\nduration:{self.duration}\nfile_size:{self.file_size}" \
+               f"\nfile_mtime:{self.file_mtime}\nbitrate:{self.bitrate}\n]"
@@ -0,0 +1,345 @@
+""" Track file copier with selectable, zero-copy copy strategies. """
+
+import errno
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import zlib
+from collections.abc import Callable
+from pathlib import PosixPath, WindowsPath
+from typing import NamedTuple
+
+# Linux ioctl request number to share the data extents of a file with another file on CoW filesystems (btrfs, XFS).
+FICLONE: int = 0x40049409
+
+COPY_STRATEGIES: tuple[str, ...] = ("auto", "reflink", "copy_file_range", "hardlink", "chunked", "copy")
+
+# Copies are written next to the output file under this suffix, and renamed into place when complete.
+PART_FILE_SUFFIX: str = ".part"
+# Progress of a chunked copy, next to its .part file.
+CHECKPOINT_FILE_SUFFIX: str = ".json"
+
+DEFAULT_BUFFER_SIZE: int = 1024 * 1024
+# With 'auto', source files at least this large are copied in resumable chunks instead of copy_file_range.
+RESUMABLE_COPY_MIN_SIZE: int = 64 * 1024 * 1024
+# A chunked copy is synced to disk and its progress recorded after this many bytes.
+CHECKPOINT_INTERVAL: int = 64 * 1024 * 1024
+
+# These errors mean the strategy is not implemented by the kernel or the filesystem at all, not just for one file.
+_UNSUPPORTED_ERRNOS: tuple[int, ...] = (errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY)
+
+
+class _CopyCheckpoint(NamedTuple):
+    """ Progress of a chunked copy: the source file it copies, the copied byte count and the last copied chunk. """
+    source_path: str
+    source_size: int
+    source_mtime_ns: int
+    offset: int
+    chunk_size: int
+    chunk_crc32: int
+
+
+class TrackFileCopier:
+    """ Track file copier with selectable, zero-copy copy strategies.
+
+    - reflink: the copy shares the data blocks of the source on copy-on-write filesystems, no data is copied.
+    - copy_file_range: in-kernel copy, the data does not pass through userspace. Falls back to sendfile.
+    - hardlink: the exported file is the source file itself. Only usable if metadata setting is disabled, and only
+      when chosen explicitly: a later in-place write to the exported file would change the source file too.
+    - chunked: copy in buffer sized chunks, with the progress recorded in a checkpoint file. An interrupted copy
+      is resumed from the last checkpoint on the next run.
+    - copy: shutil.copy2, works everywhere.
+
+    'auto' tries reflink, then copy_file_range, or chunked for files of 64 MiB or more, then copy. It never hardlinks.
+    Every strategy falls back to the next one per file on errors, for example when the source and the output directory
+    are on different devices (EXDEV).
+    Every strategy writes a .part file, that is renamed to the output path when complete,
+    so a partially copied track is never visible under its name. A failed strategy removes its .part file,
+    except a chunked copy with a checkpoint, that the next run resumes.
+
+    With a throttle callback, the strategies that transfer data copy it in buffer sized chunks,
+    and call the callback with the size of every chunk before copying it. reflink and hardlink transfer no data.
+    """
+
+    _logger: logging.Logger = None
+    _strategies: list[str] = None
+    _is_auto: bool = False
+    _buffer_size: int = DEFAULT_BUFFER_SIZE
+    _unsupported_strategies: set[str] = None
+    _unsupported_strategies_lock: threading.Lock = None
+    _throttle: Callable[[int], None]|None = None
+
+    def __init__(self,
+                 copy_strategy: str = "auto",
+                 allow_hardlink: bool = False,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 throttle: Callable[[int], None]|None = None):
+        self._logger = logging.getLogger("TrackFileCopier")
+        self._strategies = self._get_strategy_chain(copy_strategy, allow_hardlink)
+        self._is_auto = copy_strategy == "auto"
+        self._buffer_size = buffer_size
+        self._unsupported_strategies = set()
+        self._unsupported_strategies_lock = threading.Lock()
+        self._throttle = throttle
+        self._logger.debug("Copy strategy chain: %s", self._strategies)
+
+    def copy(self,
+             source_file_path: str|PosixPath|WindowsPath,
+             output_file_path: str|PosixPath|WindowsPath,
+             source_file_size: int|None = None,
+             allow_hardlink: bool = True) -> str:
+        """ Copy the source file to the output path with the first working strategy.
+        The source file's size is looked up if not given. allow_hardlink False copies a file that must not be shared,
+        like a cached file, even with the hardlink strategy.
+        Returns the name of the strategy that made the copy.
+        """
+
+        copy_functions = {
+            "reflink": self._copy_reflink,
+            "copy_file_range": self._copy_file_range,
+            "hardlink": self._copy_hardlink,
+            "chunked": self._copy_chunked
+        }
+
+        part_file_path: str = self.get_part_file_path(output_file_path)
+        for strategy in self._get_file_strategies(source_file_path, source_file_size, part_file_path):
+            if strategy == "copy" or strategy in self._unsupported_strategies or (strategy == "hardlink" and not allow_hardlink):
+                continue
+
+            try:
+                copy_functions[strategy](source_file_path, part_file_path)
+                os.replace(part_file_path, output_file_path)
+
+                return strategy
+            except OSError as e:
+                if strategy == "chunked" and os.path.isfile(part_file_path + CHECKPOINT_FILE_SUFFIX):
+                    # A fallback would start over, the next run resumes the copy from its checkpoint instead.
+                    raise
+                self._remove_partial_copy(part_file_path)
+                if strategy == "chunked":
+                    raise
+                self._logger.debug("Copy strategy %s failed, falling back: %s", strategy, e)
+                if e.errno in _UNSUPPORTED_ERRNOS:
+                    with self._unsupported_strategies_lock:
+                        self._unsupported_strategies.add(strategy)
+
+        try:
+            if self._throttle is not None:
+                self._copy_throttled(source_file_path, part_file_path)
+            else:
+                shutil.copy2(source_file_path, part_file_path)
+            os.replace(part_file_path, output_file_path)
+        except OSError:
+            self._remove_partial_copy(part_file_path)
+            raise
+
+        return "copy"
+
+    @staticmethod
+    def get_part_file_path(output_file_path: str|PosixPath|WindowsPath) -> str:
+        """ Get the path an output file is written to, before it is complete. """
+
+        return str(output_file_path) + PART_FILE_SUFFIX
+
+    def _get_file_strategies(self,
+                             source_file_path: str|PosixPath|WindowsPath,
+                             source_file_size: int|None,
+                             part_file_path: str) -> list[str]:
+        """ Get the strategies to try for a file.
+
+        An interrupted chunked copy is resumed first, the other strategies would truncate its .part file.
+        With 'auto', large files are copied in resumable chunks instead of copy_file_range.
+        """
+
+        strategies: list[str] = self._strategies
+        if os.path.isfile(part_file_path + CHECKPOINT_FILE_SUFFIX):
+            return ["chunked"] + [strategy for strategy in strategies if strategy != "chunked"]
+
+        if not self._is_auto:
+            return strategies
+
+        if source_file_size is None:
+            source_file_size = os.path.getsize(source_file_path)
+        if source_file_size >= RESUMABLE_COPY_MIN_SIZE:
+            return [strategy for strategy in strategies if strategy not in ("copy_file_range", "copy")] + ["chunked", "copy"]
+
+        return strategies
+
+    def _get_strategy_chain(self, copy_strategy: str, allow_hardlink: bool) -> list[str]:
+        """ Get the strategies to try in order, ending with the plain copy. """
+
+        if copy_strategy not in COPY_STRATEGIES:
+            raise ValueError(f"Unknown copy strategy: {copy_strategy}")
+
+        if copy_strategy == "auto":
+            # Hardlinks are opt-in, auto copies with strategies that leave the exported file independent of its source.
+            strategies: list[str] = ["reflink", "copy_file_range"]
+        elif copy_strategy == "hardlink" and not allow_hardlink:
+            self._logger.warning("Hardlinked tracks would share the metadata of the source file, "
+                                 "hardlink copy strategy is only used with metadata setting disabled.")
+            strategies = []
+        else:
+            strategies = [copy_strategy]
+
+        if not sys.platform.startswith("linux"):
+            strategies = [strategy for strategy in strategies if strategy not in ("reflink", "copy_file_range")]
+
+        return strategies + ["copy"]
+
+    @staticmethod
+    def _copy_reflink(source_file_path: str, output_file_path: str):
+        """ Clone the source file's extents into the output file. """
+
+        # Reason: Linux only module, the strategy is filtered out on other platforms.
+        # pylint: disable-next=import-outside-toplevel
+        import fcntl
+
+        with open(source_file_path, "rb") as source_file, open(output_file_path, "wb") as output_file:
+            fcntl.ioctl(output_file.fileno(), FICLONE, source_file.fileno())
+        shutil.copystat(source_file_path, output_file_path)
+
+    def _copy_file_range(self, source_file_path: str, output_file_path: str):
+        """ Copy the file in the kernel with copy_file_range, or sendfile if it is not available.
+        Throttled copies are made in buffer sized parts.
+        """
+
+        with open(source_file_path, "rb") as source_file, open(output_file_path, "wb") as output_file:
+            source_fd: int = source_file.fileno()
+            output_fd: int = output_file.fileno()
+            bytes_left: int = os.fstat(source_fd).st_size
+            offset: int = 0
+            while bytes_left > 0:
+                count: int = bytes_left
+                if self._throttle is not None:
+                    count = min(bytes_left, self._buffer_size)
+                    self._throttle(count)
+                try:
+                    copied_bytes: int = os.copy_file_range(source_fd, output_fd, count, offset, offset)
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+                    # sendfile writes at the output's file position, copy_file_range with offsets does not move it.
+                    os.lseek(output_fd, offset, os.SEEK_SET)
+                    copied_bytes = os.sendfile(output_fd, source_fd, offset, count)
+                if copied_bytes == 0:
+                    raise OSError(errno.EIO, "Source file shrank during copy", source_file_path)
+                offset += copied_bytes
+                bytes_left -= copied_bytes
+        shutil.copystat(source_file_path, output_file_path)
+
+    @staticmethod
+    def _copy_hardlink(source_file_path: str, output_file_path: str):
+        """ Link the output path to the source file. """
+
+        if os.path.lexists(output_file_path):
+            os.remove(output_file_path)
+        os.link(source_file_path, output_file_path)
+
+    def _copy_chunked(self, source_file_path: str, part_file_path: str):
+        """ Copy the file in chunks, resuming an interrupted copy from its last checkpoint.
+
+        The checkpoint holds the source file's size and modification time, the copied byte count,
+        and the CRC32 of the last copied chunk. The copy is resumed only if the source file did not change,
+        and the .part file still holds the recorded chunk at the recorded offset.
+        """
+
+        checkpoint_file_path: str = part_file_path + CHECKPOINT_FILE_SUFFIX
+        source_stat: os.stat_result = os.stat(source_file_path)
+        offset: int = self._get_checkpoint_offset(checkpoint_file_path, part_file_path, source_file_path, source_stat)
+        if offset > 0:
+            self._logger.info("Resuming copy of %s at %s of %s bytes.", source_file_path, offset, source_stat.st_size)
+
+        with open(source_file_path, "rb") as source_file, \
+                open(part_file_path, "r+b" if offset > 0 else "wb") as part_file:
+            source_file.seek(offset)
+            part_file.seek(offset)
+            part_file.truncate()
+            checkpoint_offset: int = offset
+            while chunk := source_file.read(self._buffer_size):
+                if self._throttle is not None:
+                    self._throttle(len(chunk))
+                part_file.write(chunk)
+                offset += len(chunk)
+                if offset - checkpoint_offset >= CHECKPOINT_INTERVAL:
+                    part_file.flush()
+                    os.fsync(part_file.fileno())
+                    self._write_checkpoint(checkpoint_file_path, _CopyCheckpoint(str(source_file_path),
+                                                                                 source_stat.st_size,
+                                                                                 source_stat.st_mtime_ns,
+                                                                                 offset,
+                                                                                 len(chunk),
+                                                                                 zlib.crc32(chunk)))
+                    checkpoint_offset = offset
+
+            part_file.flush()
+            os.fsync(part_file.fileno())
+
+        if offset != source_stat.st_size:
+            # The checkpoint of a changed source file can not be resumed from.
+            if os.path.exists(checkpoint_file_path):
+                os.remove(checkpoint_file_path)
+            raise OSError(errno.EIO, "Source file changed size during copy", source_file_path)
+
+        shutil.copystat(source_file_path, part_file_path)
+        if os.path.exists(checkpoint_file_path):
+            os.remove(checkpoint_file_path)
+
+    def _remove_partial_copy(self, part_file_path: str):
+        """ Remove the .part file of a failed copy, so a failed strategy leaves nothing behind. """
+
+        try:
+            if os.path.lexists(part_file_path):
+                os.remove(part_file_path)
+        except OSError as e:
+            self._logger.debug("Partial copy can not be removed: %s", e)
+
+    def _copy_throttled(self, source_file_path: str|PosixPath|WindowsPath, part_file_path: str):
+        """ Copy the file and its metadata like shutil.copy2, in buffer sized chunks passed to the throttle. """
+
+        with open(source_file_path, "rb") as source_file, open(part_file_path, "wb") as part_file:
+            while chunk := source_file.read(self._buffer_size):
+                self._throttle(len(chunk))
+                part_file.write(chunk)
+        shutil.copystat(source_file_path, part_file_path)
+
+    def _get_checkpoint_offset(self,
+                               checkpoint_file_path: str,
+                               part_file_path: str,
+                               source_file_path: str,
+                               source_stat: os.stat_result) -> int:
+        """ Get the offset to resume a chunked copy from, 0 if there is no valid checkpoint. """
+
+        try:
+            with open(checkpoint_file_path, "r", encoding="utf-8") as checkpoint_file:
+                checkpoint = _CopyCheckpoint(**json.load(checkpoint_file))
+
+            if checkpoint.source_path != str(source_file_path) \
+                    or checkpoint.source_size != source_stat.st_size \
+                    or checkpoint.source_mtime_ns != source_stat.st_mtime_ns:
+                self._logger.debug("Source file changed since the checkpoint, copying from the start: %s",
+                                   source_file_path)
+
+                return 0
+
+            with open(part_file_path, "rb") as part_file:
+                part_file.seek(checkpoint.offset - checkpoint.chunk_size)
+                if zlib.crc32(part_file.read(checkpoint.chunk_size)) != checkpoint.chunk_crc32:
+                    self._logger.debug("Checkpoint can not be verified, copying from the start: %s", part_file_path)
+
+                    return 0
+
+            return checkpoint.offset
+        except (OSError, ValueError, TypeError):
+            return 0
+
+    @staticmethod
+    def _write_checkpoint(checkpoint_file_path: str, checkpoint: _CopyCheckpoint):
+        """ Record the progress of a chunked copy, replacing the previous checkpoint in one step. """
+
+        temporary_checkpoint_file_path: str = checkpoint_file_path + ".tmp"
+        with open(temporary_checkpoint_file_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(checkpoint._asdict(), checkpoint_file)
+        os.replace(temporary_checkpoint_file_path, checkpoint_file_path)
@@ -0,0 +1,225 @@
+""" Parallel reader of the audio headers of track files, for their real duration and bitrate. """
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PosixPath, WindowsPath
+from typing import BinaryIO, NamedTuple
+
+from track import Track
+from utility.versioned_json_file import read_versioned_json, write_versioned_json
+
+# File extensions with a header reader.
+PROBE_EXTENSIONS: tuple[str, ...] = (".mp3", ".flac", ".wav", ".wma")
+FLAC_MARKER: bytes = b"fLaC"
+FLAC_STREAMINFO_BLOCK_TYPE: int = 0
+ID3_HEADER_SIZE: int = 10
+
+
+class ProbeResult(NamedTuple):
+    """ Duration in seconds and bitrate in bits per second of a track file, or the reason it can not be read. """
+
+    duration: float|None
+    bitrate: int|None
+    error: str|None = None
+
+
+class TrackProber:
+    """ Parallel reader of the audio headers of track files, for their real duration and bitrate.
+
+    Only the headers are read through mutagen's stream info classes: the MPEG frame and Xing/VBRI header of .mp3 files,
+    the STREAMINFO block of .flac files, the fmt and data chunk headers of .wav files and the header object of .wma
+    files. Tags and audio data are skipped, so a probe reads a few KB of the file, on a thread pool.
+    Files, whose headers can not be read, are reported with an error, before any bytes of them are copied.
+
+    Results are cached by the path, size and modification time of the file. With a cache file, the cache is kept
+    between runs, so repeated exports of unchanged files do not read them again.
+    """
+
+    CACHE_VERSION: int = 1
+
+    _logger: logging.Logger = None
+    _workers: int = 1
+    _cache_file_path: str|None = None
+    _cache: dict[str, tuple[int, float, ProbeResult]] = None
+    _is_cache_changed: bool = False
+    _lock: threading.Lock = None
+
+    def __init__(self, workers: int, cache_file_path: str|PosixPath|WindowsPath|None = None):
+        """ Without a cache file, results are cached for the lifetime of the prober only. """
+
+        self._logger = logging.getLogger("TrackProber")
+        self._workers = max(1, workers)
+        self._cache_file_path = os.path.abspath(cache_file_path) if cache_file_path is not None else None
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def probe_tracks(self, tracks: list[Track]) -> tuple[list[ProbeResult|None], int]:
+        """ Read the headers of the tracks' files in parallel.
+        Returns the result of every track, None for missing files and formats without a header reader,
+        and the number of results taken from the cache.
+        """
+
+        results: list[ProbeResult|None] = [None] * len(tracks)
+        tracks_to_probe: list[tuple[int, str, int, float]] = []
+        cache_hits: int = 0
+        for track_index, track in enumerate(tracks):
+            file_path: str = str(track.abs_file_path)
+            if track.file_size is None or not file_path.lower().endswith(PROBE_EXTENSIONS):
+                continue
+
+            cached_result: ProbeResult|None = self._get_cached_result(file_path, track.file_size, track.file_mtime)
+            if cached_result is not None:
+                results[track_index] = cached_result
+                cache_hits += 1
+            else:
+                tracks_to_probe.append((track_index, file_path, track.file_size, track.file_mtime))
+
+        if tracks_to_probe:
+            with ThreadPoolExecutor(max_workers=min(self._workers, len(tracks_to_probe)),
+                                    thread_name_prefix="probe") as executor:
+                probed_results: list[ProbeResult] = list(executor.map(
+                    lambda track_to_probe: self._probe_file(track_to_probe[1]), tracks_to_probe
+                ))
+            with self._lock:
+                for (track_index, file_path, file_size, file_mtime), result in zip(tracks_to_probe, probed_results):
+                    results[track_index] = result
+                    self._cache[file_path] = (file_size, file_mtime, result)
+                self._is_cache_changed = True
+
+        self._logger.debug("Probed %s track files, %s from the cache.", len(tracks_to_probe) + cache_hits, cache_hits)
+
+        return results, cache_hits
+
+    def save(self):
+        """ Write the cache file if the cache changed, replacing the previous one in one step. """
+
+        if self._cache_file_path is None or not self._is_cache_changed:
+            return
+
+        with self._lock:
+            cache: dict = {
+                "files": {
+                    file_path: [file_size, file_mtime, result.duration, result.bitrate, result.error]
+                    for file_path, (file_size, file_mtime, result) in self._cache.items()
+                }
+            }
+            self._is_cache_changed = False
+
+        try:
+            write_versioned_json(self._cache_file_path, self.CACHE_VERSION, cache)
+        except OSError as e:
+            self._logger.error("Probe cache save error: %s", e)
+
+    def _get_cached_result(self, file_path: str, file_size: int, file_mtime: float) -> ProbeResult|None:
+        """ Get the cached result of a file, if the file did not change since it was probed. """
+
+        with self._lock:
+            cache_entry: tuple[int, float, ProbeResult]|None = self._cache.get(file_path)
+        if cache_entry is None or cache_entry[0] != file_size or cache_entry[1] != file_mtime:
+            return None
+
+        return cache_entry[2]
+
+    def _probe_file(self, file_path: str) -> ProbeResult:
+        """ Read the duration and bitrate from the header of a file. """
+
+        try:
+            with open(file_path, "rb") as track_file:
+                stream_info = self._read_stream_info(track_file, os.path.splitext(file_path)[1].lower())
+        except Exception as e:
+            return ProbeResult(None, None, f"{type(e).__name__}: {e}")
+
+        duration: float|None = getattr(stream_info, "length", None)
+        if not duration or duration <= 0:
+            return ProbeResult(None, None, "no audio stream length in the header")
+
+        return ProbeResult(duration, int(getattr(stream_info, "bitrate", 0) or 0) or None)
+
+    @staticmethod
+    def _read_stream_info(track_file: BinaryIO, extension: str):
+        """ Read the stream info of a file with the header reader of its format. """
+
+        # Reason: mutagen is slow to import, it is only needed when tracks are probed.
+        # pylint: disable=import-outside-toplevel
+        if extension == ".mp3":
+            from mutagen.mp3 import MPEGInfo
+
+            # The ID3v2 tag in front of the first frame is skipped, not read.
+            return MPEGInfo(track_file)
+        if extension == ".flac":
+            return TrackProber._read_flac_stream_info(track_file)
+        if extension == ".wav":
+            from mutagen.wave import WaveStreamInfo
+
+            return WaveStreamInfo(track_file)
+        from mutagen.asf import ASF
+        # pylint: enable=import-outside-toplevel
+
+        # The ASF header object holds the stream properties and the tags, it is read as a whole.
+        return ASF(track_file).info
+
+    @staticmethod
+    def _read_flac_stream_info(track_file: BinaryIO):
+        """ Read the STREAMINFO block of a .flac file, and seek over the other metadata blocks to the audio frames.
+        The bitrate is the size of the audio frames over the duration.
+        """
+
+        # Reason: mutagen is slow to import, it is only needed when tracks are probed.
+        # pylint: disable-next=import-outside-toplevel
+        from mutagen.flac import StreamInfo, FLACNoHeaderError
+
+        marker: bytes = track_file.read(4)
+        if marker[:3] == b"ID3":
+            id3_header: bytes = marker + track_file.read(ID3_HEADER_SIZE - 4)
+            id3_size: int = 0
+            for size_byte in id3_header[6:10]:
+                id3_size = (id3_size << 7) | (size_byte & 0x7f)
+            footer_size: int = ID3_HEADER_SIZE if id3_header[5] & 0x10 else 0
+            track_file.seek(ID3_HEADER_SIZE + id3_size + footer_size)
+            marker = track_file.read(4)
+        if marker != FLAC_MARKER:
+            raise FLACNoHeaderError("not a FLAC file")
+
+        stream_info: StreamInfo|None = None
+        is_last_block: bool = False
+        while not is_last_block:
+            block_header: bytes = track_file.read(4)
+            if len(block_header) < 4:
+                raise FLACNoHeaderError("truncated metadata block")
+
+            is_last_block = bool(block_header[0] & 0x80)
+            block_size: int = int.from_bytes(block_header[1:4], "big")
+            if block_header[0] & 0x7f == FLAC_STREAMINFO_BLOCK_TYPE:
+                stream_info = StreamInfo(track_file.read(block_size))
+            else:
+                track_file.seek(block_size, os.SEEK_CUR)
+        if stream_info is None:
+            raise FLACNoHeaderError("stream info block not found")
+
+        audio_start: int = track_file.tell()
+        audio_end: int = track_file.seek(0, os.SEEK_END)
+        if audio_end < audio_start:
+            raise FLACNoHeaderError("truncated metadata block")
+        stream_info.bitrate = int((audio_end - audio_start) * 8 / stream_info.length) if stream_info.length else 0
+
+        return stream_info
+
+    def _load(self):
+        """ Read the cache file of earlier runs, an unreadable cache file starts an empty cache. """
+
+        if self._cache_file_path is None:
+            return
+
+        try:
+            cache: dict|None = read_versioned_json(self._cache_file_path, self.CACHE_VERSION)
+            if cache is None:
+                return
+
+            for file_path, (file_size, file_mtime, duration, bitrate, error) in cache["files"].items():
+                self._cache[file_path] = (file_size, file_mtime, ProbeResult(duration, bitrate, error))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._logger.warning("Probe cache can not be read, starting an empty cache: %s", e)
+            self._cache = {}
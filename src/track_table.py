@@ -0,0 +1,129 @@
+""" Compact, column based store of a playlist's tracks. """
+
+import math
+import sys
+from array import array
+from collections.abc import Iterator, Sequence
+
+from track import Track
+
+
+# Reason: Eleven is reasonable in this case, every track field is a column of its own, next to the shared strings.
+# pylint: disable-next=too-many-instance-attributes
+class TrackTable(Sequence[Track]):
+    """ Compact, column based store of a playlist's tracks.
+
+    Every track field is a column. Paths are split into a directory prefix and a file name, the prefixes, file names
+    and titles are stored once per distinct value, numbers are stored in typed arrays instead of Python objects.
+    Track tuples are built on access, the table can be used like the list[Track] it replaces.
+    """
+
+    _directories: list[str] = None
+    _directory_ids: dict[str, int] = None
+    _strings: dict[str, str] = None
+    _track_directory_ids: array = None
+    _file_names: list[str] = None
+    _titles: list[str] = None
+    _orders: array = None
+    _durations: array = None
+    _file_sizes: array = None
+    _file_mtimes: array = None
+    _bitrates: array = None
+
+    def __init__(self):
+        self._directories = []
+        self._directory_ids = {}
+        self._strings = {}
+        self._track_directory_ids = array("I")
+        self._file_names = []
+        self._titles = []
+        self._orders = array("I")
+        self._durations = array("d")
+        # Missing file sizes and bitrates are stored as -1, missing modification times as NaN.
+        self._file_sizes = array("q")
+        self._file_mtimes = array("d")
+        self._bitrates = array("q")
+
+    def append(self, track: Track):
+        """ Add a track to the end of the table. """
+
+        abs_file_path: str = str(track.abs_file_path)
+        directory: str = abs_file_path[:len(abs_file_path) - len(track.file_name)]
+        directory_id: int|None = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = len(self._directories)
+            self._directories.append(directory)
+            self._directory_ids[directory] = directory_id
+
+        self._track_directory_ids.append(directory_id)
+        self._file_names.append(self._intern(track.file_name))
+        self._titles.append(self._intern(track.title))
+        self._orders.append(track.order)
+        self._durations.append(track.duration)
+        self._file_sizes.append(track.file_size if track.file_size is not None else -1)
+        self._file_mtimes.append(track.file_mtime if track.file_mtime is not None else math.nan)
+        self._bitrates.append(track.bitrate if track.bitrate is not None else -1)
+
+    def set_audio_info(self, index: int, duration: float, bitrate: int|None):
+        """ Replace the duration of a track, and set its bitrate, with the values read from its file. """
+
+        self._durations[index] = duration
+        self._bitrates[index] = bitrate if bitrate is not None else -1
+
+    def get_memory_size(self) -> int:
+        """ Get the approximate memory use of the table in bytes. """
+
+        columns_size: int = sum(sys.getsizeof(column) for column in (
+            self._directories, self._directory_ids, self._strings, self._track_directory_ids, self._file_names,
+            self._titles, self._orders, self._durations, self._file_sizes, self._file_mtimes, self._bitrates
+        ))
+        strings_size: int = sum(sys.getsizeof(string) for string in self._strings) \
+            + sum(sys.getsizeof(directory) for directory in self._directories)
+
+        return columns_size + strings_size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get_track(track_index) for track_index in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TrackTable index out of range")
+
+        return self._get_track(index)
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __iter__(self) -> Iterator[Track]:
+        for track_index in range(len(self)):
+            yield self._get_track(track_index)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def _get_track(self, index: int) -> Track:
+        """ Build the Track tuple of a row. """
+
+        file_name: str = self._file_names[index]
+        file_size: int = self._file_sizes[index]
+        file_mtime: float = self._file_mtimes[index]
+        bitrate: int = self._bitrates[index]
+
+        # Positional arguments, in the Track field order, the tuple is built for every access of a row.
+        return Track(
+            self._directories[self._track_directory_ids[index]] + file_name,
+            file_name,
+            self._orders[index],
+            self._titles[index],
+            self._durations[index],
+            file_size if file_size >= 0 else None,
+            file_mtime if not math.isnan(file_mtime) else None,
+            bitrate if bitrate >= 0 else None
+        )
+
+    def _intern(self, string: str) -> str:
+        """ Get the stored instance of an equal string, so repeated file names and titles are stored once. """
+
+        return self._strings.setdefault(string, string)
@@ -0,0 +1,249 @@
+""" Transcoder of track files to a fixed format and bitrate with an external encoder, with an output cache. """
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PosixPath, WindowsPath
+from typing import NamedTuple
+
+from track import Track
+from track_file_copier import DEFAULT_BUFFER_SIZE
+from utility.versioned_json_file import read_versioned_json, write_versioned_json
+
+# Encoders of every output format, in order of preference, with the source file extensions they read.
+# None reads every source format.
+ENCODERS: dict[str, tuple[tuple[str, tuple[str, ...]|None], ...]] = {
+    "mp3": (("ffmpeg", None), ("lame", (".wav", ".mp3"))),
+    "opus": (("ffmpeg", None), ("opusenc", (".wav", ".flac")))
+}
+
+
+class TranscodeResult(NamedTuple):
+    """ Result of transcoding a track file. """
+    file_path: str|None
+    is_cached: bool = False
+    seconds: float = 0.0
+    error: str|None = None
+
+
+# Reason: Ten is reasonable in this case, the encoder settings, the found encoders and the cache index.
+# pylint: disable-next=too-many-instance-attributes
+class TrackTranscoder:
+    """ Transcoder of track files to a fixed format and bitrate with an external encoder, with an output cache.
+
+    ffmpeg, or the lame or opusenc encoder for the source formats they read, is looked up on the PATH.
+    Every encoder run is a separate process, the tracks are encoded on as many encoder processes at once as configured,
+    by default one per CPU core. The threads driving them only wait for the processes to finish.
+
+    Encoded files are stored in the cache folder, named by the content digest of the source file and the encoder
+    settings, so a source file that did not change is never encoded again with the same settings, even under another
+    path. Source files are hashed once, their digests are kept by their path, size and modification time.
+    Without a cache folder, the files are encoded into a temporary folder, that is removed when the transcoder is closed.
+    """
+
+    INDEX_FILE_NAME: str = "transcode_cache_index.json"
+    INDEX_VERSION: int = 1
+
+    _logger: logging.Logger = None
+    _output_format: str = "mp3"
+    _bitrate: int = 192
+    _processes: int = 1
+    _cache_directory: str|None = None
+    _is_temporary_cache: bool = False
+    _encoder_paths: dict[str, str] = None
+    _source_digests: dict[str, str] = None
+    _is_index_changed: bool = False
+    _lock: threading.Lock = None
+
+    def __init__(self,
+                 output_format: str,
+                 bitrate: int,
+                 processes: int = 0,
+                 cache_directory: str|PosixPath|WindowsPath|None = None):
+        """ bitrate is in kbit/s. processes 0 runs an encoder process per CPU core. """
+
+        self._logger = logging.getLogger("TrackTranscoder")
+        self._output_format = output_format
+        self._bitrate = bitrate
+        self._processes = processes if processes > 0 else os.cpu_count() or 1
+        self._is_temporary_cache = cache_directory is None
+        self._cache_directory = os.path.abspath(cache_directory) if cache_directory is not None else None
+        self._encoder_paths = {}
+        for encoder_name, _ in ENCODERS[output_format]:
+            encoder_path: str|None = shutil.which(encoder_name)
+            if encoder_path is not None:
+                self._encoder_paths[encoder_name] = encoder_path
+        if not self._encoder_paths:
+            self._logger.error("No %s encoder found, install ffmpeg or add it to the PATH.", output_format)
+        self._source_digests = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def get_output_file_name(self, file_name: str) -> str:
+        """ Get the name of a track file in the output format. """
+
+        return os.path.splitext(file_name)[0] + "." + self._output_format
+
+    def get_bitrate(self) -> int:
+        """ Get the bitrate of the encoded files in bit/s. """
+
+        return self._bitrate * 1000
+
+    def transcode_tracks(self, tracks: list[Track]) -> dict[str, TranscodeResult]:
+        """ Encode the source files of the tracks on the encoder processes, or take them from the cache.
+        Returns the result of every source file path, a source file in more than one track is encoded once.
+        """
+
+        source_file_paths: list[str] = list(dict.fromkeys(str(track.abs_file_path) for track in tracks))
+        if not source_file_paths:
+            return {}
+
+        if self._cache_directory is None:
+            self._cache_directory = tempfile.mkdtemp(prefix="transcode_")
+        with ThreadPoolExecutor(max_workers=min(self._processes, len(source_file_paths)),
+                                thread_name_prefix="transcode") as executor:
+            results: list[TranscodeResult] = list(executor.map(self._transcode_file, source_file_paths))
+
+        return dict(zip(source_file_paths, results))
+
+    def close(self):
+        """ Save the cache index, or remove the temporary folder of a transcoder without a cache folder. """
+
+        if self._is_temporary_cache:
+            if self._cache_directory is not None:
+                shutil.rmtree(self._cache_directory, ignore_errors=True)
+                self._cache_directory = None
+
+            return
+
+        if not self._is_index_changed:
+            return
+
+        with self._lock:
+            index: dict = {"sources": dict(self._source_digests)}
+            self._is_index_changed = False
+
+        try:
+            write_versioned_json(os.path.join(self._cache_directory, self.INDEX_FILE_NAME), self.INDEX_VERSION, index)
+        except OSError as e:
+            self._logger.error("Transcode cache index save error: %s", e)
+
+    def _transcode_file(self, source_file_path: str) -> TranscodeResult:
+        """ Encode a source file into the cache, if it is not cached yet. Errors are returned, not raised. """
+
+        transcode_start: float = time.perf_counter()
+        encoder_name: str|None = self._get_encoder_name(source_file_path)
+        if encoder_name is None:
+            return TranscodeResult(None, error=f"no {self._output_format} encoder for "
+                                               f"{os.path.splitext(source_file_path)[1]} files found")
+
+        try:
+            output_file_path: str = self._get_output_file_path(self._get_source_digest(source_file_path), encoder_name)
+            if os.path.isfile(output_file_path):
+                return TranscodeResult(output_file_path, True, time.perf_counter() - transcode_start)
+
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            # The encoders pick the container by the file extension, the part file keeps it.
+            part_file_path: str = os.path.join(os.path.dirname(output_file_path),
+                                               f".{uuid.uuid4().hex}.part.{self._output_format}")
+            try:
+                encoder_run: subprocess.CompletedProcess = subprocess.run(
+                    self._get_encoder_command(encoder_name, source_file_path, part_file_path),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    check=False
+                )
+                if encoder_run.returncode != 0:
+                    encoder_output: list[str] = encoder_run.stderr.decode("utf-8", "replace").strip().splitlines()
+                    return TranscodeResult(None, error=f"{encoder_name} exit code {encoder_run.returncode}: "
+                                                       f"{encoder_output[-1] if encoder_output else ''}")
+
+                os.replace(part_file_path, output_file_path)
+            finally:
+                if os.path.exists(part_file_path):
+                    os.remove(part_file_path)
+        except OSError as e:
+            return TranscodeResult(None, error=str(e))
+
+        return TranscodeResult(output_file_path, False, time.perf_counter() - transcode_start)
+
+    def _get_encoder_name(self, source_file_path: str) -> str|None:
+        """ Get the preferred available encoder, that reads the source file's format. """
+
+        extension: str = os.path.splitext(source_file_path)[1].lower()
+        for encoder_name, source_extensions in ENCODERS[self._output_format]:
+            if encoder_name in self._encoder_paths and (source_extensions is None or extension in source_extensions):
+                return encoder_name
+
+        return None
+
+    def _get_encoder_command(self, encoder_name: str, source_file_path: str, output_file_path: str) -> list[str]:
+        """ Get the command line of an encoder run. ffmpeg copies the tags of the source file. """
+
+        encoder_path: str = self._encoder_paths[encoder_name]
+        if encoder_name == "ffmpeg":
+            codec: str = "libmp3lame" if self._output_format == "mp3" else "libopus"
+            return [encoder_path, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", source_file_path,
+                    "-map", "0:a", "-map_metadata", "0", "-c:a", codec, "-b:a", f"{self._bitrate}k", output_file_path]
+        if encoder_name == "lame":
+            mp3_input: list[str] = ["--mp3input"] if source_file_path.lower().endswith(".mp3") else []
+            return [encoder_path, "--quiet", *mp3_input, "-b", str(self._bitrate), source_file_path, output_file_path]
+
+        return [encoder_path, "--quiet", "--bitrate", str(self._bitrate), source_file_path, output_file_path]
+
+    def _get_output_file_path(self, source_digest: str, encoder_name: str) -> str:
+        """ Get the cache path of a source file encoded with the configured settings.
+        The files are spread over subfolders by the first characters of the digest.
+        """
+
+        settings_key: str = hashlib.blake2b(f"{encoder_name}|{self._output_format}|{self._bitrate}".encode("utf-8"),
+                                            digest_size=4).hexdigest()
+
+        return os.path.join(self._cache_directory,
+                            "files",
+                            source_digest[:2],
+                            f"{source_digest}-{settings_key}.{self._output_format}")
+
+    def _get_source_digest(self, source_file_path: str) -> str:
+        """ Get the content digest of a source file, hash it if it changed since it was hashed last. """
+
+        source_stat: os.stat_result = os.stat(source_file_path)
+        source_key: str = f"{os.path.normcase(os.path.abspath(source_file_path))}|{source_stat.st_size}|" \
+                          f"{source_stat.st_mtime_ns}"
+        with self._lock:
+            source_digest: str|None = self._source_digests.get(source_key)
+        if source_digest is not None:
+            return source_digest
+
+        content_hash = hashlib.blake2b(digest_size=32)
+        with open(source_file_path, "rb") as source_file:
+            while chunk := source_file.read(DEFAULT_BUFFER_SIZE):
+                content_hash.update(chunk)
+        source_digest = content_hash.hexdigest()
+        with self._lock:
+            self._source_digests[source_key] = source_digest
+            self._is_index_changed = True
+
+        return source_digest
+
+    def _load(self):
+        """ Read the source digests of earlier runs, an unreadable index starts an empty one. """
+
+        if self._is_temporary_cache:
+            return
+
+        try:
+            index: dict|None = read_versioned_json(os.path.join(self._cache_directory, self.INDEX_FILE_NAME), self.INDEX_VERSION)
+            if index is not None:
+                self._source_digests = dict(index["sources"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._logger.warning("Transcode cache index can not be read, hashing the source files again: %s", e)
+            self._source_digests = {}
@@ -0,0 +1,53 @@
+""" Quick check of a configuration dict against a Cerberus style schema. """
+
+SCHEMA_TYPES: dict[str, type|tuple[type, ...]] = {
+    'string': str,
+    'boolean': bool,
+    'integer': int,
+    'number': (int, float)
+}
+SCHEMA_RULES: frozenset[str] = frozenset(('type', 'nullable', 'required', 'min', 'allowed'))
+
+
+def is_valid_by_schema(document: dict, schema: dict[str, dict]) -> bool:
+    """ Quick check of a configuration dict against a Cerberus style schema, without importing or building a Validator.
+
+    Only the type, nullable, required, min and allowed rules are checked. The check is strict: a False result
+    does not mean the document is invalid, only that it has to be validated by Cerberus, which also reports the errors.
+    """
+
+    if not isinstance(document, dict) or not document.keys() <= schema.keys():
+        return False
+
+    return all(_is_valid_field(document, key, rules) for key, rules in schema.items())
+
+
+def _is_valid_field(document: dict, key: str, rules: dict) -> bool:
+    """ Check one field of the document against its rules. """
+
+    if not rules.keys() <= SCHEMA_RULES:
+        return False
+
+    if key not in document:
+        return not rules.get('required', False)
+
+    value = document[key]
+    if value is None:
+        return rules.get('nullable', False)
+
+    if 'type' in rules and not _is_of_schema_type(value, rules['type']):
+        return False
+    if 'min' in rules and value < rules['min']:
+        return False
+
+    return 'allowed' not in rules or value in rules['allowed']
+
+
+def _is_of_schema_type(value, type_name: str) -> bool:
+    """ Check the type of a value against a schema type name. """
+
+    # bool is a subclass of int, an integer field set to a bool is left to Cerberus.
+    if isinstance(value, bool):
+        return type_name == 'boolean'
+
+    return isinstance(value, SCHEMA_TYPES.get(type_name, ()))
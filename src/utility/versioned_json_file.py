@@ -0,0 +1,51 @@
+""" Reader and writer of the versioned JSON files of the caches and indexes. """
+
+import json
+import os
+
+
+def read_versioned_json(file_path: str, version: int) -> dict|None:
+    """ Read a JSON object file, that an earlier run wrote with write_versioned_json.
+
+    Args:
+        file_path (str): The path of the file.
+        version (int): The expected format version.
+
+    Returns:
+        dict|None: The object, None if the file does not exist.
+
+    Raises:
+        OSError: The file can not be read.
+        ValueError: The file is not a JSON object, or is of another format version.
+    """
+
+    if not os.path.isfile(file_path):
+        return None
+
+    with open(file_path, "r", encoding="utf-8") as json_file:
+        content: object = json.load(json_file)
+    if not isinstance(content, dict):
+        raise ValueError(f"{file_path} is not a JSON object")
+    if content.get("version") != version:
+        raise ValueError(f"{file_path} is of unknown version {content.get('version')}")
+
+    return content
+
+
+def write_versioned_json(file_path: str, version: int, content: dict):
+    """ Write a JSON object file with its format version, replacing the previous file in one step.
+
+    Args:
+        file_path (str): The path of the file, its folder is created if missing.
+        version (int): The format version, stored under the "version" key.
+        content (dict): The other keys of the object.
+
+    Raises:
+        OSError: The file can not be written.
+    """
+
+    temporary_file_path: str = file_path + ".tmp"
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(temporary_file_path, "w", encoding="utf-8") as json_file:
+        json.dump({"version": version, **content}, json_file)
+    os.replace(temporary_file_path, file_path)
@@ -0,0 +1,64 @@
+""" Shared fixtures of the tests. The application modules are imported from the src folder, like in run_cli,
+the synthetic audio files are made with the benchmarks' library generator. """
+
+import os
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import quote
+
+import pytest
+
+REPOSITORY_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPOSITORY_DIRECTORY, "src"))
+# The synthetic track files of the benchmarks are valid audio files, that can be tagged.
+sys.path.insert(0, os.path.join(REPOSITORY_DIRECTORY, "benchmarks"))
+
+# Reason: The application modules are importable only after the src folder is on the path.
+# pylint: disable-next=wrong-import-position
+from playlist_exporter_configuration import PlaylistExporterConfiguration
+
+
+@pytest.fixture(name="write_playlist")
+def write_playlist_fixture(tmp_path: Path) -> Callable[[list[str]], Path]:
+    """ Get a function, that writes a playlist of the given track names into the test folder's library folder.
+    A track file with distinct content is created for every name, that has no file yet, the playlist holds their
+    file:/// uris. Tests that tag the tracks write valid audio files into the library folder first.
+    """
+
+    library_directory: Path = tmp_path / "library"
+    library_directory.mkdir()
+    playlist_file_path: Path = library_directory / "playlist.m3u8"
+
+    def write_playlist(track_names: list[str]) -> Path:
+        lines: list[str] = ["#EXTM3U"]
+        for track_name in track_names:
+            track_file_path: Path = library_directory / f"{track_name}.mp3"
+            if not track_file_path.exists():
+                track_file_path.write_bytes(track_name.encode("utf-8") * 1024)
+            lines += [f"#EXTINF:60,Artist - {track_name}", "file:///" + quote(str(track_file_path))]
+        playlist_file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        return playlist_file_path
+
+    return write_playlist
+
+
+@pytest.fixture(name="make_config")
+def make_config_fixture(tmp_path: Path) -> Callable[..., PlaylistExporterConfiguration]:
+    """ Get a function, that makes an untagged export configuration of a playlist into the test folder's album folder.
+    Other configuration values are given as keyword arguments, by their configuration file keys.
+    """
+
+    def make_config(playlist_file_path: Path, **values) -> PlaylistExporterConfiguration:
+        config = PlaylistExporterConfiguration()
+        config.load_dict({
+            "playlist_file_path": str(playlist_file_path),
+            "album_name": "Album",
+            "output_directory": str(tmp_path / "album"),
+            "set_file_metadata": False
+        } | values)
+
+        return config
+
+    return make_config
@@ -0,0 +1,81 @@
+""" Tests of the archive output: the streamed entries, and the removal of an archive after a failed write. """
+
+import io
+import tarfile
+import zipfile
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from album_archive_writer import AlbumArchiveWriter
+from archive_playlist_to_album_exporter import ArchivePlaylistToAlbumExporter
+
+
+def read_entries(archive_path: Path) -> dict[str, bytes]:
+    """ Read the entries of a .zip or .tar archive by name. """
+
+    if archive_path.suffix == ".zip":
+        with zipfile.ZipFile(archive_path) as zip_file:
+            return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+    with tarfile.open(archive_path) as tar_file:
+        return {member.name: tar_file.extractfile(member).read() for member in tar_file.getmembers()}
+
+
+@pytest.mark.parametrize("archive_name", ["album.zip", "album.tar"])
+def test_entry_is_the_header_followed_by_the_payload(tmp_path: Path, archive_name: str):
+    archive_path: Path = tmp_path / archive_name
+    payload_file = io.BytesIO(b"skipped payload")
+    payload_file.seek(len(b"skipped "))
+
+    with AlbumArchiveWriter(archive_path, buffer_size=2) as archive_writer:
+        archive_writer.add_entry("01 - track.mp3", payload_file, len(b"payload"), 0.0, b"header ")
+
+    assert read_entries(archive_path) == {"01 - track.mp3": b"header payload"}
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.parametrize("archive_name", ["album.zip", "album.tar"])
+def test_failed_entry_write_breaks_and_removes_the_archive(tmp_path: Path, archive_name: str):
+    archive_path: Path = tmp_path / archive_name
+    archive_writer = AlbumArchiveWriter(archive_path)
+    archive_writer.open()
+
+    with pytest.raises(OSError):
+        archive_writer.add_entry("01 - track.mp3", io.BytesIO(b"short"), 1024, 0.0)
+    assert archive_writer.is_broken()
+    with pytest.raises(OSError):
+        archive_writer.add_entry("02 - track.mp3", io.BytesIO(b"track"), 5, 0.0)
+
+    archive_writer.close()
+    assert not archive_path.exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_archive_export_fails_when_the_archive_breaks(write_playlist: Callable,
+                                                      make_config: Callable,
+                                                      tmp_path: Path,
+                                                      monkeypatch: pytest.MonkeyPatch):
+    def failing_copy_payload(*_):
+        raise OSError("Disk full")
+
+    monkeypatch.setattr(AlbumArchiveWriter, "_copy_payload", failing_copy_payload)
+    config = make_config(write_playlist(["a", "b"]), output_directory=str(tmp_path / "album.zip"))
+    exporter = ArchivePlaylistToAlbumExporter(config)
+
+    assert exporter.parse_playlist()
+    assert not exporter.export_album()
+    assert exporter.get_stats().copy_error_tracks == 1
+    assert exporter.get_stats().exported_tracks == 0
+    assert not (tmp_path / "album.zip").exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_archive_export_streams_every_track(write_playlist: Callable, make_config: Callable, tmp_path: Path):
+    config = make_config(write_playlist(["a", "b"]), output_directory=str(tmp_path / "album.tar"))
+    exporter = ArchivePlaylistToAlbumExporter(config)
+
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+    assert read_entries(tmp_path / "album.tar") == {"1 - a.mp3": b"a" * 1024, "2 - b.mp3": b"b" * 1024}
@@ -0,0 +1,123 @@
+""" Tests of the incremental export against the album manifest: kept, renamed and removed tracks. """
+
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import mutagen
+
+from album_manifest import AlbumManifest, AlbumManifestEntry
+from export_plan import ExportPlanAction
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from synthetic_library import make_mp3
+
+
+def export(config) -> PlaylistToAlbumExporter:
+    """ Parse the playlist and export the album. """
+
+    exporter = PlaylistToAlbumExporter(config)
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+
+    return exporter
+
+
+def plan(config) -> dict[str, tuple[str, str|None]]:
+    """ Plan the export, returns the action and the file name of every track by its source file name. """
+
+    exporter = PlaylistToAlbumExporter(config)
+    assert exporter.parse_playlist()
+    actions: list[ExportPlanAction] = exporter.get_export_plan().get_actions()
+
+    return {Path(action.source_path).name: (action.action, action.file_name) for action in actions}
+
+
+def test_manifest_round_trip(tmp_path: Path):
+    manifest = AlbumManifest(tmp_path)
+    manifest.add_entry(AlbumManifestEntry("/music/b.mp3", 2, 2.0, 2, "02 - b.mp3", {"album": "Album"}))
+    manifest.add_entry(AlbumManifestEntry("/music/a.mp3", 1, 1.0, 1, "01 - a.mp3", {"album": "Album"}))
+    manifest.save()
+
+    assert [entry.file_name for entry in AlbumManifest(tmp_path).load()] == ["01 - a.mp3", "02 - b.mp3"]
+
+
+def test_manifest_of_another_version_is_ignored(tmp_path: Path):
+    (tmp_path / AlbumManifest.MANIFEST_FILE_NAME).write_text('{"version": 0, "tracks": []}', encoding="utf-8")
+
+    assert not AlbumManifest(tmp_path).load()
+
+
+def test_reordered_tracks_are_renamed_and_removed_tracks_are_removed(write_playlist: Callable, make_config: Callable):
+    config = make_config(write_playlist(["a", "b", "c"]), incremental=True)
+    export(config)
+    write_playlist(["c", "a"])
+
+    assert plan(config) == {
+        "c.mp3": ("rename", "1 - c.mp3"),
+        "a.mp3": ("rename", "2 - a.mp3"),
+        "b.mp3": ("remove", "2 - b.mp3")
+    }
+
+    exporter: PlaylistToAlbumExporter = export(config)
+    album_directory = Path(config.output_directory)
+    assert sorted(path.name for path in album_directory.glob("*.mp3")) == ["1 - c.mp3", "2 - a.mp3"]
+    assert (album_directory / "1 - c.mp3").read_bytes() == b"c" * 1024
+    assert [(entry.order, entry.file_name) for entry in AlbumManifest(album_directory).load()] == [
+        (1, "1 - c.mp3"),
+        (2, "2 - a.mp3")
+    ]
+    assert exporter.get_stats().renamed_tracks == 2
+    assert exporter.get_stats().removed_tracks == 1
+
+
+def test_unchanged_tracks_are_kept(write_playlist: Callable, make_config: Callable):
+    config = make_config(write_playlist(["a", "b"]), incremental=True)
+    export(config)
+    write_playlist(["a", "b", "c"])
+
+    assert plan(config) == {
+        "a.mp3": ("keep", "1 - a.mp3"),
+        "b.mp3": ("keep", "2 - b.mp3"),
+        "c.mp3": ("copy", "3 - c.mp3")
+    }
+
+    exporter: PlaylistToAlbumExporter = export(config)
+    assert exporter.get_stats().unchanged_tracks == 2
+    assert exporter.get_stats().exported_tracks == 1
+
+
+def test_retagged_hardlinked_tracks_are_copied_first(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    library_directory: Path = tmp_path / "library"
+    for track_name in ("a", "b"):
+        make_mp3(library_directory / f"{track_name}.mp3")
+    config = make_config(write_playlist(["a", "b"]), incremental=True, copy_strategy="hardlink")
+    export(config)
+    album_directory = Path(config.output_directory)
+    assert os.stat(album_directory / "1 - a.mp3").st_nlink == 2
+
+    write_playlist(["b", "a"])
+    config.set_file_metadata = True
+    exporter: PlaylistToAlbumExporter = export(config)
+
+    assert exporter.get_stats().renamed_tracks == 2
+    for track_name in ("a", "b"):
+        assert "album" not in mutagen.File(library_directory / f"{track_name}.mp3", easy=True)
+    for file_name, track_number in (("1 - b.mp3", "1"), ("2 - a.mp3", "2")):
+        assert os.stat(album_directory / file_name).st_nlink == 1
+        assert mutagen.File(album_directory / file_name, easy=True)["tracknumber"] == [track_number]
+
+
+def test_failed_tagging_is_not_recorded_as_applied(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    make_mp3(tmp_path / "library" / "a.mp3")
+    # The track file of b is not an audio file, it can not be tagged.
+    config = make_config(write_playlist(["a", "b"]), incremental=True, set_file_metadata=True)
+    exporter: PlaylistToAlbumExporter = export(config)
+    assert exporter.get_stats().file_media_metadata_errors == 1
+
+    entries: list[AlbumManifestEntry] = AlbumManifest(config.output_directory).load()
+    assert entries[0].tags
+    assert not entries[1].tags
+    assert plan(config) == {
+        "a.mp3": ("keep", "1 - a.mp3"),
+        "b.mp3": ("rename", "2 - b.mp3")
+    }
@@ -0,0 +1,36 @@
+""" Tests of the asyncio export engine. """
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from async_playlist_to_album_exporter import AsyncPlaylistToAlbumExporter
+
+
+@pytest.mark.parametrize("copy_strategy", ["copy", "auto"])
+def test_tracks_are_exported_in_order(write_playlist: Callable, make_config: Callable, copy_strategy: str):
+    track_names: list[str] = [f"track {track_number}" for track_number in range(12)]
+    config = make_config(write_playlist(track_names), engine="async", concurrency=4, copy_strategy=copy_strategy)
+    exporter = AsyncPlaylistToAlbumExporter(config)
+
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+
+    album_directory = Path(config.output_directory)
+    for track_number, track_name in enumerate(track_names, start=1):
+        exported_file_path: Path = album_directory / f"{track_number:02d} - {track_name}.mp3"
+        assert exported_file_path.read_bytes() == track_name.encode("utf-8") * 1024
+    assert not list(album_directory.glob("*.part"))
+    assert exporter.get_stats().exported_tracks == len(track_names)
+
+
+def test_missing_track_is_skipped(write_playlist: Callable, make_config: Callable):
+    playlist_file_path: Path = write_playlist(["a", "b"])
+    (playlist_file_path.parent / "a.mp3").unlink()
+    exporter = AsyncPlaylistToAlbumExporter(make_config(playlist_file_path, engine="async"))
+
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+    assert exporter.get_stats().file_not_found_tracks == 1
+    assert exporter.get_stats().exported_tracks == 1
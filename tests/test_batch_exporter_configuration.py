@@ -0,0 +1,44 @@
+""" Tests of the batch configuration: album defaults, the album list and the playlist directory. """
+
+from pathlib import Path
+
+from batch_exporter_configuration import BatchExporterConfiguration
+
+
+def test_albums_and_playlist_directory_are_loaded_with_the_defaults(tmp_path: Path):
+    for playlist_name in ("Rock", "Jazz"):
+        (tmp_path / f"{playlist_name}.m3u8").write_text("#EXTM3U\n", encoding="utf-8")
+    batch_yaml_file_path: Path = tmp_path / "batch.yaml"
+    batch_yaml_file_path.write_text(f"""
+output_directory: {tmp_path / "albums"}
+workers: 4
+stats_json: {tmp_path / "stats.json"}
+playlist_directory: {tmp_path}
+albums:
+  - playlist_file_path: {tmp_path / "Rock.m3u8"}
+    album_name: Best of Rock
+    output_directory: {tmp_path / "best"}
+    workers: 2
+""", encoding="utf-8")
+    batch_config = BatchExporterConfiguration()
+
+    batch_config.load_yaml(batch_yaml_file_path)
+
+    assert batch_config.is_loaded()
+    assert batch_config.get_stats_json() == str(tmp_path / "stats.json")
+    assert [(album_config.album_name, album_config.output_directory, album_config.engine.workers)
+            for album_config in batch_config.get_album_configurations()] == [
+        ("Best of Rock", str(tmp_path / "best"), 2),
+        ("Jazz", str(tmp_path / "albums" / "Jazz"), 4),
+        ("Rock", str(tmp_path / "albums" / "Rock"), 4)
+    ]
+
+
+def test_invalid_yaml_is_not_loaded(tmp_path: Path):
+    batch_yaml_file_path: Path = tmp_path / "batch.yaml"
+    batch_yaml_file_path.write_text("albums: [", encoding="utf-8")
+    batch_config = BatchExporterConfiguration()
+
+    batch_config.load_yaml(batch_yaml_file_path)
+
+    assert not batch_config.is_loaded()
@@ -0,0 +1,56 @@
+""" Tests of the batch export: the albums share the services of the run, and pick their own exporter. """
+
+from collections.abc import Callable
+from pathlib import Path
+
+from batch_playlist_exporter import BatchPlaylistExporter
+
+
+def make_album_config(tmp_path: Path, write_playlist: Callable, make_config: Callable, album_name: str, track_names: list[str],
+                      **values):
+    """ Write the playlist of an album into its own playlist file, and make its configuration. """
+
+    playlist_file_path: Path = write_playlist(track_names).rename(tmp_path / "library" / f"{album_name}.m3u8")
+
+    return make_config(playlist_file_path, album_name=album_name, output_directory=str(tmp_path / album_name), **values)
+
+
+def test_track_in_many_albums_is_read_from_its_first_export(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    album_configs: list = [
+        make_album_config(tmp_path, write_playlist, make_config, "First", ["a", "b"]),
+        make_album_config(tmp_path, write_playlist, make_config, "Second", ["b", "c"])
+    ]
+    batch_exporter = BatchPlaylistExporter(album_configs)
+
+    assert batch_exporter.export_albums()
+
+    assert (tmp_path / "Second" / "1 - b.mp3").read_bytes() == b"b" * 1024
+    assert batch_exporter.get_total_stats().exported_tracks == 4
+    assert batch_exporter.get_total_stats().dedup_hits == 1
+
+
+def test_albums_are_exported_with_their_engine(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    album_configs: list = [
+        make_album_config(tmp_path, write_playlist, make_config, "Sync", ["a", "b"]),
+        make_album_config(tmp_path, write_playlist, make_config, "Async", ["a", "b"], engine="async", concurrency=2)
+    ]
+    batch_exporter = BatchPlaylistExporter(album_configs)
+
+    assert batch_exporter.export_albums()
+
+    for album_name in ("Sync", "Async"):
+        assert sorted(path.name for path in (tmp_path / album_name).glob("*.mp3")) == ["1 - a.mp3", "2 - b.mp3"]
+    assert batch_exporter.get_stats_dict()["total"]["exported_tracks"] == 4
+
+
+def test_archive_album_is_planned_as_archive_members(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    album_config = make_album_config(tmp_path, write_playlist, make_config, "Archive", ["a", "b"], incremental=True)
+    album_config.output_directory = str(tmp_path / "Archive.zip")
+
+    export_plans: list = BatchPlaylistExporter([album_config]).plan_albums()
+
+    assert [(action.action, action.file_name) for action in export_plans[0].get_actions()] == [
+        ("copy", "1 - a.mp3"),
+        ("copy", "2 - b.mp3")
+    ]
+    assert not (tmp_path / "Archive.zip").exists()
@@ -0,0 +1,86 @@
+""" Tests of the copy cache: the least recently used eviction, the pinned files and the saved index. """
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from copy_cache import CopyCache
+
+
+@pytest.fixture(name="source_files")
+def source_files_fixture(tmp_path: Path) -> list[Path]:
+    """ Three source files of 1000 bytes each. """
+
+    source_files: list[Path] = []
+    for name in ("a", "b", "c"):
+        source_file_path: Path = tmp_path / f"{name}.mp3"
+        source_file_path.write_bytes(name.encode("utf-8") * 1000)
+        source_files.append(source_file_path)
+
+    return source_files
+
+
+def add(copy_cache: CopyCache, source_file_path: Path) -> str|None:
+    """ Copy a source file into the cache. """
+
+    return copy_cache.add(source_file_path, source_file_path.stat().st_size, os.path.getmtime(source_file_path))
+
+
+def get_cached_file(copy_cache: CopyCache, source_file_path: Path) -> str|None:
+    """ Get the cached copy of a source file, pinned. """
+
+    return copy_cache.get_cached_file(source_file_path, source_file_path.stat().st_size, os.path.getmtime(source_file_path))
+
+
+@pytest.mark.parametrize("digest", ["none", "blake2b"])
+def test_least_recently_used_file_is_evicted(tmp_path: Path, source_files: list[Path], digest: str):
+    a, b, c = source_files
+    copy_cache = CopyCache(tmp_path / "cache", 2500, digest)
+    add(copy_cache, a)
+    add(copy_cache, b)
+    copy_cache.release_cached_file(get_cached_file(copy_cache, a))
+
+    add(copy_cache, c)
+
+    assert get_cached_file(copy_cache, b) is None
+    assert Path(get_cached_file(copy_cache, a)).read_bytes() == a.read_bytes()
+    assert Path(get_cached_file(copy_cache, c)).read_bytes() == c.read_bytes()
+
+
+def test_pinned_file_is_not_evicted_until_released(tmp_path: Path, source_files: list[Path]):
+    a, b, c = source_files
+    copy_cache = CopyCache(tmp_path / "cache", 1500)
+    add(copy_cache, a)
+    pinned_file_path: str = get_cached_file(copy_cache, a)
+
+    add(copy_cache, b)
+    assert Path(pinned_file_path).read_bytes() == a.read_bytes()
+
+    copy_cache.release_cached_file(pinned_file_path)
+    add(copy_cache, c)
+    assert not Path(pinned_file_path).exists()
+    assert get_cached_file(copy_cache, a) is None
+
+
+def test_saved_index_is_read_by_the_next_run(tmp_path: Path, source_files: list[Path]):
+    a = source_files[0]
+    copy_cache = CopyCache(tmp_path / "cache", 10_000)
+    add(copy_cache, a)
+    copy_cache.save()
+
+    assert Path(get_cached_file(CopyCache(tmp_path / "cache", 10_000), a)).read_bytes() == a.read_bytes()
+
+
+def test_index_of_another_version_starts_an_empty_cache(tmp_path: Path, source_files: list[Path]):
+    a = source_files[0]
+    copy_cache = CopyCache(tmp_path / "cache", 10_000)
+    add(copy_cache, a)
+    copy_cache.save()
+    index_file_path: Path = tmp_path / "cache" / CopyCache.INDEX_FILE_NAME
+    index: dict = json.loads(index_file_path.read_text(encoding="utf-8"))
+    index["version"] = CopyCache.INDEX_VERSION + 1
+    index_file_path.write_text(json.dumps(index), encoding="utf-8")
+
+    assert get_cached_file(CopyCache(tmp_path / "cache", 10_000), a) is None
@@ -0,0 +1,68 @@
+""" Tests of the directory index: the existence and stat answers from one listing per directory. """
+
+import os
+from pathlib import Path
+
+import pytest
+
+from directory_index import DirectoryIndex
+from playlist_parser import PlaylistParser
+
+
+@pytest.fixture(name="scanned_directories")
+def scanned_directories_fixture(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """ The directories listed with os.scandir, in listing order. """
+
+    scanned_directories: list[str] = []
+    scandir = os.scandir
+
+    def recorded_scandir(directory_path: str):
+        scanned_directories.append(directory_path)
+        return scandir(directory_path)
+
+    monkeypatch.setattr(os, "scandir", recorded_scandir)
+
+    return scanned_directories
+
+
+def test_directory_is_listed_once(tmp_path: Path, scanned_directories: list[str]):
+    (tmp_path / "a.mp3").write_bytes(b"track")
+    (tmp_path / "folder.mp3").mkdir()
+    directory_index = DirectoryIndex()
+
+    assert directory_index.is_file(tmp_path / "a.mp3")
+    assert not directory_index.is_file(tmp_path / "folder.mp3")
+    assert not directory_index.is_file(tmp_path / "missing.mp3")
+    assert directory_index.stat(tmp_path / "a.mp3").st_size == len(b"track")
+    assert directory_index.stat(tmp_path / "missing.mp3") is None
+    assert not directory_index.is_file(tmp_path / "missing folder" / "a.mp3")
+    assert scanned_directories == [str(tmp_path), str(tmp_path / "missing folder")]
+
+
+def test_cleared_index_lists_the_directory_again(tmp_path: Path, scanned_directories: list[str]):
+    directory_index = DirectoryIndex()
+    assert not directory_index.is_file(tmp_path / "a.mp3")
+    (tmp_path / "a.mp3").write_bytes(b"track")
+
+    assert not directory_index.is_file(tmp_path / "a.mp3")
+    directory_index.clear()
+    assert directory_index.is_file(tmp_path / "a.mp3")
+    assert len(scanned_directories) == 2
+
+
+def test_playlist_paths_are_repaired_from_the_index(tmp_path: Path, scanned_directories: list[str]):
+    for track_name in ("a", "b"):
+        (tmp_path / f"{track_name}.mp3").write_bytes(b"track")
+    playlist_file_path: Path = tmp_path / "playlist.m3u8"
+    playlist_file_path.write_text("#EXTM3U\n#EXTINF:60,a\na.mp3\n#EXTINF:60,b\nb.mp3\n#EXTINF:60,c\nc.mp3\n",
+                                  encoding="utf-8")
+    parser = PlaylistParser(playlist_file_path)
+
+    assert parser.parse_playlist()
+    assert [(track.file_name, track.file_size) for track in parser.get_tracks()] == [
+        ("a.mp3", len(b"track")),
+        ("b.mp3", len(b"track")),
+        ("c.mp3", None)
+    ]
+    assert (parser.get_stats().repaired_uris, parser.get_stats().skipped_tracks) == (2, 1)
+    assert scanned_directories.count(str(tmp_path)) == 1
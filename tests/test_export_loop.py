@@ -0,0 +1,62 @@
+""" Tests of the per-track work of the export loop: the output file names, the track log and the concurrent workers. """
+
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+import mutagen
+import pytest
+
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from synthetic_library import make_mp3
+
+
+def export(config) -> PlaylistToAlbumExporter:
+    """ Parse the playlist and export the album. """
+
+    exporter = PlaylistToAlbumExporter(config)
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+
+    return exporter
+
+
+def test_track_numbers_are_padded_to_the_track_count(write_playlist: Callable, make_config: Callable):
+    track_names: list[str] = [f"track {track_number}" for track_number in range(1, 11)]
+    config = make_config(write_playlist(track_names))
+    export(config)
+
+    file_names: list[str] = sorted(path.name for path in Path(config.output_directory).glob("*.mp3"))
+    assert file_names[0] == "01 - track 1.mp3"
+    assert file_names[-1] == "10 - track 10.mp3"
+
+
+def test_numeric_prefix_of_the_source_file_is_replaced(write_playlist: Callable, make_config: Callable):
+    config = make_config(write_playlist(["07 - a", "b"]))
+    export(config)
+
+    assert sorted(path.name for path in Path(config.output_directory).glob("*.mp3")) == ["1 - a.mp3", "2 - b.mp3"]
+
+
+def test_track_log_holds_the_track_and_its_duration(write_playlist: Callable,
+                                                    make_config: Callable,
+                                                    caplog: pytest.LogCaptureFixture):
+    config = make_config(write_playlist(["a"]))
+    with caplog.at_level(logging.INFO, logger="PlaylistToAlbumExporter"):
+        export(config)
+
+    assert "Exporting track 1/1: Artist - a | 60.0 s" in caplog.messages
+    assert not any("timings" in message for message in caplog.messages)
+
+
+def test_workers_export_and_tag_every_track(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    track_names: list[str] = [f"track {track_number}" for track_number in range(1, 9)]
+    for track_name in track_names:
+        make_mp3(tmp_path / "library" / f"{track_name}.mp3")
+    config = make_config(write_playlist(track_names), workers=4, set_file_metadata=True)
+    exporter: PlaylistToAlbumExporter = export(config)
+
+    assert exporter.get_stats().exported_tracks == len(track_names)
+    for track_number, track_name in enumerate(track_names, start=1):
+        tags = mutagen.File(Path(config.output_directory) / f"{track_number} - {track_name}.mp3", easy=True)
+        assert (tags["album"], tags["tracknumber"]) == (["Album"], [str(track_number)])
@@ -0,0 +1,41 @@
+""" Tests of the export plan: the planned actions, and the dry run that touches no data. """
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from export_plan import ExportPlan, ExportPlanAction
+from run_cli import run_plan
+
+
+def test_plan_counts_copied_bytes_and_collisions():
+    export_plan = ExportPlan("Album", "/album")
+    export_plan.add_action(ExportPlanAction(1, "copy", "/music/a.mp3", "a.mp3", 10, True))
+    export_plan.add_action(ExportPlanAction(2, "keep", "/music/b.mp3", "a.mp3", 20, False))
+    export_plan.add_action(ExportPlanAction(3, "missing", "/music/c.mp3", None, None, False))
+
+    assert export_plan.get_total_bytes() == 10
+    assert export_plan.get_action_counts() == {"copy": 1, "keep": 1, "missing": 1}
+    assert export_plan.get_collisions() == {"a.mp3": [1, 2]}
+
+
+def test_plan_run_prints_the_plan_and_creates_no_folder(tmp_path: Path,
+                                                        write_playlist: Callable,
+                                                        make_config: Callable,
+                                                        capsys: pytest.CaptureFixture):
+    playlist_file_path: Path = write_playlist(["a", "b", "c"])
+    (tmp_path / "library" / "b.mp3").unlink()
+    config = make_config(playlist_file_path, output_directory=str(tmp_path / "output" / "album"))
+
+    assert run_plan(config, "json") == 0
+
+    plan: dict = json.loads(capsys.readouterr().out)
+    assert [(action["action"], action["file_name"]) for action in plan["actions"]] == [
+        ("copy", "1 - a.mp3"),
+        ("missing", None),
+        ("copy", "3 - c.mp3")
+    ]
+    assert plan["total_bytes"] == 2048
+    assert not (tmp_path / "output").exists()
@@ -0,0 +1,96 @@
+""" Tests of the file tagging: the single save of the batched tag changes, and the tag block rendering of the
+tag-while-copying mode, the header spliced in front of the source payload.
+"""
+
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+import mutagen
+import pytest
+
+from file_metadata_setter import FileMetadataSetter
+from synthetic_library import make_mp3, make_flac
+
+
+def test_tag_changes_are_saved_at_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    make_mp3(tmp_path / "track.mp3")
+    metadata_setter = FileMetadataSetter(tmp_path / "track.mp3")
+    saves: list[tuple] = []
+    save: Callable = metadata_setter._track_file.save
+
+    def counted_save(*args):
+        saves.append(args)
+        save(*args)
+
+    monkeypatch.setattr(metadata_setter._track_file, "save", counted_save)
+
+    metadata_setter.apply({"album": "Album", "tracknumber": "3", "artist": "Artist"})
+
+    tags = mutagen.File(tmp_path / "track.mp3", easy=True)
+    assert (tags["album"], tags["tracknumber"], tags["artist"]) == (["Album"], ["3"], ["Artist"])
+    assert len(saves) == 1
+
+
+def test_tag_change_within_the_padding_rewrites_only_the_tag_block(tmp_path: Path):
+    make_mp3(tmp_path / "track.mp3")
+    FileMetadataSetter(tmp_path / "track.mp3").apply({"album": "Album"})
+    file_size: int = (tmp_path / "track.mp3").stat().st_size
+
+    rewritten_bytes: int = FileMetadataSetter(tmp_path / "track.mp3").apply({"tracknumber": "3"})
+
+    assert (tmp_path / "track.mp3").stat().st_size == file_size
+    assert rewritten_bytes < file_size
+
+
+def splice(source_file_path: Path, output_file_path: Path) -> int:
+    """ Write the rendered header of the source file followed by its untouched payload. Returns the payload offset. """
+
+    with open(source_file_path, "rb") as source_file:
+        header, payload_offset = FileMetadataSetter.render_tagged_header(source_file, source_file_path.suffix,
+                                                                         {"album": "Album", "tracknumber": "3"})
+        source_file.seek(payload_offset)
+        output_file_path.write_bytes(header + source_file.read())
+
+    return payload_offset
+
+
+@pytest.mark.parametrize("file_name, make_file", [
+    ("track.mp3", make_mp3),
+    ("track.mp3", partial(make_mp3, with_id3=False)),
+    ("track.flac", make_flac)
+])
+def test_spliced_file_has_the_metadata_and_the_source_payload(tmp_path: Path, file_name: str, make_file: Callable):
+    source_file_path: Path = tmp_path / file_name
+    make_file(source_file_path)
+    output_file_path: Path = tmp_path / f"output {file_name}"
+
+    payload_offset: int = splice(source_file_path, output_file_path)
+
+    tags = mutagen.File(output_file_path, easy=True)
+    assert (tags["album"], tags["tracknumber"]) == (["Album"], ["3"])
+    assert output_file_path.read_bytes().endswith(source_file_path.read_bytes()[payload_offset:])
+
+
+def test_spliced_mp3_keeps_the_source_tags(tmp_path: Path):
+    make_mp3(tmp_path / "track.mp3")
+
+    splice(tmp_path / "track.mp3", tmp_path / "output.mp3")
+
+    assert mutagen.File(tmp_path / "output.mp3", easy=True)["title"] == ["track.mp3"]
+
+
+def test_mp3_with_an_id3v1_tag_is_not_spliced(tmp_path: Path):
+    make_mp3(tmp_path / "track.mp3")
+    with open(tmp_path / "track.mp3", "ab") as track_file:
+        track_file.write(b"TAG" + b"\x00" * 125)
+
+    with open(tmp_path / "track.mp3", "rb") as source_file:
+        assert FileMetadataSetter.render_tagged_header(source_file, ".mp3", {"album": "Album"}) is None
+
+
+def test_format_without_a_header_renderer_is_not_spliced(tmp_path: Path):
+    (tmp_path / "track.wma").write_bytes(b"wma")
+
+    with open(tmp_path / "track.wma", "rb") as source_file:
+        assert FileMetadataSetter.render_tagged_header(source_file, ".wma", {"album": "Album"}) is None
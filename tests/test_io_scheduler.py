@@ -0,0 +1,116 @@
+""" Tests of the admission order of the I/O scheduler. """
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import io_scheduler
+from io_scheduler import IoScheduler
+
+
+def wait_for_waiting_copies(scheduler: IoScheduler, count: int):
+    """ Wait until the given number of copies wait for their admission. """
+
+    deadline: float = time.monotonic() + 5
+    # Reason: The scheduler has no public view of its queue, the test waits for the copies to be queued in order.
+    # pylint: disable-next=protected-access
+    while len(scheduler._waiting_requests) < count:
+        assert time.monotonic() < deadline, "copies did not start waiting"
+        time.sleep(0.001)
+
+
+def wait_for_running_copy(scheduler: IoScheduler):
+    """ Wait until a copy is admitted. """
+
+    deadline: float = time.monotonic() + 5
+    # pylint: disable-next=protected-access
+    while scheduler._bytes_in_flight == 0:
+        assert time.monotonic() < deadline, "copy was not admitted"
+        time.sleep(0.001)
+
+
+def admit_in_order(scheduler: IoScheduler, source_file_path: Path, sizes: list[int]) -> list[int]:
+    """ Queue copies of the given sizes one after another behind a running copy, then let them run.
+    Returns the sizes in the order the copies were admitted.
+    """
+
+    admitted_sizes: list[int] = []
+    running_copy_released = threading.Event()
+
+    def copy(size: int):
+        with scheduler.reserve(source_file_path, size):
+            admitted_sizes.append(size)
+
+    def running_copy():
+        with scheduler.reserve(source_file_path, 1):
+            running_copy_released.wait()
+
+    threads: list[threading.Thread] = [threading.Thread(target=running_copy)]
+    threads[0].start()
+    wait_for_running_copy(scheduler)
+    for waiting_copies, size in enumerate(sizes, start=1):
+        thread = threading.Thread(target=copy, args=(size,))
+        thread.start()
+        threads.append(thread)
+        wait_for_waiting_copies(scheduler, waiting_copies)
+
+    running_copy_released.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    return admitted_sizes
+
+
+@pytest.fixture(name="source_file_path")
+def source_file_path_fixture(tmp_path: Path) -> Path:
+    """ A source file, every copy of a test reads from its device. """
+
+    source_file_path: Path = tmp_path / "source.mp3"
+    source_file_path.write_bytes(b"\0")
+
+    return source_file_path
+
+
+def test_waiting_copies_are_admitted_smallest_first(source_file_path: Path):
+    scheduler = IoScheduler(per_device_concurrency=1)
+
+    assert admit_in_order(scheduler, source_file_path, [50, 10, 30, 20]) == [10, 20, 30, 50]
+
+
+def test_copy_passed_over_too_many_times_is_admitted_next(source_file_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(io_scheduler, "MAX_ADMISSION_SKIPS", 2)
+    scheduler = IoScheduler(per_device_concurrency=1)
+
+    assert admit_in_order(scheduler, source_file_path, [100, 1, 2, 3]) == [1, 2, 100, 3]
+
+
+def test_copies_are_admitted_within_bytes_in_flight(source_file_path: Path):
+    scheduler = IoScheduler(max_bytes_in_flight=100)
+    with scheduler.reserve(source_file_path, 60):
+        admitted = threading.Event()
+
+        def copy():
+            with scheduler.reserve(source_file_path, 50):
+                admitted.set()
+
+        thread = threading.Thread(target=copy)
+        thread.start()
+        assert not admitted.wait(0.1)
+
+    assert admitted.wait(5)
+    thread.join(timeout=5)
+
+
+def test_file_larger_than_bytes_in_flight_is_copied_alone(source_file_path: Path):
+    scheduler = IoScheduler(max_bytes_in_flight=100)
+    with scheduler.reserve(source_file_path, 500):
+        # pylint: disable-next=protected-access
+        assert scheduler._bytes_in_flight == 500
+
+
+def test_disabled_scheduler_does_not_wait(source_file_path: Path):
+    scheduler = IoScheduler()
+    with scheduler.reserve(source_file_path, 10), scheduler.reserve(source_file_path, 10):
+        assert not scheduler.is_enabled()
@@ -0,0 +1,35 @@
+""" Tests of the quick configuration check against the Cerberus style schema. """
+
+from utility.is_valid_by_schema import is_valid_by_schema
+
+SCHEMA: dict[str, dict] = {
+    'name': {'type': 'string', 'required': True},
+    'enabled': {'type': 'boolean', 'nullable': True},
+    'count': {'type': 'integer', 'min': 1},
+    'ratio': {'type': 'number'},
+    'mode': {'type': 'string', 'allowed': ['a', 'b']}
+}
+
+
+def test_valid_document():
+    assert is_valid_by_schema({'name': "x", 'enabled': None, 'count': 2, 'ratio': 0.5, 'mode': "a"}, SCHEMA)
+
+
+def test_missing_required_field_and_unknown_field_are_invalid():
+    assert not is_valid_by_schema({'count': 2}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'other': 1}, SCHEMA)
+
+
+def test_bool_is_only_a_boolean():
+    assert is_valid_by_schema({'name': "x", 'enabled': True}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'count': True}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'ratio': False}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'enabled': 1}, SCHEMA)
+
+
+def test_rules_are_checked():
+    assert is_valid_by_schema({'name': "x", 'ratio': 1}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'count': 0}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x", 'mode': "c"}, SCHEMA)
+    assert not is_valid_by_schema({'name': None}, SCHEMA)
+    assert not is_valid_by_schema({'name': "x"}, {'name': {'type': 'string', 'regex': "x"}})
@@ -0,0 +1,98 @@
+""" Tests of the library index: the moved and renamed tracks it resolves, and its incremental updates. """
+
+from collections.abc import Iterator
+from pathlib import Path
+from urllib.parse import quote
+
+import mutagen
+import pytest
+
+from library_index import LibraryIndex
+from playlist_parser import PlaylistParser
+from synthetic_library import make_mp3
+
+# The duration of the synthetic .mp3 files in seconds.
+TRACK_DURATION: float = 1.0
+
+
+def make_tagged_mp3(file_path: Path, artist: str, title: str):
+    """ Write an .mp3 file with an artist and a title tag, its folder is created if missing. """
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    make_mp3(file_path)
+    tags = mutagen.File(file_path, easy=True)
+    tags["artist"], tags["title"] = artist, title
+    tags.save()
+
+
+@pytest.fixture(name="library_index")
+def library_index_fixture(tmp_path: Path) -> Iterator[LibraryIndex]:
+    """ An open index of the test folder's library folder, with a moved and a renamed track in it. """
+
+    make_tagged_mp3(tmp_path / "library" / "moved" / "a.mp3", "Artist", "A")
+    make_tagged_mp3(tmp_path / "library" / "b renamed.mp3", "Artist", "B")
+    library_index = LibraryIndex(tmp_path / "library")
+    library_index.open()
+    library_index.update()
+
+    yield library_index
+
+    library_index.close()
+
+
+def test_moved_track_is_resolved_by_its_name(tmp_path: Path, library_index: LibraryIndex):
+    assert library_index.resolve(tmp_path / "library" / "a.mp3", "Other title", TRACK_DURATION) \
+        == str(tmp_path / "library" / "moved" / "a.mp3")
+
+
+def test_renamed_track_is_resolved_by_its_artist_and_title(tmp_path: Path, library_index: LibraryIndex):
+    assert library_index.resolve(tmp_path / "library" / "b.mp3", " artist -  b ", TRACK_DURATION) \
+        == str(tmp_path / "library" / "b renamed.mp3")
+
+
+def test_track_of_another_duration_is_not_resolved(tmp_path: Path, library_index: LibraryIndex):
+    assert library_index.resolve(tmp_path / "library" / "a.mp3", "Other title", TRACK_DURATION + 60) is None
+    assert library_index.resolve(tmp_path / "library" / "b.mp3", "Artist - B", TRACK_DURATION + 60) is None
+
+
+def test_only_changed_folders_are_listed_again(tmp_path: Path, library_index: LibraryIndex):
+    assert library_index.update() == 0
+
+    make_tagged_mp3(tmp_path / "library" / "moved" / "c.mp3", "Artist", "C")
+    assert library_index.update() == 1
+    assert library_index.resolve(tmp_path / "c.mp3", None, None) == str(tmp_path / "library" / "moved" / "c.mp3")
+
+    (tmp_path / "library" / "moved" / "c.mp3").unlink()
+    assert library_index.update() == 1
+    assert library_index.resolve(tmp_path / "c.mp3", None, None) is None
+
+
+def test_index_is_kept_between_runs(tmp_path: Path, library_index: LibraryIndex):
+    library_index.close()
+    reopened_library_index = LibraryIndex(tmp_path / "library")
+    reopened_library_index.open()
+
+    assert reopened_library_index.update() == 0
+    assert reopened_library_index.resolve(tmp_path / "a.mp3", None, None) == str(tmp_path / "library" / "moved" / "a.mp3")
+    reopened_library_index.close()
+
+
+def test_playlist_tracks_are_resolved_from_the_index(tmp_path: Path, library_index: LibraryIndex):
+    playlist_file_path: Path = tmp_path / "library" / "playlist.m3u8"
+    playlist_file_path.write_text("\n".join([
+        "#EXTM3U",
+        "#EXTINF:1,Artist - A",
+        "file:///" + quote(str(tmp_path / "library" / "a.mp3")),
+        "#EXTINF:1,Artist - B",
+        "b.mp3",
+        "#EXTINF:1,Artist - Missing",
+        "missing.mp3"
+    ]) + "\n", encoding="utf-8")
+    parser = PlaylistParser(playlist_file_path, library_index=library_index)
+
+    assert parser.parse_playlist()
+    assert [track.abs_file_path for track in parser.get_tracks()][:2] == [
+        str(tmp_path / "library" / "moved" / "a.mp3"),
+        str(tmp_path / "library" / "b renamed.mp3")
+    ]
+    assert (parser.get_stats().library_index_hits, parser.get_stats().library_index_misses) == (2, 1)
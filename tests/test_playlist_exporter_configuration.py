@@ -0,0 +1,53 @@
+""" Tests of the configuration loading: the settings records, that group the flat configuration keys. """
+
+from playlist_exporter_configuration import PlaylistExporterConfiguration, CopySettings, EngineSettings, CopyCacheSettings, \
+    TaggingSettings, IoSettings, LibrarySettings, ProbeSettings, TranscodeSettings
+
+
+def load(values: dict) -> PlaylistExporterConfiguration:
+    """ Load a configuration of a playlist from a dict of other configuration values. """
+
+    config = PlaylistExporterConfiguration()
+    config.load_dict({"playlist_file_path": "playlist.m3u8", "output_directory": "album"} | values)
+
+    return config
+
+
+def test_unset_settings_keep_their_defaults():
+    config: PlaylistExporterConfiguration = load({"copy_buffer_size": None, "copy_cache_directory": "", "transcode": "none"})
+
+    assert config.is_loaded()
+    assert config.copy == CopySettings()
+    assert config.engine == EngineSettings()
+    assert config.copy_cache == CopyCacheSettings()
+    assert config.tagging == TaggingSettings()
+    assert config.io == IoSettings()
+    assert config.library == LibrarySettings()
+    assert config.probe == ProbeSettings()
+    assert config.transcode == TranscodeSettings()
+
+
+def test_settings_are_grouped_from_their_keys():
+    config: PlaylistExporterConfiguration = load({"copy_strategy": "chunked",
+                                                  "copy_buffer_size": 8192,
+                                                  "engine": "async",
+                                                  "concurrency": 8,
+                                                  "copy_cache_directory": "cache",
+                                                  "copy_cache_digest": "blake2b",
+                                                  "tagging_processes": 0,
+                                                  "tagging_batch_size": 4,
+                                                  "io_bandwidth_limit": 12.5,
+                                                  "io_per_device_concurrency": 2,
+                                                  "library_root": "library",
+                                                  "probe_workers": 2,
+                                                  "transcode": "opus",
+                                                  "transcode_bitrate": 96})
+
+    assert config.copy == CopySettings("chunked", 8192)
+    assert config.engine == EngineSettings("async", concurrency=8)
+    assert config.copy_cache == CopyCacheSettings("cache", digest="blake2b")
+    assert config.tagging == TaggingSettings(0, 4)
+    assert config.io == IoSettings(12.5, per_device_concurrency=2)
+    assert config.library == LibrarySettings("library")
+    assert config.probe == ProbeSettings(2)
+    assert config.transcode == TranscodeSettings("opus", 96)
@@ -0,0 +1,45 @@
+""" Tests of the playlist parser: the backends parse the same tracks. """
+
+from pathlib import Path
+
+from playlist_parser import PlaylistParser
+
+
+def parse(playlist_file_path: Path, parser_backend: str) -> PlaylistParser:
+    """ Parse the playlist with a parser backend. """
+
+    parser = PlaylistParser(playlist_file_path, parser_backend)
+    assert parser.parse_playlist()
+
+    return parser
+
+
+def test_stream_backend_parses_like_the_m3u8_backend(tmp_path: Path):
+    for file_name in ("a.mp3", "b, c.mp3"):
+        (tmp_path / file_name).write_bytes(b"track")
+    playlist_file_path: Path = tmp_path / "playlist.m3u8"
+    playlist_file_path.write_text("\n".join([
+        "#EXTM3U",
+        "#EXTINF:60,Artist - a",
+        f"file:///{tmp_path / 'a.mp3'}",
+        "",
+        "# Comment",
+        "#EXTINF:61.5,Artist - b, c",
+        "#EXTVLCOPT:network-caching=1000",
+        "b, c.mp3",
+        "#EXTINF:62,Missing",
+        "missing.mp3",
+        "#EXTINF:63,Trailing segment without uri"
+    ]) + "\n", encoding="utf-8-sig", newline="\r\n")
+
+    stream_parser: PlaylistParser = parse(playlist_file_path, "stream")
+    m3u8_parser: PlaylistParser = parse(playlist_file_path, "m3u8")
+
+    assert [(track.file_name, track.title, track.duration) for track in stream_parser.get_tracks()] == [
+        ("a.mp3", "Artist - a", 60.0),
+        ("b, c.mp3", "Artist - b, c", 61.5),
+        ("missing.mp3", "Missing", 62.0)
+    ]
+    assert list(stream_parser.get_tracks()) == list(m3u8_parser.get_tracks())
+    assert str(stream_parser.get_stats()) == str(m3u8_parser.get_stats())
+    assert stream_parser.count_segments() == m3u8_parser.count_segments() == 3
@@ -0,0 +1,38 @@
+""" Tests of the watch mode exporter: the incremental exports of the playlist changes. """
+
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from album_manifest import AlbumManifest
+from playlist_watch_exporter import PlaylistWatchExporter
+
+
+def test_watch_mode_exports_incrementally_without_changing_the_configuration(write_playlist: Callable,
+                                                                             make_config: Callable,
+                                                                             caplog: pytest.LogCaptureFixture):
+    config = make_config(write_playlist(["a", "b"]))
+    caplog.set_level(logging.INFO, "PlaylistWatchExporter")
+    watch_exporter = PlaylistWatchExporter(config)
+
+    assert watch_exporter.export_changes()
+    watch_exporter.close()
+    assert not config.incremental
+    assert "incremental export is enabled" in caplog.text
+    assert (Path(config.output_directory) / AlbumManifest.MANIFEST_FILE_NAME).is_file()
+
+
+def test_playlist_changes_are_exported(write_playlist: Callable, make_config: Callable):
+    config = make_config(write_playlist(["a", "b"]))
+    watch_exporter = PlaylistWatchExporter(config)
+    assert watch_exporter.export_changes()
+
+    write_playlist(["b", "c"])
+    assert watch_exporter.export_changes()
+    assert watch_exporter.export_changes()
+    watch_exporter.close()
+
+    assert watch_exporter.get_export_count() == 2
+    assert sorted(path.name for path in Path(config.output_directory).glob("*.mp3")) == ["1 - b.mp3", "2 - c.mp3"]
@@ -0,0 +1,105 @@
+""" Tests of the debounce of the playlist watcher, with the polling fallback. """
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from playlist_watcher import PlaylistWatcher
+
+DEBOUNCE_SECONDS: float = 0.3
+POLL_INTERVAL: float = 0.02
+
+
+class ChangeRecorder:
+    """ Records the times wait_for_change reports a change, on a thread, until the watcher is stopped. """
+
+    change_times: list[float] = None
+    _watcher: PlaylistWatcher = None
+    _thread: threading.Thread = None
+
+    def __init__(self, watcher: PlaylistWatcher):
+        self.change_times = []
+        self._watcher = watcher
+        self._thread = threading.Thread(target=self._record_changes)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the watcher and wait for the thread. """
+
+        self._watcher.stop()
+        self._thread.join(timeout=5)
+        assert not self._thread.is_alive()
+
+    def _record_changes(self):
+        while self._watcher.wait_for_change():
+            self.change_times.append(time.monotonic())
+
+
+@pytest.fixture(name="playlist_file_path")
+def playlist_file_path_fixture(tmp_path: Path) -> Path:
+    """ A saved playlist file to watch. """
+
+    playlist_file_path: Path = tmp_path / "playlist.m3u8"
+    playlist_file_path.write_text("#EXTM3U\n", encoding="utf-8")
+
+    return playlist_file_path
+
+
+@pytest.fixture(name="watcher")
+def watcher_fixture(playlist_file_path: Path) -> PlaylistWatcher:
+    """ A watcher of the playlist file, that polls it. """
+
+    with PlaylistWatcher(playlist_file_path, DEBOUNCE_SECONDS, POLL_INTERVAL, use_inotify=False) as watcher:
+        yield watcher
+
+
+def save(playlist_file_path: Path, track_count: int):
+    """ Save the playlist with the given number of entries, a new size for every count. """
+
+    playlist_file_path.write_text("#EXTM3U\n" + "track.mp3\n" * track_count, encoding="utf-8")
+
+
+def test_polling_is_used_without_inotify(watcher: PlaylistWatcher):
+    assert not watcher.is_inotify()
+
+
+def test_burst_of_saves_is_one_change(watcher: PlaylistWatcher, playlist_file_path: Path):
+    recorder = ChangeRecorder(watcher)
+    last_save_time: float = 0.0
+    for track_count in range(1, 6):
+        save(playlist_file_path, track_count)
+        last_save_time = time.monotonic()
+        time.sleep(DEBOUNCE_SECONDS / 5)
+    time.sleep(DEBOUNCE_SECONDS * 3)
+    recorder.stop()
+
+    assert len(recorder.change_times) == 1
+    # The change is reported once the file was not changed for the debounce time, with a poll interval of slack.
+    assert recorder.change_times[0] >= last_save_time + DEBOUNCE_SECONDS - POLL_INTERVAL
+
+
+def test_saves_after_the_debounce_time_are_separate_changes(watcher: PlaylistWatcher, playlist_file_path: Path):
+    recorder = ChangeRecorder(watcher)
+    save(playlist_file_path, 1)
+    time.sleep(DEBOUNCE_SECONDS * 3)
+    save(playlist_file_path, 2)
+    time.sleep(DEBOUNCE_SECONDS * 3)
+    recorder.stop()
+
+    assert len(recorder.change_times) == 2
+
+
+def test_unchanged_file_is_not_a_change(watcher: PlaylistWatcher):
+    recorder = ChangeRecorder(watcher)
+    time.sleep(DEBOUNCE_SECONDS * 2)
+    recorder.stop()
+
+    assert not recorder.change_times
+
+
+def test_stopped_watcher_stops_waiting(watcher: PlaylistWatcher):
+    watcher.stop()
+
+    assert not watcher.wait_for_change()
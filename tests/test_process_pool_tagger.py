@@ -0,0 +1,72 @@
+""" Tests of the process pool tagger: results of the tagging processes and failed batches. """
+
+from collections.abc import Callable
+from concurrent import futures
+from pathlib import Path
+
+import mutagen
+import pytest
+
+import process_pool_tagger
+from album_manifest import AlbumManifest, AlbumManifestEntry
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from process_pool_tagger import ProcessPoolTagger, TagResult
+from synthetic_library import make_mp3
+
+
+class ThreadPoolInsteadOfProcessPool(futures.ThreadPoolExecutor):
+    """ Thread pool with the constructor of the process pool, the tagging function can be replaced in its threads. """
+
+    def __init__(self, max_workers: int, mp_context=None):
+        super().__init__(max_workers)
+        self.mp_context = mp_context
+
+
+def test_files_are_tagged_in_the_tagging_processes(tmp_path: Path):
+    make_mp3(tmp_path / "a.mp3")
+    (tmp_path / "b.mp3").write_bytes(b"b" * 1024)
+    results: list[TagResult] = []
+    tagger = ProcessPoolTagger(1, 2, results.append)
+
+    tagger.submit(str(tmp_path / "a.mp3"), {"album": "Album"})
+    tagger.submit(str(tmp_path / "b.mp3"), {"album": "Album"})
+    tagger.close()
+
+    assert [(Path(result.file_path).name, result.error is None) for result in results] == [("a.mp3", True), ("b.mp3", False)]
+    assert mutagen.File(tmp_path / "a.mp3", easy=True)["album"] == ["Album"]
+
+
+def test_every_file_of_a_failed_batch_is_reported_failed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def fail_batch(_):
+        raise RuntimeError("Worker process died")
+
+    monkeypatch.setattr(futures, "ProcessPoolExecutor", ThreadPoolInsteadOfProcessPool)
+    monkeypatch.setattr(process_pool_tagger, "tag_files", fail_batch)
+    results: list[TagResult] = []
+    tagger = ProcessPoolTagger(1, 32, results.append)
+
+    for track_name in ("a", "b", "c"):
+        tagger.submit(str(tmp_path / f"{track_name}.mp3"), {"album": "Album"})
+    tagger.close()
+
+    assert [(Path(result.file_path).name, result.error) for result in results] == [
+        ("a.mp3", "Worker process died"),
+        ("b.mp3", "Worker process died"),
+        ("c.mp3", "Worker process died")
+    ]
+
+
+def test_files_not_tagged_by_the_tagging_processes_are_saved_untagged_in_the_manifest(tmp_path: Path,
+                                                                                      write_playlist: Callable,
+                                                                                      make_config: Callable):
+    make_mp3(tmp_path / "library" / "a.mp3")
+    # The track file of b is not an audio file, it can not be tagged.
+    config = make_config(write_playlist(["a", "b"]), incremental=True, set_file_metadata=True, tagging_processes=1)
+    exporter = PlaylistToAlbumExporter(config)
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+
+    assert exporter.get_stats().file_media_metadata_errors == 1
+    entries: list[AlbumManifestEntry] = AlbumManifest(config.output_directory).load()
+    assert entries[0].tags
+    assert not entries[1].tags
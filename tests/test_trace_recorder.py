@@ -0,0 +1,39 @@
+""" Tests of the run outputs for performance analysis: the trace event file and the profile. """
+
+import cProfile
+import json
+import pstats
+from collections.abc import Callable
+from pathlib import Path
+
+from export_context import ExportContext
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from run_cli import write_profile
+from trace_recorder import TraceRecorder
+
+
+def test_trace_holds_the_track_and_stage_spans_of_an_export(tmp_path: Path, write_playlist: Callable, make_config: Callable):
+    trace_recorder = TraceRecorder()
+    exporter = PlaylistToAlbumExporter(make_config(write_playlist(["a", "b"]), workers=2),
+                                       ExportContext(trace_recorder=trace_recorder))
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+
+    trace_recorder.save(tmp_path / "trace.json")
+
+    trace_events: list[dict] = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    spans: list[dict] = [event for event in trace_events if event["ph"] == "X"]
+    assert len(spans) == trace_recorder.get_span_count()
+    assert sorted(span["args"]["track"] for span in spans if span["name"] == "resolve") == [1, 2]
+    assert sorted(span["args"]["track"] for span in spans if span["name"] == "copy") == [1, 2]
+    assert all(span["dur"] >= 0 and span["ts"] >= 0 for span in spans)
+    assert {event["tid"] for event in trace_events if event["ph"] == "M"} == {span["tid"] for span in spans}
+
+
+def test_profile_is_written_as_pstats_file(tmp_path: Path):
+    profiler = cProfile.Profile()
+    profiler.runcall(sorted, [3, 1, 2])
+
+    write_profile(tmp_path / "run.prof", profiler)
+
+    assert pstats.Stats(str(tmp_path / "run.prof")).total_calls > 0
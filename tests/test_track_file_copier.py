@@ -0,0 +1,171 @@
+""" Tests of the copy strategies of the track file copier: the strategy chain, the fallbacks and the .part files. """
+
+import errno
+import logging
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import track_file_copier
+from track_file_copier import TrackFileCopier
+
+requires_linux = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only copy strategy")
+
+
+@pytest.fixture(name="source_file_path")
+def source_file_path_fixture(tmp_path: Path) -> Path:
+    """ A source track file. """
+
+    source_file_path: Path = tmp_path / "source.mp3"
+    source_file_path.write_bytes(bytes(range(256)) * 64)
+
+    return source_file_path
+
+
+def fail_with(error_number: int):
+    """ Get a copy function, that writes a partial copy and fails with the given error. """
+
+    calls: list[str] = []
+
+    def failing_copy(_, part_file_path: str):
+        calls.append(part_file_path)
+        Path(part_file_path).write_bytes(b"partial")
+        raise OSError(error_number, os.strerror(error_number))
+
+    failing_copy.calls = calls
+
+    return failing_copy
+
+
+def test_auto_never_hardlinks(source_file_path: Path, tmp_path: Path):
+    output_file_path: Path = tmp_path / "output.mp3"
+
+    strategy: str = TrackFileCopier("auto", allow_hardlink=True).copy(source_file_path, output_file_path)
+
+    assert strategy != "hardlink"
+    assert os.stat(output_file_path).st_nlink == 1
+    assert output_file_path.read_bytes() == source_file_path.read_bytes()
+
+
+def test_hardlink_strategy_links_the_source_file(source_file_path: Path, tmp_path: Path):
+    output_file_path: Path = tmp_path / "output.mp3"
+
+    assert TrackFileCopier("hardlink", allow_hardlink=True).copy(source_file_path, output_file_path) == "hardlink"
+    assert os.path.samefile(source_file_path, output_file_path)
+
+
+def test_hardlink_strategy_copies_when_hardlinks_are_not_allowed(source_file_path: Path, tmp_path: Path):
+    output_file_path: Path = tmp_path / "output.mp3"
+
+    assert TrackFileCopier("hardlink").copy(source_file_path, output_file_path) == "copy"
+    assert not os.path.samefile(source_file_path, output_file_path)
+
+
+def test_hardlink_strategy_copies_a_file_that_must_not_be_shared(source_file_path: Path, tmp_path: Path):
+    output_file_path: Path = tmp_path / "output.mp3"
+    track_file_copier = TrackFileCopier("hardlink", allow_hardlink=True)
+
+    assert track_file_copier.copy(source_file_path, output_file_path, allow_hardlink=False) == "copy"
+    assert not os.path.samefile(source_file_path, output_file_path)
+
+
+@requires_linux
+def test_failed_strategy_removes_its_part_file_and_falls_back(source_file_path: Path,
+                                                             tmp_path: Path,
+                                                             monkeypatch: pytest.MonkeyPatch):
+    output_file_path: Path = tmp_path / "output.mp3"
+    track_file_copier = TrackFileCopier("copy_file_range")
+    failing_copy = fail_with(errno.EXDEV)
+    monkeypatch.setattr(track_file_copier, "_copy_file_range", failing_copy)
+
+    assert track_file_copier.copy(source_file_path, output_file_path) == "copy"
+    assert failing_copy.calls == [TrackFileCopier.get_part_file_path(output_file_path)]
+    assert output_file_path.read_bytes() == source_file_path.read_bytes()
+    assert not list(tmp_path.glob("*.part"))
+
+
+@requires_linux
+def test_unsupported_strategy_is_not_tried_again(source_file_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    track_file_copier = TrackFileCopier("reflink")
+    failing_copy = fail_with(errno.EOPNOTSUPP)
+    monkeypatch.setattr(track_file_copier, "_copy_reflink", failing_copy)
+
+    assert track_file_copier.copy(source_file_path, tmp_path / "first.mp3") == "copy"
+    assert track_file_copier.copy(source_file_path, tmp_path / "second.mp3") == "copy"
+    assert len(failing_copy.calls) == 1
+
+
+@requires_linux
+def test_strategy_failing_for_one_file_is_tried_again(source_file_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    track_file_copier = TrackFileCopier("reflink")
+    failing_copy = fail_with(errno.EXDEV)
+    monkeypatch.setattr(track_file_copier, "_copy_reflink", failing_copy)
+
+    track_file_copier.copy(source_file_path, tmp_path / "first.mp3")
+    track_file_copier.copy(source_file_path, tmp_path / "second.mp3")
+
+    assert len(failing_copy.calls) == 2
+
+
+def test_failed_plain_copy_leaves_no_part_file(tmp_path: Path):
+    output_file_path: Path = tmp_path / "output.mp3"
+
+    with pytest.raises(OSError):
+        TrackFileCopier("copy").copy(tmp_path / "missing.mp3", output_file_path, 10)
+
+    assert not output_file_path.exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def interrupt_after(chunk_count: int):
+    """ Get a throttle callback, that fails the copy before its given chunk. """
+
+    copied_chunks: list[int] = []
+
+    def interrupting_throttle(chunk_size: int):
+        if len(copied_chunks) == chunk_count:
+            raise OSError(errno.EIO, "Copy interrupted")
+        copied_chunks.append(chunk_size)
+
+    return interrupting_throttle
+
+
+def test_interrupted_chunked_copy_is_resumed(source_file_path: Path,
+                                             tmp_path: Path,
+                                             monkeypatch: pytest.MonkeyPatch,
+                                             caplog: pytest.LogCaptureFixture):
+    monkeypatch.setattr(track_file_copier, "CHECKPOINT_INTERVAL", 1024)
+    output_file_path: Path = tmp_path / "output.mp3"
+    part_file_path: Path = Path(TrackFileCopier.get_part_file_path(output_file_path))
+
+    with pytest.raises(OSError):
+        TrackFileCopier("chunked", buffer_size=1024, throttle=interrupt_after(5)).copy(source_file_path, output_file_path)
+    assert part_file_path.is_file()
+    assert Path(str(part_file_path) + track_file_copier.CHECKPOINT_FILE_SUFFIX).is_file()
+
+    caplog.set_level(logging.INFO, "TrackFileCopier")
+    assert TrackFileCopier("auto", buffer_size=1024).copy(source_file_path, output_file_path) == "chunked"
+    assert "Resuming copy of" in caplog.text
+    assert " at 5120 of " in caplog.text
+    assert output_file_path.read_bytes() == source_file_path.read_bytes()
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_chunked_copy_of_a_changed_source_file_starts_over(source_file_path: Path,
+                                                           tmp_path: Path,
+                                                           monkeypatch: pytest.MonkeyPatch,
+                                                           caplog: pytest.LogCaptureFixture):
+    monkeypatch.setattr(track_file_copier, "CHECKPOINT_INTERVAL", 1024)
+    output_file_path: Path = tmp_path / "output.mp3"
+
+    with pytest.raises(OSError):
+        TrackFileCopier("chunked", buffer_size=1024, throttle=interrupt_after(5)).copy(source_file_path, output_file_path)
+    source_file_path.write_bytes(bytes(reversed(range(256))) * 64)
+
+    caplog.set_level(logging.INFO, "TrackFileCopier")
+    assert TrackFileCopier("chunked", buffer_size=1024).copy(source_file_path, output_file_path) == "chunked"
+    assert "Resuming copy of" not in caplog.text
+    assert output_file_path.read_bytes() == source_file_path.read_bytes()
+    assert not list(tmp_path.glob("*.part*"))
@@ -0,0 +1,76 @@
+""" Tests of the track prober: the durations and bitrates read from the audio headers, the probe cache,
+and the unreadable tracks the export skips.
+"""
+
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from playlist_to_album_exporter import PlaylistToAlbumExporter
+from track import Track
+from track_prober import TrackProber
+from synthetic_library import make_mp3, make_flac, make_wav
+
+
+def get_track(file_path: Path) -> Track:
+    """ Get the track of a file, with its size and modification time if it exists. """
+
+    file_stat: os.stat_result|None = file_path.stat() if file_path.exists() else None
+
+    return Track(str(file_path), file_path.name, 1, file_path.stem, 0.0,
+                 file_stat.st_size if file_stat is not None else None,
+                 file_stat.st_mtime if file_stat is not None else None)
+
+
+def test_headers_of_every_format_are_read(tmp_path: Path):
+    make_mp3(tmp_path / "a.mp3")
+    make_flac(tmp_path / "b.flac")
+    make_wav(tmp_path / "c.wav")
+
+    results, cache_hits = TrackProber(2).probe_tracks([get_track(tmp_path / name) for name in ("a.mp3", "b.flac", "c.wav")])
+
+    assert cache_hits == 0
+    assert [result.duration for result in results] == pytest.approx([40 * 1152 / 44100, 1.0, 1.0], abs=0.01)
+    assert results[0].bitrate == 128_000
+    assert all(result.bitrate and result.error is None for result in results)
+
+
+def test_unreadable_missing_and_unsupported_files(tmp_path: Path):
+    (tmp_path / "broken.mp3").write_bytes(b"not an mpeg frame" * 64)
+    (tmp_path / "d.ogg").write_bytes(b"OggS")
+
+    results, _ = TrackProber(1).probe_tracks([get_track(tmp_path / name) for name in ("broken.mp3", "missing.mp3", "d.ogg")])
+
+    assert results[0].duration is None and results[0].error
+    assert results[1:] == [None, None]
+
+
+def test_cached_results_are_kept_between_runs_until_the_file_changes(tmp_path: Path):
+    make_mp3(tmp_path / "a.mp3")
+    track_prober = TrackProber(1, tmp_path / "probe_cache.json")
+    probed_results, _ = track_prober.probe_tracks([get_track(tmp_path / "a.mp3")])
+    track_prober.save()
+
+    cached_results, cache_hits = TrackProber(1, tmp_path / "probe_cache.json").probe_tracks([get_track(tmp_path / "a.mp3")])
+    assert (cached_results, cache_hits) == (probed_results, 1)
+
+    make_mp3(tmp_path / "a.mp3", frames=80)
+    changed_results, cache_hits = TrackProber(1, tmp_path / "probe_cache.json").probe_tracks([get_track(tmp_path / "a.mp3")])
+    assert cache_hits == 0
+    assert changed_results[0].duration == pytest.approx(80 * 1152 / 44100, abs=0.01)
+
+
+def test_export_skips_the_unreadable_tracks_and_keeps_the_probed_durations(tmp_path: Path,
+                                                                           write_playlist: Callable,
+                                                                           make_config: Callable):
+    make_mp3(tmp_path / "library" / "a.mp3")
+    config = make_config(write_playlist(["a", "broken"]), probe_workers=2)
+    exporter = PlaylistToAlbumExporter(config)
+
+    assert exporter.parse_playlist()
+    assert exporter.export_album()
+    assert exporter.get_stats().probe_error_tracks == 1
+    assert [path.name for path in Path(config.output_directory).glob("*.mp3")] == ["1 - a.mp3"]
+    assert exporter.get_tracks()[0].duration == pytest.approx(40 * 1152 / 44100, abs=0.01)
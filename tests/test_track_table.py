@@ -0,0 +1,44 @@
+""" Tests of the track table: the tracks it stores by column, and the shared strings. """
+
+import pytest
+
+from track import Track
+from track_table import TrackTable
+
+TRACKS: list[Track] = [
+    Track("/music/album/01 - a.mp3", "01 - a.mp3", 1, "Artist - a", 60.0, 1024, 1700000000.5, 192_000),
+    Track("/music/album/02 - b.mp3", "02 - b.mp3", 2, "Artist - b", 61.5, None, None, None),
+    Track("/music/other album/01 - a.mp3", "01 - a.mp3", 3, "Artist - a", 0.0, 0, 0.0, 0)
+]
+
+
+@pytest.fixture(name="track_table")
+def track_table_fixture() -> TrackTable:
+    """ A table of the test tracks. """
+
+    track_table = TrackTable()
+    for track in TRACKS:
+        track_table.append(track)
+
+    return track_table
+
+
+def test_table_holds_the_appended_tracks(track_table: TrackTable):
+    assert list(track_table) == TRACKS
+    assert len(track_table) == len(TRACKS)
+    assert track_table[-1] == TRACKS[-1]
+    assert track_table[1:] == TRACKS[1:]
+    with pytest.raises(IndexError):
+        _ = track_table[len(TRACKS)]
+
+
+def test_repeated_strings_are_stored_once(track_table: TrackTable):
+    assert track_table[0].file_name is track_table[2].file_name
+    assert track_table[0].title is track_table[2].title
+
+
+def test_audio_info_replaces_the_duration_and_sets_the_bitrate(track_table: TrackTable):
+    track_table.set_audio_info(1, 62.25, 320_000)
+
+    assert track_table[1] == TRACKS[1]._replace(duration=62.25, bitrate=320_000)
+    assert track_table[0] == TRACKS[0]
@@ -0,0 +1,98 @@
+""" Tests of the track transcoder with stand-in encoders on the PATH: the encoder choice, the errors and the cache. """
+
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from track import Track
+from track_transcoder import TrackTranscoder
+
+
+@pytest.fixture(name="encoder_directory")
+def encoder_directory_fixture(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """ An empty folder, that is the only folder on the PATH. """
+
+    encoder_directory: Path = tmp_path / "bin"
+    encoder_directory.mkdir()
+    monkeypatch.setenv("PATH", str(encoder_directory))
+
+    return encoder_directory
+
+
+def write_encoder(encoder_directory: Path, encoder_name: str, exit_code: int = 0):
+    """ Write a stand-in encoder, that copies its input file to its output file, the last two arguments,
+    and appends its input file path to the runs.txt file of its folder. An encoder with an exit code writes nothing.
+    """
+
+    encoder_path: Path = encoder_directory / encoder_name
+    encoder_path.write_text(f"""#!{sys.executable}
+import shutil, sys
+if {exit_code}:
+    sys.stderr.write("Encoding failed\\nUnsupported input\\n")
+    sys.exit({exit_code})
+shutil.copyfile(sys.argv[-2], sys.argv[-1])
+with open({str(encoder_directory / "runs.txt")!r}, "a", encoding="utf-8") as runs_file:
+    runs_file.write(sys.argv[-2] + "\\n")
+""", encoding="utf-8")
+    encoder_path.chmod(encoder_path.stat().st_mode | stat.S_IXUSR)
+
+
+def get_track(file_path: Path) -> Track:
+    """ Get the track of a source file. """
+
+    return Track(str(file_path), file_path.name, 1, file_path.stem, 60.0)
+
+
+@pytest.fixture(name="source_file_path")
+def source_file_path_fixture(tmp_path: Path) -> Path:
+    """ A .wav source file. """
+
+    source_file_path: Path = tmp_path / "a.wav"
+    source_file_path.write_bytes(b"RIFF source audio")
+
+    return source_file_path
+
+
+@pytest.mark.skipif(os.name == "nt", reason="The stand-in encoders are scripts with a shebang line.")
+def test_source_file_is_encoded_once_and_cached(tmp_path: Path, encoder_directory: Path, source_file_path: Path):
+    write_encoder(encoder_directory, "lame")
+    transcoder = TrackTranscoder("mp3", 128, 2, tmp_path / "cache")
+
+    results = transcoder.transcode_tracks([get_track(source_file_path), get_track(source_file_path)])
+    transcoder.close()
+    cached_results = TrackTranscoder("mp3", 128, 1, tmp_path / "cache").transcode_tracks([get_track(source_file_path)])
+
+    assert transcoder.get_output_file_name("01 - a.wav") == "01 - a.mp3"
+    assert transcoder.get_bitrate() == 128_000
+    assert Path(results[str(source_file_path)].file_path).read_bytes() == source_file_path.read_bytes()
+    assert not results[str(source_file_path)].is_cached
+    assert cached_results[str(source_file_path)].is_cached
+    assert cached_results[str(source_file_path)].file_path == results[str(source_file_path)].file_path
+    assert (encoder_directory / "runs.txt").read_text(encoding="utf-8").splitlines() == [str(source_file_path)]
+
+
+def test_source_format_without_an_encoder_is_an_error(tmp_path: Path, encoder_directory: Path):
+    write_encoder(encoder_directory, "lame")
+    (tmp_path / "a.flac").write_bytes(b"fLaC")
+
+    results = TrackTranscoder("mp3", 128, 1).transcode_tracks([get_track(tmp_path / "a.flac")])
+
+    assert results[str(tmp_path / "a.flac")].error == "no mp3 encoder for .flac files found"
+    assert not (encoder_directory / "runs.txt").exists()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="The stand-in encoders are scripts with a shebang line.")
+def test_failed_encoder_run_is_an_error_and_leaves_no_file(encoder_directory: Path, source_file_path: Path):
+    write_encoder(encoder_directory, "opusenc", exit_code=3)
+    transcoder = TrackTranscoder("opus", 96, 1)
+
+    results = transcoder.transcode_tracks([get_track(source_file_path)])
+    cache_directory: Path = Path(transcoder._cache_directory)
+
+    assert results[str(source_file_path)] == (None, False, 0.0, "opusenc exit code 3: Unsupported input")
+    assert not [path for path in cache_directory.rglob("*") if path.is_file()]
+    transcoder.close()
+    assert not cache_directory.exists()